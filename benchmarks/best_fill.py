@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Runs a branch-and-bound search for the best-scoring fill of a grid for a
+fixed time and prints each improvement as it is found. The bank holds random
+words with English-like letter frequencies and random scores.
+
+    python benchmarks/best_fill.py --duration 30
+"""
+
+import random
+import sys
+import time
+from argparse import ArgumentParser
+
+from puzzicle.puzzicon.fill.bank import Bank
+from puzzicle.puzzicon.fill.filler import Filler
+from puzzicle.puzzicon.fill.ordering import MinimumRemainingValues
+from puzzicle.puzzicon.fill.quality import WordScorer, BestFillListener, HighestScoreFirst
+from puzzicle.puzzicon.fill.state import FillState
+from puzzicle.puzzicon.grid import GridModel
+
+_LETTERS = 'EEEEEEEEEEEETTTTTTTTTAAAAAAAAOOOOOOOIIIIIIINNNNNNNSSSSSSRRRRRRHHHHHLLLLDDDDCCCUUUMMPPFFGGWYBVKXJQZ'
+
+
+def main():
+    p = ArgumentParser(description="Search for the best-scoring fill of a grid for a fixed time.")
+    p.add_argument("--grid", default='.._____________________..', help="grid text, with '.' for dark squares")
+    p.add_argument("--words-per-length", type=int, default=3000)
+    p.add_argument("--duration", type=float, default=30.0, help="time budget in seconds")
+    p.add_argument("--seed", type=int, default=0)
+    args = p.parse_args()
+    rng = random.Random(args.seed)
+    grid = GridModel.build(args.grid)
+    lengths = set(grid.topology().slot_lengths)
+    words = set([''.join([rng.choice(_LETTERS) for _ in range(length)]) for length in lengths for _ in range(args.words_per_length)])
+    bank = Bank.with_index(words).with_scores(dict([(word, rng.randint(1, 60)) for word in words]))
+    scorer = WordScorer(bank)
+    filler = Filler(bank)
+    filler.backjumping = True
+    filler.selector = MinimumRemainingValues(bank)
+    filler.orderer = HighestScoreFirst(scorer)
+    start = time.perf_counter()
+
+    def report(state: FillState, score: float):
+        print("{:8.2f}s {:>8} nodes  score {:g}".format(time.perf_counter() - start, listener.count, score))
+
+    listener = BestFillListener(scorer, duration_threshold=args.duration, on_improvement=report)
+    filler.fill(FillState.from_grid(grid), listener)
+    print("{} improvements in {} nodes".format(listener.improvements, listener.count))
+    if listener.value() is not None:
+        print(listener.value().render(grid))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Measures canonicalization throughput, in lines per second, of the compiled
+canonicalizer and of the regular expression implementation it replaced.
+
+    python benchmarks/canonicalize.py /usr/share/dict/words
+"""
+
+import re
+import sys
+import time
+from argparse import ArgumentParser
+from typing import Callable, List
+
+from puzzicle import puzzicon
+
+
+def _regex_canonicalize(rendering: str, allowed: str='alpha', preserve=frozenset()) -> str:
+    # implementation of Puzzeme.canonicalize before canonicalizers were compiled
+    # noinspection PyProtectedMember
+    if puzzicon._contains_nonalphabet(rendering, allowed):
+        rendering = puzzicon.unicode_normalize(rendering)
+    canonical = re.sub(puzzicon.get_regex_noncharmatch(allowed), '', rendering).strip()
+    if 'case' not in preserve:
+        canonical = canonical.upper()
+    return canonical
+
+
+def _measure(canonicalize: Callable[[str], str], lines: List[str], repeat: int) -> float:
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for line in lines:
+            canonicalize(line)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return len(lines) / best
+
+
+def main():
+    p = ArgumentParser(description="Measure canonicalization throughput.")
+    p.add_argument("wordlist", help="word list file, one rendering per line")
+    p.add_argument("--allowed", default='alpha', choices=('alpha', 'numeric', 'alphanumeric'))
+    p.add_argument("--preserve-case", action='store_true')
+    p.add_argument("--repeat", type=int, default=3, help="number of runs; the fastest is reported")
+    args = p.parse_args()
+    with open(args.wordlist, 'r') as ifile:
+        lines = ifile.readlines()
+    preserve = {'case'} if args.preserve_case else frozenset()
+    before = _measure(lambda line: _regex_canonicalize(line, args.allowed, preserve), lines, args.repeat)
+    after = _measure(puzzicon.get_canonicalizer(args.allowed, preserve), lines, args.repeat)
+    print("{} lines".format(len(lines)))
+    print("regex:    {:12,.0f} lines/s".format(before))
+    print("compiled: {:12,.0f} lines/s ({:.1f}x)".format(after, after / before))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
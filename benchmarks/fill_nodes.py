@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Counts the search nodes visited to find a first fill of some grids, and the
+time per node, with the default answer sorter, with the minimum-remaining-values
+selector, and with that selector and the least-constraining-value orderer
+(by product and by minimum). Each bank holds the words of one random fill
+of the grid plus random words with English-like letter frequencies.
+Each search may be run with restarts on a Luby or geometric schedule.
+
+    python benchmarks/fill_nodes.py --noise 400
+    python benchmarks/fill_nodes.py --noise 400 --restarts luby
+"""
+
+import random
+import sys
+import time
+from argparse import ArgumentParser
+from typing import List
+
+from puzzicle.puzzicon.fill.bank import Bank
+from puzzicle.puzzicon.fill.filler import Filler, FirstCompleteListener
+from puzzicle.puzzicon.fill.ordering import MinimumRemainingValues, LeastConstrainingValue
+from puzzicle.puzzicon.fill.restart import RestartingFiller, LubySchedule, GeometricSchedule
+from puzzicle.puzzicon.fill.state import FillState
+from puzzicle.puzzicon.grid import GridModel
+
+_LETTERS = 'EEEEEEEEEEEETTTTTTTTTAAAAAAAAOOOOOOOIIIIIIINNNNNNNSSSSSSRRRRRRHHHHHLLLLDDDDCCCUUUMMPPFFGGWYBVKXJQZ'
+_GRIDS = {
+    '5x5': '.._____________________..',
+    '7x7': "___.___" "___.___" "_______" "..___.." "_______" "___.___" "___.___",
+    '9x9': ".___.___." "_________" "_________" "___._____" ".___.___." "_____.___" "_________" "_________" ".___.___.",
+}
+
+
+def _words(grid: GridModel, rng: random.Random, noise: int) -> List[str]:
+    topology = grid.topology()
+    letters = [rng.choice(_LETTERS) for _ in range(grid.num_rows * grid.num_cols)]
+    words = set([''.join([letters[grid_idx] for grid_idx in topology.slot(i)]) for i in range(topology.num_slots())])
+    for length in set(topology.slot_lengths):
+        for _ in range(noise):
+            words.add(''.join([rng.choice(_LETTERS) for _ in range(length)]))
+    return sorted(words)
+
+
+def _configure(filler: Filler, name: str):
+    bank = filler.bank
+    if name != 'sorter':
+        filler.selector = MinimumRemainingValues(bank)
+    if name == 'lcv':
+        filler.orderer = LeastConstrainingValue(bank)
+    elif name == 'lcv-min':
+        filler.orderer = LeastConstrainingValue(bank, minimum=True)
+
+
+def main():
+    p = ArgumentParser(description="Count search nodes with slot selection and value ordering heuristics.")
+    p.add_argument("--noise", type=int, default=400, help="random words per slot length")
+    p.add_argument("--seeds", type=int, default=4, help="number of banks per grid")
+    p.add_argument("--max-nodes", type=int, default=20000, help="node threshold per search")
+    p.add_argument("--no-backjumping", action='store_true')
+    p.add_argument("--restarts", choices=('none', 'luby', 'geometric'), default='none')
+    p.add_argument("--restart-unit", type=int, default=100, help="smallest node budget between restarts")
+    args = p.parse_args()
+    configurations = ['sorter', 'mrv', 'lcv', 'lcv-min']
+    print("nodes to first fill (+ if none was found) and milliseconds per node")
+    print("{:>5} {:>4} ".format("grid", "seed") + ' '.join(["{:>18}".format(c) for c in configurations]))
+    for name, text in _GRIDS.items():
+        grid = GridModel.build(text)
+        for seed in range(args.seeds):
+            bank = Bank.with_index(_words(grid, random.Random(seed), args.noise))
+            results = []
+            for configuration in configurations:
+                filler = Filler(bank)
+                _configure(filler, configuration)
+                filler.backjumping = not args.no_backjumping
+                if args.restarts == 'luby':
+                    filler = RestartingFiller(filler, LubySchedule(args.restart_unit), seed=seed)
+                elif args.restarts == 'geometric':
+                    filler = RestartingFiller(filler, GeometricSchedule(args.restart_unit), seed=seed)
+                start = time.perf_counter()
+                listener = filler.fill(FillState.from_grid(grid), FirstCompleteListener(args.max_nodes))
+                elapsed = time.perf_counter() - start
+                nodes = "{}{}".format(listener.count, '' if listener.value() is not None else '+')
+                results.append("{:>10} {:>7.3f}".format(nodes, elapsed * 1000 / listener.count))
+            print("{:>5} {:>4} ".format(name, seed) + ' '.join(results))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Measures pattern matching for slots longer than the pattern registry cap,
+comparing the NumPy matcher with matching each deposit in turn.
+
+    python benchmarks/long_slots.py --words-per-length 20000
+"""
+
+import random
+import sys
+import time
+from argparse import ArgumentParser
+from typing import Callable, List
+
+from puzzicle.puzzicon.fill import Pattern
+from puzzicle.puzzicon.fill import vectorized
+from puzzicle.puzzicon.fill.bank import Bank
+
+
+def _measure(action: Callable[[], object], repeat: int) -> float:
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        action()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def _patterns(rng: random.Random, words: List[str], length: int, num_patterns: int) -> List[Pattern]:
+    patterns = []
+    for word in rng.sample(words, num_patterns):
+        defined = set(rng.sample(range(length), max(1, length // 4)))
+        patterns.append(Pattern([letter if i in defined else None for i, letter in enumerate(word)]))
+    return patterns
+
+
+def main():
+    p = ArgumentParser(description="Measure long-slot pattern matching.")
+    p.add_argument("--words-per-length", type=int, default=20000)
+    p.add_argument("--patterns", type=int, default=20, help="patterns per length")
+    p.add_argument("--repeat", type=int, default=3, help="number of runs; the fastest is reported")
+    p.add_argument("--seed", type=int, default=0)
+    args = p.parse_args()
+    if not vectorized.is_available():
+        print("numpy is not installed", file=sys.stderr)
+        return 1
+    rng = random.Random(args.seed)
+    lengths = range(10, 22)
+    words_by_length = {}
+    for length in lengths:
+        words_by_length[length] = [''.join([rng.choice('EEEAAIIOONRSTLCDUMPHGBYFKWVXZJQ') for _ in range(length)])
+                                   for _ in range(args.words_per_length)]
+    bank = Bank.with_registry([w for words in words_by_length.values() for w in words])
+    start = time.perf_counter()
+    bank.count(Pattern([None] * 10))
+    print("matcher built in {:.2f}s for {} words".format(time.perf_counter() - start, bank.size()))
+    print("{:>6} {:>12} {:>12} {:>8}".format("length", "slow (ms)", "numpy (ms)", "speedup"))
+    for length in lengths:
+        patterns = _patterns(rng, words_by_length[length], length, args.patterns)
+        slow = _measure(lambda: [list(bank.filter_slowly(pattern)) for pattern in patterns], args.repeat) / len(patterns)
+        fast = _measure(lambda: [list(bank.filter(pattern)) for pattern in patterns], args.repeat) / len(patterns)
+        print("{:>6} {:>12.3f} {:>12.3f} {:>7.1f}x".format(length, slow * 1000, fast * 1000, slow / fast))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,11 +1,15 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import functools
+import itertools
 import re
-from collections import defaultdict
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 import fnmatch
 import logging
 from typing import List, Dict, Callable, Set, Iterable, NamedTuple, FrozenSet
+from typing import Iterator, Optional, Tuple, Union
 import unidecode
 
 unicode_normalize = unidecode.unidecode
@@ -23,6 +27,7 @@ def _create_constant_callable(retval):
 
 
 _EMPTY_SET = frozenset()
+_DEFAULT_BATCH_SIZE = 10000
 _CALLABLE_TRUE = _create_constant_callable(True)
 _CALLABLE_FALSE = _create_constant_callable(False)
 _ALPHABET_ALPHA = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
@@ -56,6 +61,54 @@ def _contains_nonalphabet(letters, allowed):
     return False
 
 
+class Canonicalizer(object):
+
+    """
+    Function that produces the canonical form of a rendering, compiled for one
+    configuration of allowed characters and preserved features.
+
+    A rendering is transliterated to ASCII only if it contains non-ASCII
+    characters, because ASCII renderings are unchanged by transliteration.
+    Characters outside the alphabet are then deleted, and letters are
+    converted to uppercase unless case is preserved, in a single pass with
+    a translation table.
+    """
+
+    def __init__(self, allowed: str='alpha', preserve: Set[str]=_EMPTY_SET):
+        self.allowed = allowed
+        self.preserve = frozenset(preserve)
+        alphabet = get_alphabet(allowed)
+        table = {}
+        for code_point in range(128):
+            ch = chr(code_point)
+            if ch not in alphabet:
+                table[code_point] = None
+            elif 'case' not in self.preserve and ch != ch.upper():
+                table[code_point] = ch.upper()
+        self.table = str.maketrans(table)
+
+    def __call__(self, rendering: str) -> str:
+        if not rendering.isascii():
+            rendering = unicode_normalize(rendering)
+        return rendering.translate(self.table)
+
+
+@functools.lru_cache(maxsize=None)
+def _get_canonicalizer(allowed: str, preserve: FrozenSet[str]) -> Canonicalizer:
+    return Canonicalizer(allowed, preserve)
+
+
+def get_canonicalizer(allowed: str='alpha', preserve: Set[str]=_EMPTY_SET) -> Canonicalizer:
+    """
+    Gets the canonicalizer for a configuration. Canonicalizers are compiled
+    once per configuration and shared.
+    @param allowed: allowed characters; 'alpha', 'numeric', or 'alphanumeric'
+    @param preserve: features to preserve; may contain 'case'
+    @return: the canonicalizer
+    """
+    return _get_canonicalizer(allowed, frozenset(preserve))
+
+
 class InvalidPuzzemeException(Exception):
     pass
 
@@ -85,29 +138,69 @@ class Puzzeme(NamedTuple):
 
     @staticmethod
     def canonicalize(rendering: str, allowed: str='alpha', preserve: Set[str]=_EMPTY_SET) -> str:
-        if _contains_nonalphabet(rendering, allowed):
-            rendering = unicode_normalize(rendering)
-        canonical = re.sub(get_regex_noncharmatch(allowed), '', rendering).strip()
-        if 'case' not in preserve:
-            canonical = canonical.upper()
-        return canonical
+        return get_canonicalizer(allowed, preserve)(rendering)
 
     def stature(self):
         """Return the length of the canonical form of this instance."""
         return len(self.canonical)
 
 
+class StaturePredicate(object):
+
+    """Predicate on the stature of a puzzeme. The value attribute is set if the predicate requires an exact stature."""
+
+    def __init__(self, int_predicate: Union[int, Callable[[int], bool]]):
+        self.value: Optional[int] = None
+        if isinstance(int_predicate, int):
+            value = int_predicate
+            self.value = value
+            int_predicate = lambda n: n == value
+        self.int_predicate = int_predicate
+
+    def __call__(self, puzzeme: Puzzeme) -> bool:
+        return self.int_predicate(puzzeme.stature())
+
+
+class CanonicalPredicate(object):
+
+    """Predicate on the canonical form of a puzzeme. The literal attribute is set if the predicate requires an exact canonical form."""
+
+    def __init__(self, predicate: Callable[[str], bool], literal: Optional[str]=None):
+        self.predicate = predicate
+        self.literal = literal
+
+    def __call__(self, puzzeme: Puzzeme) -> bool:
+        return self.predicate(puzzeme.canonical)
+
+
+class WildcardPredicate(CanonicalPredicate):
+
+    """Predicate that a canonical form matches a shell-style wildcard pattern, compiled once to a regular expression."""
+
+    def __init__(self, pattern: str):
+        regex = re.compile(fnmatch.translate(pattern))
+        super().__init__(lambda c: regex.match(c) is not None)
+        self.pattern = pattern
+
+
+class RegexPredicate(CanonicalPredicate):
+
+    """Predicate that a canonical form matches a regular expression in its entirety. The expression is compiled once."""
+
+    def __init__(self, pattern: str):
+        regex = re.compile(pattern)
+        super().__init__(lambda c: regex.fullmatch(c) is not None)
+        self.pattern = pattern
+
+
 class Filters(object):
 
     def __init__(self):
         raise NotImplementedError("this class provides static methods")
 
     @classmethod
-    def stature(cls, int_predicate: Callable[[int], bool]):
-        if isinstance(int_predicate, int):
-            value = int_predicate
-            int_predicate = lambda n: n == value
-        return lambda p: int_predicate(p.stature())
+    def stature(cls, int_predicate):
+        return StaturePredicate(int_predicate)
 
     @classmethod
     def conjoin(cls, predicates: Iterable[Callable[[Puzzeme], bool]]):
@@ -127,16 +220,16 @@ class Filters(object):
         if not callable(predicate):
             # assume we're looking for literal match
             literal = Puzzeme.canonicalize(predicate)
-            predicate = lambda c: c == literal
-        return lambda p: predicate(p.canonical)
+            return CanonicalPredicate(lambda c: c == literal, literal)
+        return CanonicalPredicate(predicate)
 
     @classmethod
     def canonical_wildcard(cls, pattern):
-        return Filters.canonical(lambda c: fnmatch.fnmatch(c, pattern))
+        return WildcardPredicate(pattern)
 
     @classmethod
     def canonical_regex(cls, pattern):
-        return Filters.canonical(lambda c: re.fullmatch(pattern, c) is not None)
+        return RegexPredicate(pattern)
 
 
 class Puzzarian(object):
@@ -147,36 +240,110 @@ class Puzzarian(object):
         self.puzzeme_dict = {}
         for p in self.puzzemes:
             self.puzzeme_dict[p.canonical] = p
+        self._index = None
+
+    def index(self):
+        """
+        Gets the index of this instance's puzzemes, building it on first use.
+        @return: a puzzicle.puzzicon.query.PuzzemeIndex
+        """
+        if self._index is None:
+            from puzzicle.puzzicon.query import PuzzemeIndex
+            self._index = PuzzemeIndex(self.puzzemes, self.puzzeme_dict)
+        return self._index
 
     def search(self, predicates, offset=None, limit=None):
-        xform = _IDENTITY if offset is None and limit is None else lambda f: (list(f))[offset:offset + limit]
-        filtered = filter(Filters.conjoin(predicates), self.puzzemes)
-        return xform(filtered)
+        """
+        Searches for puzzemes that satisfy all of the given predicates. Predicates
+        created by Filters are answered from indexes where possible; other callables
+        are applied to each candidate. Matches are supplied in order of canonical form.
+        @param predicates: predicates on puzzemes
+        @param offset: number of matches to skip
+        @param limit: maximum number of matches to return
+        @return: iterator over matches if offset and limit are None, otherwise a list
+        of the matches on the requested page
+        """
+        matches = self.index().query(predicates)
+        if offset is None and limit is None:
+            return matches
+        offset = offset or 0
+        return list(itertools.islice(matches, offset, None if limit is None else offset + limit))
 
     def has_canonical(self, word):
         """Check for an exact match."""
         return Puzzeme.canonicalize(word) in self.puzzeme_dict
 
 
-def create_puzzeme_set(ifile: Iterable[str], intolerables=None):
-    by_canonical: Dict[str, List[Puzzeme]] = defaultdict(list)
-    for rendering in ifile:
+def _canonicalize_batch(renderings: List[str]) -> List[Union[str, Exception]]:
+    """Returns the canonical form of each rendering, or the exception raised when creating a puzzeme from it failed."""
+    results = []
+    for rendering in renderings:
         try:
-            p = Puzzeme.create(rendering)
-            by_canonical[p.canonical].append(p)
+            results.append(Puzzeme.create(rendering).canonical)
         except Exception as e:
-            if intolerables is not None:
-                intolerables.append((rendering, e))
-    if intolerables and len(intolerables):
-        _log.info("%s items in input are intolerable", len(intolerables))
-    items = []
-    for variants in by_canonical.values():
-        assert len(variants) == sum([len(v.renderings) for v in variants])
-        for variant in variants:
-            assert len(variant.renderings) == 1
-        renderings = [list(variant.renderings)[0] for variant in variants]
-        items.append(Puzzeme.create(*renderings))
-    return frozenset(items)
+            results.append(e)
+    return results
+
+
+def _batches(items: Iterable[str], batch_size: int) -> Iterator[List[str]]:
+    iterator = iter(items)
+    while True:
+        batch = list(itertools.islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def _canonicalize_batches(ifile: Iterable[str], batch_size: int, processes: Optional[int]) -> Iterator[Tuple[List[str], List[Union[str, Exception]]]]:
+    batches = _batches(ifile, batch_size)
+    if processes is None or processes <= 1:
+        for batch in batches:
+            yield batch, _canonicalize_batch(batch)
+        return
+    with ProcessPoolExecutor(processes) as executor:
+        # bound the number of batches in flight, so input is not read faster than it is merged
+        pending = deque()
+        for batch in batches:
+            pending.append((batch, executor.submit(_canonicalize_batch, batch)))
+            if len(pending) >= 2 * processes:
+                batch, future = pending.popleft()
+                yield batch, future.result()
+        while pending:
+            batch, future = pending.popleft()
+            yield batch, future.result()
+
+
+def create_puzzeme_set(ifile: Iterable[str], intolerables=None, batch_size: int=_DEFAULT_BATCH_SIZE, processes: Optional[int]=None):
+    """
+    Creates a set of puzzemes from renderings, merging renderings that have the same canonical form.
+
+    Renderings are read and canonicalized in batches, and each batch is merged
+    into the set before the next is read, so memory use is proportional to the
+    number of distinct canonical forms, not the number of renderings.
+    @param ifile: renderings, such as the lines of a file
+    @param intolerables: list to which (rendering, exception) pairs are appended for renderings that are not valid
+    @param batch_size: number of renderings per batch
+    @param processes: number of worker processes to canonicalize batches, or None to canonicalize in this process
+    @return: frozenset of puzzemes
+    """
+    by_canonical: Dict[str, Puzzeme] = {}
+    num_intolerable = 0
+    for batch, canonicals in _canonicalize_batches(ifile, batch_size, processes):
+        for rendering, canonical in zip(batch, canonicals):
+            if isinstance(canonical, Exception):
+                num_intolerable += 1
+                if intolerables is not None:
+                    intolerables.append((rendering, canonical))
+                continue
+            rendering = rendering.strip()
+            existing = by_canonical.get(canonical, None)
+            if existing is None:
+                by_canonical[canonical] = Puzzeme(canonical, frozenset((rendering,)))
+            elif rendering not in existing.renderings:
+                by_canonical[canonical] = Puzzeme(canonical, existing.renderings | {rendering})
+    if num_intolerable and intolerables is not None:
+        _log.info("%s items in input are intolerable", num_intolerable)
+    return frozenset(by_canonical.values())
 
 
 def _standard_cleaner(line: str) -> str:
@@ -186,14 +353,14 @@ def _standard_cleaner(line: str) -> str:
     return line
 
 
-def read_puzzeme_set(pathname: str, cleaner: Callable[[str], str]=None):
+def read_puzzeme_set(pathname: str, cleaner: Callable[[str], str]=None, processes: Optional[int]=None):
     if cleaner is None:
         cleaner = _standard_cleaner
     if cleaner == 'identity':
         cleaner = lambda x: x
     with open(pathname, 'r') as ifile:
         cleaned = map(cleaner, ifile)
-        return create_puzzeme_set(cleaned)
+        return create_puzzeme_set(cleaned, processes=processes)
 
 
 def load_default_puzzemes():
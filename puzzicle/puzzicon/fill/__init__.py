@@ -79,6 +79,8 @@ class BankItem(NamedTuple):
 
     @staticmethod
     def from_word(word: str, constituents: Optional[str]=None):
+        if constituents is None:
+            return BankItem(WordTuple(word), word, frozenset((word,)))
         return BankItem.create(WordTuple(word), constituents)
 
     def length(self):
@@ -122,32 +124,56 @@ class Answer(NamedTuple):
         """
         Creates a new answer that represents the result of updating this
         answer with the given mapping of grid index to square value.
+        Only the open positions are examined, and this answer is returned
+        if none of them is updated.
         @param legend_updates: map of grid indexes to square values
-        @return: a new answer instance
+        @return: an answer instance
         """
-        num_unknown = 0
+        content, pattern = self.content, self.pattern
+        template_src = None
         num_updates = 0
-        template_src = []
-        pattern_src = []
-        for i in range(self.length()):
-            spot = self.content[i]
-            if self.content.is_defined_at(i):
-                template_src.append(spot)
-                pattern_src.append(spot)
-            else:
-                p_val = legend_updates.get(spot, None)
-                if p_val is None:
-                    t_val = spot
-                    num_unknown += 1
-                else:
-                    t_val = p_val
+        for i, p_val in enumerate(pattern):
+            if p_val is None:
+                t_val = legend_updates.get(content[i], None)
+                if t_val is not None:
+                    if template_src is None:
+                        template_src, pattern_src = list(content), list(pattern)
+                    template_src[i] = t_val
+                    pattern_src[i] = t_val
                     num_updates += 1
-                template_src.append(t_val)
-                pattern_src.append(p_val)
-        pattern = Pattern(pattern_src)
-        strength = pattern.length() - num_unknown
-        content = Template(template_src, strength=strength)
-        return Answer(content, pattern, strength)
+        if template_src is None:
+            return self
+        strength = self.strength + num_updates
+        # noinspection PyUnboundLocalVariable
+        return Answer(Template(template_src, strength=strength), Pattern(pattern_src), strength)
+
+    def update_cells(self, cell_values: Sequence[Tuple[int, str]]) -> 'Answer':
+        """
+        Creates a new answer with letters in some of its open cells. Unlike
+        update, this examines only the given cells, so it is cheaper when
+        few cells of a long answer change.
+        @param cell_values: (grid index, square value) pairs with distinct grid
+        indexes; grid indexes that are not open cells of this answer are ignored
+        @return: an answer instance
+        """
+        content = self.content
+        template_src = None
+        num_updates = 0
+        for grid_idx, value in cell_values:
+            try:
+                i = content.index(grid_idx)
+            except ValueError:
+                continue
+            if template_src is None:
+                template_src, pattern_src = list(content), list(self.pattern)
+            template_src[i] = value
+            pattern_src[i] = value
+            num_updates += 1
+        if template_src is None:
+            return self
+        strength = self.strength + num_updates
+        # noinspection PyUnboundLocalVariable
+        return Answer(Template(template_src, strength=strength), Pattern(pattern_src), strength)
 
     def to_updates(self, entry: BankItem) -> Dict[int, str]:
         """
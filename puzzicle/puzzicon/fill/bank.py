@@ -3,23 +3,34 @@
 
 import hashlib
 import itertools
+import json
 import logging
 import pickle
 import os.path
-from collections import defaultdict
-from typing import Collection, FrozenSet, Set, Optional, BinaryIO, Iterable
-from typing import List, Dict, Iterator, Callable
+import random
+from collections import defaultdict, abc
+from typing import Collection, FrozenSet, Set, Optional, BinaryIO, Iterable, Any
+from typing import List, Dict, Iterator, Callable, Tuple
 
 from puzzicle import puzzicon
-from puzzicle.puzzicon import Puzzeme
+from puzzicle.puzzicon import Puzzeme, CanonicalPredicate
 from puzzicle.puzzicon.fill import Pattern, WordTuple, BankItem, Suggestion, Answer, Template
+from puzzicle.puzzicon.fill.index import BitsetIndex, IndexedDeposits, IndexedTableaus
 from puzzicle.puzzicon.fill.state import FillState, AnswerChangeset
+from puzzicle.puzzicon.fill import vectorized
+from puzzicle.puzzicon.fill.vectorized import ArrayMatcher
+from puzzicle.puzzicon.query import pattern_of
 
 _log = logging.getLogger(__name__)
 _EMPTY_SET = frozenset()
 _DEFAULT_MAX_PATTERN_LEN = 9
 _FILENAME_SAFE_CHARS = 'QWERTYUIOPASDFGHJKLZXCVBNMqwertyuiopasdfghjklzxcvbnm1234567890_'
 
+
+# noinspection PyPep8Naming
+def _SUGGESTION_RANK(suggestion: Suggestion):
+    return 0 if suggestion.rank is None else suggestion.rank
+
 def _powerset(iterable):
     """powerset([1,2,3]) --> () (1,) (2,) (3,) (1,2) (1,3) (2,3) (1,2,3)"""
     s = list(iterable)
@@ -38,19 +49,67 @@ def _patterns(entry: WordTuple) -> List[Pattern]:
 
 class Bank(object):
 
-    def __init__(self, deposits: FrozenSet[BankItem], tableaus: FrozenSet[WordTuple], by_pattern: Dict[Pattern, List[BankItem]], pattern_registry_cap=None, debug:bool=False):
-        assert isinstance(deposits, frozenset)
+    def __init__(self, deposits: Collection[BankItem], tableaus: Collection[WordTuple], by_pattern: Dict[Pattern, List[BankItem]], pattern_registry_cap=None, debug:bool=False, index: Optional[BitsetIndex]=None):
+        assert isinstance(deposits, abc.Collection)
         self.deposits = deposits
-        assert isinstance(tableaus, frozenset)
+        assert isinstance(tableaus, abc.Collection)
         self.tableaus = tableaus
         assert isinstance(by_pattern, dict)
         self.by_pattern = by_pattern
         self.debug = debug
         self.pattern_registry_cap = pattern_registry_cap
+        self.index = index
+        self.scores: Optional[Dict[str, float]] = None
+        self.default_score = 0.0
+        self._array_matcher: Optional[ArrayMatcher] = None
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state['_array_matcher'] = None
+        return state
+
+    def __setstate__(self, state):
+        self._array_matcher = None
+        self.scores = None
+        self.default_score = 0.0
+        self.__dict__.update(state)
 
     def size(self) -> int:
         return len(self.deposits)
 
+    def with_scores(self, scores: Dict[str, float], default_score: float=0.0) -> 'Bank':
+        """
+        Creates a bank with the same words as this one and a quality score for each word.
+        The new bank shares this bank's words and index.
+        @param scores: map of rendering to score
+        @param default_score: score of words that are not in the map
+        @return: a new bank
+        """
+        bank = Bank(self.deposits, self.tableaus, self.by_pattern, self.pattern_registry_cap, self.debug, self.index)
+        bank.scores = dict(scores)
+        bank.default_score = default_score
+        return bank
+
+    def score(self, rendering: str) -> float:
+        """
+        Gets the quality score of a word.
+        @param rendering: the word
+        @return: the word's score, or the default score if the bank has no score for it
+        """
+        if self.scores is None:
+            return self.default_score
+        return self.scores.get(rendering, self.default_score)
+
+    def _long_pattern_matcher(self) -> Optional[ArrayMatcher]:
+        """
+        Gets the matcher for patterns longer than the pattern registry cap,
+        building it on first use. The matcher requires NumPy.
+        @return: the matcher, or None if NumPy is not installed
+        """
+        if self._array_matcher is None and vectorized.is_available():
+            self._array_matcher = ArrayMatcher(self.deposits)
+        return self._array_matcher
+
     @staticmethod
     def with_registry(entries: Iterable[str], pattern_registry_cap=_DEFAULT_MAX_PATTERN_LEN, debug: bool=False):
         deposits = frozenset([BankItem.from_word(entry) for entry in entries])
@@ -65,6 +124,35 @@ class Bank(object):
             pattern_list.sort()
         return Bank(deposits, tableaus, by_pattern, pattern_registry_cap, debug)
 
+    @staticmethod
+    def with_index(entries: Iterable[str], debug: bool=False):
+        """
+        Creates a bank whose filter and count operations are answered by a bitset index.
+        Unlike a pattern registry, the index has no cap on word length. Words are
+        stored as packed rows of letter codes, and a bank item is created only when
+        a word is supplied by the bank.
+        @param entries: the words
+        @param debug: debug flag
+        @return: a new bank
+        """
+        index = BitsetIndex.from_words(entries)
+        return Bank(IndexedDeposits(index), IndexedTableaus(index), {}, None, debug, index)
+
+    def with_changes(self, added: Iterable[str], removed: Iterable[str]) -> 'Bank':
+        """
+        Creates a bank with some words added and some removed, rebuilding only
+        the parts of the index for word lengths that have changes.
+        @param added: words to add
+        @param removed: words to remove
+        @return: a new bank
+        """
+        assert self.index is not None, "bank must have an index"
+        index = self.index.with_changes([BankItem.from_word(word) for word in added], removed)
+        bank = Bank(IndexedDeposits(index), IndexedTableaus(index), {}, None, self.debug, index)
+        if self.scores is not None:
+            bank = bank.with_scores(self.scores, self.default_score)
+        return bank
+
     @staticmethod
     def matches(entry: BankItem, pattern: Pattern):
         assert isinstance(entry, BankItem), "entry must be a BankItem"
@@ -85,25 +173,67 @@ class Bank(object):
         """
         if not isinstance(pattern, tuple):
             pattern = tuple(pattern)
-        if self.pattern_registry_cap is not None and pattern.length() <= self.pattern_registry_cap:
+        if self.index is not None:
+            return self.index.count(pattern)
+        if self.pattern_registry_cap is not None and len(pattern) <= self.pattern_registry_cap:
             try:
                 pattern_matches = self.by_pattern[pattern]
                 return len(pattern_matches)
             except KeyError:  # implies zero words correspond to the pattern
                 return 0
+        matcher = self._long_pattern_matcher()
+        if matcher is not None:
+            return matcher.count(pattern)
         return uncountable
 
+    def count(self, pattern: Pattern) -> int:
+        """
+        Counts the number of bank deposits that match a pattern of any length,
+        without materializing the matching deposits.
+        @param pattern: pattern to match
+        @return: count of matching deposits
+        """
+        if not isinstance(pattern, tuple):
+            pattern = tuple(pattern)
+        if self.index is not None:
+            return self.index.count(pattern)
+        count = self.count_filter(pattern, uncountable=None)
+        if count is None:
+            count = sum(1 for _ in self.filter_slowly(pattern))
+        return count
+
     def filter(self, pattern: Pattern) -> Iterator[BankItem]:
         if not isinstance(pattern, tuple):
             pattern = tuple(pattern)
-        if self.pattern_registry_cap is not None and pattern.length() <= self.pattern_registry_cap:
+        if self.index is not None:
+            return self.index.filter(pattern)
+        if self.pattern_registry_cap is not None and len(pattern) <= self.pattern_registry_cap:
             try:
                 pattern_matches = self.by_pattern[pattern]
                 return pattern_matches.__iter__()
             except KeyError:  # implies zero words correspond to the pattern
                 return _EMPTY_SET.__iter__()
+        matcher = self._long_pattern_matcher()
+        if matcher is not None:
+            return matcher.filter(pattern)
         return self.filter_slowly(pattern)
 
+    def search(self, predicate: CanonicalPredicate) -> Iterator[BankItem]:
+        """
+        Finds the deposits whose renderings satisfy a predicate on canonical forms,
+        such as one created by Filters.canonical_wildcard or Filters.canonical_regex.
+        A predicate that accepts exactly the words of one length with certain letters
+        at certain positions, such as the wildcard '?A??E', is answered by the pattern
+        filter; any other predicate is applied to every deposit.
+        @param predicate: the predicate
+        @return: iterator over matching deposits
+        """
+        assert isinstance(predicate, CanonicalPredicate), "predicate must be a CanonicalPredicate"
+        pattern = pattern_of(predicate)
+        candidates = self.deposits if pattern is None else self.filter(pattern)
+        test = predicate.predicate
+        return filter(lambda entry: test(entry.rendering), candidates)
+
     def filter_slowly(self, pattern: Pattern) -> Iterator[BankItem]:
         """
         Returns an iterator that supplies items that match the pattern
@@ -120,30 +250,136 @@ class Bank(object):
             return list(iterator)
         return iterator
 
-    def suggest(self, state: FillState, answer_idx: int) -> Iterator[Suggestion]:
-        this_bank = self
+    def suggest(self, state: FillState, answer_idx: int, bucket_size: Optional[int]=None, orderer: Optional['LeastConstrainingValue']=None, rng: Optional[random.Random]=None) -> Iterator[Suggestion]:
+        """
+        Returns an iterator that supplies suggestions for filling an answer, highest rank first.
+
+        If a bucket size is specified, suggestions are produced lazily: matching words
+        are sorted by an upper bound on their rank that is cheap to compute (see
+        rank_bound), then evaluated bucket_size at a time, and each bucket is sorted
+        by rank before its suggestions are supplied. Words in a bucket are not
+        evaluated until the suggestions from earlier buckets have been consumed.
+        The bound is the rank a word's suggestion has unless the suggestion is
+        rejected, so the ordering is by rank except where bounds overestimate.
+
+        If a value orderer is specified, matching words are ranked by the orderer's
+        scores instead, and each word is evaluated only when its suggestion is
+        about to be supplied. The bucket size is then ignored.
+
+        If a random number generator is specified, matching words are shuffled
+        before they are ranked, so that words with equal rank are supplied in
+        random order.
+        @param state: the fill state
+        @param answer_idx: index of the answer to fill
+        @param bucket_size: number of words to evaluate at a time, or None to evaluate all at once
+        @param orderer: value orderer, such as a LeastConstrainingValue
+        @param rng: random number generator used to break ties between words
+        @return: iterator over suggestions
+        """
         answer: Answer = state.answers[answer_idx]
         matches: Iterator[BankItem] = self._explode(self.filter(answer.pattern))
         unused: Iterator[BankItem] = self._explode(filter(Bank.not_already_used_predicate(state.used), matches))
-        suggestions = []
-        for bank_item in unused:
-            legend_updates_ = answer.to_updates(bank_item)
-            def evaluator(candidate: Answer) -> int:
-                return this_bank.rank_candidate(state, candidate)
-            new_answers: AnswerChangeset = state.list_new_entries_using_updates(legend_updates_, answer_idx, True, evaluator)
-            if new_answers and new_answers.rank > 0:
-                new_entries_set: Set[Template] = set()
-                has_dupes = False
-                for a_idx, new_entry in new_answers.items():
-                    # test if new batch of entries contains duplicates
-                    if new_entry.content in new_entries_set:
-                        has_dupes = True
-                        break
-                    new_entries_set.add(new_entry.content)
-                if not has_dupes:
-                    suggestions.append(Suggestion(legend_updates_, new_answers, new_answers.rank))
-        suggestions.sort(key=lambda s: (0 if s.rank is None else s.rank), reverse=True)
-        return suggestions.__iter__()
+        if rng is not None:
+            unused = list(unused)
+            rng.shuffle(unused)
+        if orderer is not None:
+            return self._suggest_in_order(state, answer_idx, orderer.rank(state, answer_idx, unused))
+        if bucket_size is None:
+            suggestions = [self.evaluate(state, answer_idx, bank_item) for bank_item in unused]
+            suggestions = [s for s in suggestions if s is not None]
+            suggestions.sort(key=_SUGGESTION_RANK, reverse=True)
+            return suggestions.__iter__()
+        # sorting is stable, so words with equal bounds stay in filter (or shuffled) order
+        bounded = sorted(unused, key=self.rank_bound(state, answer_idx), reverse=True)
+        evaluations = map(lambda bank_item: self.evaluate(state, answer_idx, bank_item), bounded)
+        return Bank._sort_in_buckets(evaluations, bucket_size)
+
+    def rank_bound(self, state: FillState, answer_idx: int) -> Callable[[BankItem], float]:
+        """
+        Creates a function that gives an upper bound on the rank of the suggestion
+        that fills an answer with a word. The rank averages the counts of matches of
+        the new entries, and the bound uses, for each crossing answer, the count of
+        matches of its pattern with the word's letter in the shared cell. Those counts
+        are computed once per letter, so a bound costs a lookup per open cell. The
+        bound equals the rank unless the suggestion completes a word that is not in
+        the bank or crosses an answer in more than one cell.
+        @param state: the fill state
+        @param answer_idx: index of the answer to fill
+        @return: function of a matching word
+        """
+        answers = state.answers
+        num_candidates = 0
+        crossings: List[Tuple[int, Tuple[Tuple[int, int], ...]]] = []
+        for position, spot in enumerate(answers[answer_idx].content):
+            if Template.is_value_defined(spot):
+                continue
+            cell_crossings = []
+            for a_idx in state.crosses[spot]:
+                num_candidates += 1
+                if a_idx != answer_idx:
+                    cell_crossings.append((a_idx, answers[a_idx].content.index(spot)))
+            crossings.append((position, tuple(cell_crossings)))
+        # the answer itself is counted once per open cell, and it matches only the word
+        own_total = num_candidates - sum([len(cell_crossings) for _, cell_crossings in crossings])
+        counts: Dict[Tuple[int, int, str], int] = {}
+        def bound(bank_item: BankItem) -> float:
+            total = own_total
+            tableau = bank_item.tableau
+            for position, cell_crossings in crossings:
+                letter = tableau[position]
+                for a_idx, crossing_position in cell_crossings:
+                    key = a_idx, crossing_position, letter
+                    count = counts.get(key, None)
+                    if count is None:
+                        pattern = list(answers[a_idx].pattern)
+                        pattern[crossing_position] = letter
+                        count = self.count(Pattern(pattern))
+                        counts[key] = count
+                    total += count
+            return total / num_candidates if num_candidates else 0
+        return bound
+
+    def _suggest_in_order(self, state: FillState, answer_idx: int, scored: List[Tuple[int, BankItem]]) -> Iterator[Suggestion]:
+        for score, bank_item in scored:
+            suggestion = self.evaluate(state, answer_idx, bank_item)
+            if suggestion is not None:
+                suggestion.rank = score
+                yield suggestion
+
+    @staticmethod
+    def _sort_in_buckets(evaluations: Iterator[Optional[Suggestion]], bucket_size: int) -> Iterator[Suggestion]:
+        while True:
+            evaluated = list(itertools.islice(evaluations, bucket_size))
+            if not evaluated:
+                return
+            bucket = [s for s in evaluated if s is not None]
+            bucket.sort(key=_SUGGESTION_RANK, reverse=True)
+            yield from bucket
+
+    def evaluate(self, state: FillState, answer_idx: int, bank_item: BankItem) -> Optional[Suggestion]:
+        """
+        Creates a suggestion that fills an answer with a word. Whether the word
+        is already used in the state is not checked.
+        @param state: the fill state
+        @param answer_idx: index of the answer to fill
+        @param bank_item: the word
+        @return: the suggestion, or None if the word is not a viable fill
+        """
+        this_bank = self
+        legend_updates_ = state.answers[answer_idx].to_updates(bank_item)
+        rendering = bank_item.rendering
+        def evaluator(candidate: Answer) -> int:
+            return this_bank.rank_candidate(state, candidate, rendering)
+        new_answers: AnswerChangeset = state.list_new_entries_using_updates(legend_updates_, answer_idx, True, evaluator)
+        if new_answers and new_answers.rank > 0:
+            new_entries_set: Set[Template] = set()
+            for a_idx, new_entry in new_answers.items():
+                # test if new batch of entries contains duplicates
+                if new_entry.content in new_entries_set:
+                    return None
+                new_entries_set.add(new_entry.content)
+            return Suggestion(legend_updates_, new_answers, new_answers.rank)
+        return None
 
     @staticmethod
     def not_already_used_predicate(already_used: Collection[str]) -> Callable[[BankItem], bool]:
@@ -151,16 +387,23 @@ class Bank(object):
             return entry.rendering not in already_used
         return not_already_used
 
-    def rank_candidate(self, state: FillState, candidate: Answer) -> Optional[int]:
-        count = self.count_filter(candidate.pattern, uncountable=None)
-        if count is None:
-            return None
+    def rank_candidate(self, state: FillState, candidate: Answer, unchecked: Optional[str]=None) -> int:
+        """
+        Ranks a new entry by the number of words that match it.
+        @param state: the fill state
+        @param candidate: the new entry
+        @param unchecked: word that is not rejected for being already used, such as the word being evaluated
+        @return: the rank, or 0 if the entry cannot be completed with an unused word
+        """
+        count = self.count(candidate.pattern)
         if count == 0:
             return 0
         assert count > 0
         if candidate.content.is_complete():
-            if candidate.content in state.used:
-                return -1
+            # a word that is already used is not a viable fill
+            word = ''.join(candidate.content)
+            if word != unchecked and word in state.used:
+                return 0
             # suppress inspection because complete Template acts as a WordTuple
             # noinspection PyTypeChecker
             if not self.has_word(candidate.content):
@@ -171,23 +414,75 @@ class Bank(object):
         return entry in self.tableaus
 
     def __str__(self):
+        if self.index is not None:
+            return "Bank<num_words={},index={}>".format(len(self.deposits), self.index)
         return "Bank<num_words={},num_patterns_registered={}>".format(len(self.deposits), len(self.by_pattern))
 
 
+def read_scored_wordlist(pathname: str, separator: str=';') -> Dict[str, float]:
+    """
+    Reads a word list in which each line is a word, a separator and a score,
+    such as "KHAKI;50". Words are canonicalized, and if two words have the
+    same canonical form, the higher score is kept. Lines with a missing or
+    invalid score and words that cannot be canonicalized are skipped.
+    @param pathname: the word list
+    @param separator: separator between word and score
+    @return: map of canonical form to score
+    """
+    scores: Dict[str, float] = {}
+    with open(pathname, 'r') as ifile:
+        for line in ifile:
+            word, _, score_text = line.strip().rpartition(separator)
+            if not word.strip():
+                continue
+            try:
+                score = float(score_text)
+            except ValueError:
+                continue
+            try:
+                canonical = Puzzeme.create(word).canonical
+            except puzzicon.InvalidPuzzemeException:
+                continue
+            if canonical not in scores or score > scores[canonical]:
+                scores[canonical] = score
+    return scores
+
+
 # noinspection PyMethodMayBeStatic
 class BankSerializer(object):
 
+    """
+    Writes and reads banks. A bank with an index and no scores is written in the memory-mapped
+    format of the bankfile module unless mapped is false; other banks are pickled.
+    Reading detects the format.
+    """
+
+    def __init__(self, mapped: bool=True):
+        self.mapped = mapped
+
+    def _is_mappable(self, bank: Bank) -> bool:
+        from puzzicle.puzzicon.fill import bankfile
+        return self.mapped and bank.scores is None and bankfile.is_mappable(bank)
+
     def serialize(self, bank: Bank, ofile: BinaryIO):
-        pickle.dump(bank, ofile)
+        if self._is_mappable(bank):
+            from puzzicle.puzzicon.fill import bankfile
+            bankfile.write_bank(bank, ofile)
+        else:
+            pickle.dump(bank, ofile)
 
     def serialize_to_file(self, bank: Bank, pathname: str):
         with open(pathname, 'wb') as ofile:
             self.serialize(bank, ofile)
 
     def deserialize(self, ifile: BinaryIO) -> Bank:
+        """Reads a pickled bank. Use deserialize_from_file to read either format."""
         return pickle.load(ifile)
 
     def deserialize_from_file(self, pathname: str) -> Bank:
+        from puzzicle.puzzicon.fill import bankfile
+        if bankfile.is_bank_file(pathname):
+            return bankfile.read_bank(pathname)
         with open(pathname, 'rb') as ifile:
             return self.deserialize(ifile)
 
@@ -199,8 +494,107 @@ _DEFAULT_WORDLIST_PATHNAME = '/usr/share/dict/words'
 def _CANONICAL_XFORM(puzzeme_set: Set[Puzzeme]):
     return [p.canonical for p in puzzeme_set]
 
+
+class CacheManifest(object):
+
+    """
+    Record, stored as JSON in a cache directory, of the content hash of each
+    word list file along with the size, modification time and inode the file
+    had when it was hashed, so that a file is only hashed again if one of
+    those changes. The manifest also records, for each bank tag, the hash
+    of the word list the most recent bank was built from.
+    """
+
+    FILENAME = 'manifest.json'
+
+    def __init__(self, cache_dir: str):
+        self.pathname = os.path.join(cache_dir, CacheManifest.FILENAME)
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.banks: Dict[str, str] = {}
+        try:
+            with open(self.pathname, 'r') as ifile:
+                content = json.load(ifile)
+            self.files = content.get('files', {})
+            self.banks = content.get('banks', {})
+        except FileNotFoundError:
+            pass
+        except ValueError:
+            _log.warning("ignoring corrupt cache manifest %s", self.pathname)
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.pathname), exist_ok=True)
+        temp_pathname = self.pathname + '.tmp'
+        with open(temp_pathname, 'w') as ofile:
+            json.dump({'files': self.files, 'banks': self.banks}, ofile, indent=1)
+        os.replace(temp_pathname, self.pathname)
+
+    def hash_file(self, pathname: str) -> str:
+        """
+        Returns the SHA-256 hash of a file's content, computing it only if the
+        file's size, modification time or inode differ from when it was last hashed.
+        @param pathname: the file
+        @return: hex digest
+        """
+        pathname = os.path.abspath(pathname)
+        stat = os.stat(pathname)
+        fingerprint = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'inode': stat.st_ino}
+        entry = self.files.get(pathname, None)
+        if entry is not None and all([entry.get(k, None) == v for k, v in fingerprint.items()]):
+            return entry['sha256']
+        digest = _hash_file(pathname)
+        fingerprint['sha256'] = digest
+        self.files[pathname] = fingerprint
+        self.save()
+        return digest
+
+
+def _hash_file(pathname: str) -> str:
+    h = hashlib.sha256()
+    with open(pathname, 'rb') as ifile:
+        for chunk in iter(lambda: ifile.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _read_canonicals(wordlist_pathname: str, known: Dict[str, str]) -> Dict[str, str]:
+    """
+    Reads a word list, returning a map of each valid cleaned line to its canonical form.
+    Lines present in the known map are not canonicalized again. Blank lines
+    and lines that have no canonical form are skipped.
+    """
+    canonicals = {}
+    # noinspection PyProtectedMember
+    cleaner = puzzicon._standard_cleaner  # the cleaner used by read_puzzeme_set
+    with open(wordlist_pathname, 'r') as ifile:
+        for lineno, line in enumerate(ifile, 1):
+            line = cleaner(line)
+            canonical = known.get(line, None)
+            if canonical is None:
+                if not line.strip():
+                    continue
+                try:
+                    canonical = Puzzeme.create(line).canonical
+                except puzzicon.InvalidPuzzemeException as e:
+                    _log.debug("skipping line %s of %s: %s", lineno, wordlist_pathname, e)
+                    continue
+            canonicals[line] = canonical
+    return canonicals
+
+
 class BankLoader(object):
 
+    """
+    Loader of banks built from word list files, optionally caching them.
+
+    With a cache directory, a bank is written there after it is built, named
+    by the tag and the hash of the word list. Hashes are kept in a
+    CacheManifest so that an unchanged file is not read to find its bank.
+    If the loader uses the default puzzeme set transform, the canonical form
+    of each line is also cached, and when a word list changes, the bank most
+    recently built for the same tag and file is updated with the words that
+    were added and removed instead of being built again from scratch.
+    """
+
     def __init__(self, cache_dir: Optional[str]=None, tag: Optional[str]=None, max_word_length: Optional[int]=None, puzzeme_set_transform: Callable[[Set[Puzzeme]], Set[str]]=_CANONICAL_XFORM):
         self.cache_dir = cache_dir
         self.tag = tag
@@ -212,29 +606,125 @@ class BankLoader(object):
     def get_default_cache_dir():
         return os.path.join(os.getenv('HOME'), '.local', 'share', 'puzzicon', 'wordbank')
 
-    def _construct_filename(self, wordlist_pathname) -> str:
+    def _safe_tag(self) -> str:
         tag = str(self.tag or 'default')
-        tag = ''.join([ch if ch in _FILENAME_SAFE_CHARS else '_' for ch in tag])
-        h = hashlib.sha256()
-        with open(wordlist_pathname, 'rb') as ifile:
-            h.update(ifile.read())
-        basename = h.hexdigest()
-        return "bank-{}-{}.pickle".format(tag, basename)
+        return ''.join([ch if ch in _FILENAME_SAFE_CHARS else '_' for ch in tag])
+
+    def _hash_wordlist(self, wordlist_pathname: str) -> str:
+        if self.cache_dir is None:
+            return _hash_file(wordlist_pathname)
+        return CacheManifest(self.cache_dir).hash_file(wordlist_pathname)
+
+    def _construct_filename(self, wordlist_pathname) -> str:
+        return self._bank_filename(self._hash_wordlist(wordlist_pathname))
+
+    def _bank_filename(self, wordlist_hash: str) -> str:
+        return "bank-{}-{}.bank".format(self._safe_tag(), wordlist_hash)
+
+    def _bank_key(self, wordlist_pathname: str) -> str:
+        return "{}:{}:{}".format(self._safe_tag(), self.max_word_length, os.path.abspath(wordlist_pathname))
+
+    def _canonicals_pathname(self, wordlist_hash: str) -> str:
+        return os.path.join(self.cache_dir, "canonicals-{}.json".format(wordlist_hash))
+
+    def _supports_delta(self) -> bool:
+        return self.cache_dir is not None and self.puzzeme_set_transform is _CANONICAL_XFORM
+
+    def _accept_length(self, canonical: str) -> bool:
+        return self.max_word_length is None or len(canonical) <= self.max_word_length
 
     def load_fresh(self, wordlist_pathname=_DEFAULT_WORDLIST_PATHNAME):
         puzzemes = puzzicon.read_puzzeme_set(wordlist_pathname)
+        if self._supports_delta():
+            canonicals = {}
+            for puzzeme in puzzemes:
+                for rendering in puzzeme.renderings:
+                    canonicals[rendering] = puzzeme.canonical
+            self._save_canonicals(wordlist_pathname, canonicals)
         if self.max_word_length is not None:
             puzzemes = filter(lambda p: len(p.canonical) <= self.max_word_length, puzzemes)
         strings = self.puzzeme_set_transform(puzzemes)
-        bank = Bank.with_registry(strings, debug=self.debug_bank)
-        serializer = BankSerializer()
+        bank = Bank.with_index(strings, debug=self.debug_bank)
         if self.cache_dir is not None:
-            bank_pathname = self.get_cached_bank_pathname(wordlist_pathname)
-            os.makedirs(os.path.dirname(bank_pathname), exist_ok=True)
-            serializer.serialize_to_file(bank, bank_pathname)
-            _log.debug("bank written to %s", bank_pathname)
+            self._save_bank(wordlist_pathname, bank)
         return bank
 
+    def _save_canonicals(self, wordlist_pathname: str, canonicals: Dict[str, str]):
+        pathname = self._canonicals_pathname(self._hash_wordlist(wordlist_pathname))
+        os.makedirs(os.path.dirname(pathname), exist_ok=True)
+        with open(pathname, 'w') as ofile:
+            # json.dumps uses the C encoder; json.dump to a file does not
+            ofile.write(json.dumps(canonicals))
+
+    def _save_bank(self, wordlist_pathname: str, bank: 'Bank'):
+        bank_pathname = self.get_cached_bank_pathname(wordlist_pathname)
+        os.makedirs(os.path.dirname(bank_pathname), exist_ok=True)
+        BankSerializer().serialize_to_file(bank, bank_pathname)
+        _log.debug("bank written to %s", bank_pathname)
+        if self._supports_delta():
+            manifest = CacheManifest(self.cache_dir)
+            bank_key = self._bank_key(wordlist_pathname)
+            previous_hash = manifest.banks.get(bank_key, None)
+            wordlist_hash = manifest.hash_file(wordlist_pathname)
+            manifest.banks[bank_key] = wordlist_hash
+            manifest.save()
+            if previous_hash is not None and previous_hash != wordlist_hash:
+                self._remove_unreferenced(manifest, previous_hash)
+
+    def _remove_unreferenced(self, manifest: CacheManifest, wordlist_hash: str):
+        """
+        Removes the cached bank and canonical forms built from a word list with
+        a given hash, unless the manifest still refers to them. A bank file is
+        shared by the entries with the same tag, and a canonical forms file by
+        all entries.
+        """
+        tag = self._safe_tag()
+        pathnames = []
+        if not any([key.split(':', 1)[0] == tag and h == wordlist_hash for key, h in manifest.banks.items()]):
+            pathnames.append(os.path.join(self.cache_dir, self._bank_filename(wordlist_hash)))
+        if wordlist_hash not in manifest.banks.values():
+            pathnames.append(self._canonicals_pathname(wordlist_hash))
+        for pathname in pathnames:
+            try:
+                os.remove(pathname)
+                _log.debug("removed %s", pathname)
+            except FileNotFoundError:
+                pass
+
+    def load_delta(self, wordlist_pathname: str) -> Optional[Bank]:
+        """
+        Updates the bank most recently cached for the same tag and word list
+        file with the words added to and removed from the list since then.
+        The files of the previous bank are removed once the updated bank is
+        cached, and the updated bank is read from its cache file.
+        @param wordlist_pathname: the word list
+        @return: the updated bank, or None if no previous bank and canonical forms are cached
+        """
+        if not self._supports_delta():
+            return None
+        previous_hash = CacheManifest(self.cache_dir).banks.get(self._bank_key(wordlist_pathname), None)
+        if previous_hash is None:
+            return None
+        previous_bank_pathname = os.path.join(self.cache_dir, self._bank_filename(previous_hash))
+        try:
+            with open(self._canonicals_pathname(previous_hash), 'r') as ifile:
+                previous_canonicals: Dict[str, str] = json.load(ifile)
+            previous_bank = BankSerializer().deserialize_from_file(previous_bank_pathname)
+        except FileNotFoundError:
+            return None
+        if previous_bank.index is None:
+            return None
+        canonicals = _read_canonicals(wordlist_pathname, previous_canonicals)
+        previous_words = set(filter(self._accept_length, previous_canonicals.values()))
+        words = set(filter(self._accept_length, canonicals.values()))
+        added, removed = words - previous_words, previous_words - words
+        _log.debug("applying %s additions and %s removals to %s", len(added), len(removed), previous_bank_pathname)
+        bank = previous_bank.with_changes(added, removed)
+        self._save_canonicals(wordlist_pathname, canonicals)
+        self._save_bank(wordlist_pathname, bank)
+        # the updated bank shares unchanged buckets with the previous bank's file, which is now removed
+        return BankSerializer().deserialize_from_file(self.get_cached_bank_pathname(wordlist_pathname))
+
     def get_cached_bank_pathname(self, wordlist_pathname: str) -> str:
         assert self.cache_dir, "cache directory must be defined for this loader"
         return os.path.join(self.cache_dir, self._construct_filename(wordlist_pathname))
@@ -249,4 +739,7 @@ class BankLoader(object):
                 return bank
             except FileNotFoundError:
                 pass
+            bank = self.load_delta(wordlist_pathname)
+            if bank is not None:
+                return bank
         return self.load_fresh(wordlist_pathname)
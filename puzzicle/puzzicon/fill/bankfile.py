@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Binary bank file format that is opened with mmap instead of being unpickled.
+
+The file starts with a header and a table with one record per word length.
+Each record points to the words of that length, sorted and stored as
+fixed-width characters (Latin-1 if possible, otherwise UTF-32), and to a
+table of postings. A posting maps a (position, letter) pair to the number
+of words that have the letter at the position and to a bitset over those
+words, stored as little-endian bytes. All integers are little-endian.
+"""
+
+import logging
+import mmap
+import os
+import struct
+from collections import abc
+from typing import BinaryIO, Dict, Iterator, List, Tuple
+
+from puzzicle.puzzicon.fill import BankItem
+from puzzicle.puzzicon.fill.bank import Bank
+from puzzicle.puzzicon.fill.index import BitsetIndex, LengthBucket, PackedWords, IndexedDeposits, IndexedTableaus
+
+_log = logging.getLogger(__name__)
+MAGIC = b'PZBANK01'
+_HEADER = struct.Struct('<8sI')         # magic, number of length records
+_LENGTH_RECORD = struct.Struct('<IIIQQ')  # word length, number of words, bytes per character, words offset, postings offset
+_COUNT = struct.Struct('<I')
+_POSTING = struct.Struct('<IIIQ')       # position, letter code point, number of words, bitset offset
+_ENCODINGS = {1: 'latin-1', 4: 'utf-32-le'}
+
+
+def is_mappable(bank: Bank) -> bool:
+    """
+    Checks whether a bank can be written in this format. The bank must have an index,
+    and each item must be a word whose letters are single characters and whose only
+    constituent is itself.
+    """
+    if bank.index is None:
+        return False
+    for bucket in bank.index.buckets.values():
+        if isinstance(bucket.items, PackedWords):
+            continue
+        for item in bucket.items:
+            if len(item.rendering) != bucket.length or item.constituents != {item.rendering}:
+                return False
+    return True
+
+
+def _encode(renderings: str) -> Tuple[int, bytes]:
+    try:
+        return 1, renderings.encode(_ENCODINGS[1])
+    except UnicodeEncodeError:
+        return 4, renderings.encode(_ENCODINGS[4])
+
+
+def write_bank(bank: Bank, ofile: BinaryIO):
+    """
+    Writes a bank in this format.
+    @param bank: a bank for which is_mappable returns true
+    @param ofile: output stream
+    """
+    assert bank.index is not None, "bank must have an index"
+    buckets: List[LengthBucket] = [bank.index.buckets[length] for length in sorted(bank.index.buckets)]
+    offset = _HEADER.size + _LENGTH_RECORD.size * len(buckets)
+    records, chunks = [], []
+    for bucket in buckets:
+        width, encoded = _encode(''.join(bucket.renderings()))
+        words_offset = offset
+        chunks.append(encoded)
+        num_bytes = (bucket.size() + 7) // 8
+        postings = [(position, letter, mask) for position, masks in enumerate(bucket.masks) for letter, mask in masks.items()]
+        postings_offset = words_offset + len(encoded)
+        bits_offset = postings_offset + _COUNT.size + _POSTING.size * len(postings)
+        chunks.append(_COUNT.pack(len(postings)))
+        for i, (position, letter, _) in enumerate(postings):
+            chunks.append(_POSTING.pack(position, ord(letter), bucket.histogram[position][letter], bits_offset + i * num_bytes))
+        for _, _, mask in postings:
+            chunks.append(mask.to_bytes(num_bytes, 'little'))
+        offset = bits_offset + num_bytes * len(postings)
+        records.append(_LENGTH_RECORD.pack(bucket.length, bucket.size(), width, words_offset, postings_offset))
+    ofile.write(_HEADER.pack(MAGIC, len(buckets)))
+    for chunk in records:
+        ofile.write(chunk)
+    for chunk in chunks:
+        ofile.write(chunk)
+
+
+class _MappedFile(object):
+
+    """
+    Read-only memory map of a file that is mapped again, rather than copied, when unpickled.
+    The map is closed by close() or when the object is garbage-collected.
+    """
+
+    def __init__(self, pathname: str):
+        self.pathname = pathname
+        with open(pathname, 'rb') as ifile:
+            self.mapping = mmap.mmap(ifile.fileno(), 0, access=mmap.ACCESS_READ)
+        self.view = memoryview(self.mapping)
+
+    def __getstate__(self):
+        return {'pathname': self.pathname}
+
+    def __setstate__(self, state):
+        self.__init__(state['pathname'])
+
+    def __del__(self):
+        self.close()
+
+    def close(self):
+        view = self.__dict__.pop('view', None)
+        if view is not None:
+            view.release()
+            self.mapping.close()
+
+
+class _MappedWords(abc.Sequence):
+
+    """Sequence of bank items decoded on demand from fixed-width words in a mapped file."""
+
+    def __init__(self, mapped: _MappedFile, offset: int, length: int, size: int, width: int):
+        self.mapped = mapped
+        self.offset = offset
+        self.length = length
+        self.size = size
+        self.width = width
+        self.encoding = _ENCODINGS[width]
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, i: int) -> BankItem:
+        if i < 0:
+            i += self.size
+        if not 0 <= i < self.size:
+            raise IndexError("index out of range")
+        stride = self.length * self.width
+        start = self.offset + i * stride
+        return BankItem.from_word(self.mapped.mapping[start:start + stride].decode(self.encoding))
+
+    def __iter__(self) -> Iterator[BankItem]:
+        end = self.offset + self.size * self.length * self.width
+        renderings = self.mapped.mapping[self.offset:end].decode(self.encoding)
+        length = self.length
+        for start in range(0, len(renderings), length):
+            yield BankItem.from_word(renderings[start:start + length])
+
+
+class _MappedMasks(abc.Mapping):
+
+    """
+    Bitsets of the words that have each letter at one position of a length
+    bucket. A bitset is read from the mapped file each time it is accessed
+    and is not kept, so the bitsets stay in pages that are shared by the
+    processes that map the file.
+    """
+
+    def __init__(self, mapped: _MappedFile, num_bytes: int):
+        self.mapped = mapped
+        self.num_bytes = num_bytes
+        self.offsets: Dict[str, int] = {}
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.offsets)
+
+    def __contains__(self, letter):
+        return letter in self.offsets
+
+    def __getitem__(self, letter: str) -> int:
+        start = self.offsets[letter]
+        return int.from_bytes(self.mapped.view[start:start + self.num_bytes], 'little')
+
+    def get(self, letter: str, default=None):
+        start = self.offsets.get(letter, None)
+        if start is None:
+            return default
+        return int.from_bytes(self.mapped.view[start:start + self.num_bytes], 'little')
+
+
+class MappedBucket(LengthBucket):
+
+    """
+    Length bucket whose words and bitsets stay in a mapped file. Counts of
+    patterns with at most one letter are answered from the posting table;
+    bitsets are read from the file as they are needed.
+    """
+
+    # noinspection PyMissingConstructor
+    def __init__(self, mapped: _MappedFile, length: int, size: int, width: int, words_offset: int, postings_offset: int):
+        self.length = length
+        self.items = _MappedWords(mapped, words_offset, length, size, width)
+        self.full = (1 << size) - 1
+        self.mapped = mapped
+        mapping = mapped.mapping
+        num_postings, = _COUNT.unpack_from(mapping, postings_offset)
+        masks = tuple([_MappedMasks(mapped, (size + 7) // 8) for _ in range(length)])
+        histogram: Tuple[Dict[str, int], ...] = tuple([{} for _ in range(length)])
+        for i in range(num_postings):
+            position, code_point, count, bits_offset = _POSTING.unpack_from(mapping, postings_offset + _COUNT.size + i * _POSTING.size)
+            letter = chr(code_point)
+            masks[position].offsets[letter] = bits_offset
+            histogram[position][letter] = count
+        self.masks = masks
+        self.histogram = histogram
+
+
+def read_bank(pathname: str, debug: bool=False) -> Bank:
+    """
+    Opens a bank file in this format. The file is mapped into memory, so
+    processes that open the same file share its pages, and nothing is
+    decoded until it is used. The file stays mapped until the bank is
+    garbage-collected.
+    @param pathname: pathname of the file
+    @param debug: debug flag for the bank
+    @return: the bank
+    """
+    mapped = _MappedFile(pathname)
+    mapping = mapped.mapping
+    magic, num_records = _HEADER.unpack_from(mapping, 0)
+    if magic != MAGIC:
+        raise ValueError("not a bank file: " + pathname)
+    buckets = {}
+    for i in range(num_records):
+        length, size, width, words_offset, postings_offset = _LENGTH_RECORD.unpack_from(mapping, _HEADER.size + i * _LENGTH_RECORD.size)
+        buckets[length] = MappedBucket(mapped, length, size, width, words_offset, postings_offset)
+    index = BitsetIndex(buckets)
+    return Bank(IndexedDeposits(index), IndexedTableaus(index), {}, None, debug, index)
+
+
+def is_bank_file(pathname: str) -> bool:
+    if os.path.getsize(pathname) < len(MAGIC):
+        return False
+    with open(pathname, 'rb') as ifile:
+        return ifile.read(len(MAGIC)) == MAGIC
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import gzip
+import itertools
+import logging
+import os
+import pickle
+import time
+from typing import Any, Dict, FrozenSet, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from puzzicle.puzzicon.fill import BankItem, Suggestion, WordTuple
+from puzzicle.puzzicon.fill.decompose import Decomposition
+from puzzicle.puzzicon.fill.filler import Filler, FillListener, FillSearch, FillStateNode, FirstCompleteListener, _Frame
+from puzzicle.puzzicon.fill.nogood import NogoodCache
+from puzzicle.puzzicon.fill.state import FillState
+
+_log = logging.getLogger(__name__)
+_DEFAULT_NODE_INTERVAL = 1000
+_DEFAULT_DURATION_INTERVAL = 60.0
+_COMPRESS_LEVEL = 1
+
+# A suggestion is saved as the word it puts in the answer being filled,
+# with its rank, or as itself if it does not fill a single answer.
+_SavedSuggestion = Union[Tuple[Union[str, Tuple[str, ...]], Optional[float]], Suggestion]
+
+
+class FrameRecord(NamedTuple):
+
+    suggestion: Optional[_SavedSuggestion]     # suggestion that produced the frame's node from the previous frame's
+    answer_idx: Optional[int]                  # answer whose suggestions are being explored
+    num_answers: int                           # number of answers taken from the frame's answer iterator
+    num_suggestions: int                       # number of suggestions taken for the current answer
+    answers_rng_state: Optional[Any]           # random state when the answer iterator was created
+    suggestions_rng_state: Optional[Any]       # random state when the suggestion iterator was created
+    decomposition: Optional[Decomposition]
+    conflicts: FrozenSet[int]
+    solved: bool
+    decomposable: bool
+
+
+class Checkpoint(NamedTuple):
+
+    """
+    Saved progress of a search. Frames hold the suggestions that lead from the
+    root state to their nodes and the numbers of answers and suggestions that
+    have been taken from their iterators. Nodes are recreated by applying the
+    suggestions in turn, and iterators by creating them again, with the random
+    states they were created with, and skipping the items already taken. The
+    size of a checkpoint therefore depends only on the depth of the search, and
+    the search itself is not changed by capturing it.
+    """
+
+    root: FillState
+    frames: Tuple[FrameRecord, ...]
+    next_suggestion: Optional[_SavedSuggestion]    # suggestion for a child of the last frame that is yet to be visited
+    outcome: Optional[bool]
+    levels_skipped: int
+    nogoods: Optional[NogoodCache]
+    rng_state: Optional[Any]
+    progress: Dict[str, Any]
+
+    def is_finished(self) -> bool:
+        return self.outcome is not None
+
+    @staticmethod
+    def capture(search: FillSearch) -> 'Checkpoint':
+        """
+        Captures the progress of a search that is paused or finished.
+        @param search: the search
+        @return: the checkpoint
+        """
+        frames: List[FrameRecord] = []
+        previous: Optional[_Frame] = None
+        for frame in search.stack:
+            saved = None if previous is None else _save(frame.suggestion, previous.answer_idx)
+            frames.append(FrameRecord(saved, frame.answer_idx, frame.num_answers, frame.num_suggestions,
+                                      frame.answers_rng_state, frame.suggestions_rng_state, frame.decomposition,
+                                      frozenset(frame.conflicts), frame.solved, frame.node.decomposable))
+            previous = frame
+        if search.stack:
+            root = search.stack[0].node.state
+            next_suggestion = None if search._next is None else _save(search._next_suggestion, previous.answer_idx)
+        else:
+            root = search._next.state if search._next is not None else None
+            next_suggestion = None
+        filler = search.filler
+        rng_state = None if filler.rng is None else filler.rng.getstate()
+        return Checkpoint(root, tuple(frames), next_suggestion, search.outcome, search.levels_skipped,
+                          filler.nogoods, rng_state, search.listener.progress())
+
+    def restore(self, filler: Filler, listener: FillListener) -> FillSearch:
+        """
+        Recreates a search from a checkpoint. The filler must have the same bank
+        and settings as the filler of the search that was captured. Its random
+        number generator, if it has one, is set to the captured state, and
+        its nogood cache, if it has one, is replaced by the captured cache.
+        The listener is restored from the captured progress.
+        @param filler: the filler
+        @param listener: the listener
+        @return: the search, ready to be run
+        """
+        if filler.nogoods is not None and self.nogoods is not None:
+            filler.nogoods = self.nogoods
+        listener.restore(self.progress)
+        search = filler.search(self.root, listener)
+        search.outcome = self.outcome
+        search.levels_skipped = self.levels_skipped
+        if self.frames:
+            search._next = None
+        parent: Optional[FillStateNode] = None
+        parent_answer_idx: Optional[int] = None
+        for level, record in enumerate(self.frames):
+            if parent is None:
+                node, suggestion = FillStateNode(self.root), None
+            else:
+                suggestion = _load(filler, parent.state, parent_answer_idx, record.suggestion)
+                node = _recreate(filler, parent, suggestion)
+            node.decomposable = record.decomposable
+            if filler.selector is not None and record.decomposition is None:
+                previous = parent.slot_counts if parent is not None else None
+                node.slot_counts = filler.selector.count(node.state, previous, suggestion, node.domains)
+            frame = _Frame(node, suggestion)
+            frame.decomposition = record.decomposition
+            frame.conflicts = set(record.conflicts)
+            frame.solved = record.solved
+            if filler.rng is not None and record.answers_rng_state is not None:
+                filler.rng.setstate(record.answers_rng_state)
+            search._branch(frame)
+            frame.num_answers = _skip(frame.answer_indexes, record.num_answers)
+            if record.answer_idx is not None:
+                if filler.rng is not None and record.suggestions_rng_state is not None:
+                    filler.rng.setstate(record.suggestions_rng_state)
+                search._suggest(frame, record.answer_idx)
+            frame.num_suggestions = _skip(frame.suggestions, record.num_suggestions)
+            if filler.backjumping and suggestion is not None:
+                for grid_idx in suggestion.legend_updates:
+                    search._cell_levels[grid_idx] = level
+            search.stack.append(frame)
+            parent, parent_answer_idx = node, record.answer_idx
+        if self.next_suggestion is not None:
+            next_suggestion = _load(filler, parent.state, parent_answer_idx, self.next_suggestion)
+            search._next = _recreate(filler, parent, next_suggestion)
+            search._next_suggestion = next_suggestion
+        if filler.rng is not None and self.rng_state is not None:
+            filler.rng.setstate(self.rng_state)
+        return search
+
+
+def _skip(iterator: Iterator, count: int) -> int:
+    """Takes count items from an iterator that was created again, which must supply at least that many."""
+    skipped = sum(1 for _ in itertools.islice(iterator, count))
+    assert skipped == count, "checkpoint does not match filler"
+    return skipped
+
+
+def _save(suggestion: Suggestion, answer_idx: Optional[int]) -> _SavedSuggestion:
+    if answer_idx is None:
+        return suggestion
+    pattern = suggestion.new_entries[answer_idx].pattern
+    word = ''.join(pattern)
+    # a tuple is kept only if some cell holds more than one letter
+    return (word if len(word) == len(pattern) else tuple(pattern)), suggestion.rank
+
+
+def _load(filler: Filler, state: FillState, answer_idx: Optional[int], saved: _SavedSuggestion) -> Suggestion:
+    if answer_idx is None:
+        return saved
+    word, rank = saved
+    suggestion = filler.bank.evaluate(state, answer_idx, BankItem.create(WordTuple(word)))
+    assert suggestion is not None, "checkpoint does not match bank"
+    suggestion.rank = rank
+    return suggestion
+
+
+def _recreate(filler: Filler, parent: FillStateNode, suggestion: Suggestion) -> FillStateNode:
+    node = FillStateNode(parent.state.advance(suggestion), parent)
+    if filler.propagator is not None:
+        node.domains = filler.propagator.propagate(node.state, parent.domains)
+    return node
+
+
+def save_checkpoint(checkpoint: Checkpoint, pathname: str):
+    """Writes a checkpoint to a file, replacing the file only once the checkpoint is completely written."""
+    temp_pathname = pathname + '.tmp'
+    with gzip.open(temp_pathname, 'wb', compresslevel=_COMPRESS_LEVEL) as ofile:
+        pickle.dump(checkpoint, ofile, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temp_pathname, pathname)
+
+
+def load_checkpoint(pathname: str) -> Checkpoint:
+    with gzip.open(pathname, 'rb') as ifile:
+        return pickle.load(ifile)
+
+
+class CheckpointingFiller(object):
+
+    """
+    Filler that saves the progress of its search to a file at intervals, so that
+    a fill interrupted by the end of the process can be resumed from the last
+    checkpoint. The search is run node_interval nodes at a time, and progress is
+    saved after each run if duration_interval seconds have passed since it was
+    last saved (or after every run if duration_interval is None), and when the
+    search is finished. Nodes are visited exactly as they would be by the filler
+    alone. Between checkpoints, the search counts the answers and suggestions
+    it takes from each frame, and if the filler has a random number generator,
+    it keeps the generator's state whenever it creates one of a frame's
+    iterators. Saving takes time in proportion to the size of the nogood cache.
+
+    A checkpoint holds the search stack, the filler's nogood cache and the
+    state of its random number generator, and the listener's progress. The
+    bank is not saved; the search must be resumed with a filler that has the
+    same bank and settings. Resuming creates each frame's iterators again and
+    skips the items already taken, so it takes as long as creating the
+    suggestions of every frame on the stack again.
+    """
+
+    def __init__(self, filler: Filler, pathname: str, node_interval: int=_DEFAULT_NODE_INTERVAL, duration_interval: Optional[float]=_DEFAULT_DURATION_INTERVAL):
+        assert node_interval > 0, "node interval must be positive"
+        self.filler = filler
+        self.pathname = pathname
+        self.node_interval = node_interval
+        self.duration_interval = duration_interval
+        self.checkpoints = 0
+
+    def fill(self, state: FillState, listener: FillListener=None) -> FillListener:
+        listener = listener or FirstCompleteListener()
+        return self._run(self.filler.search(state, listener))
+
+    def resume(self, listener: FillListener=None) -> FillListener:
+        """
+        Resumes the search saved in the file.
+        @param listener: listener for the resumed search, of the same type as the original
+        @return: the listener
+        """
+        listener = listener or FirstCompleteListener()
+        checkpoint = load_checkpoint(self.pathname)
+        _log.debug("resuming from checkpoint with %s frames after %s nodes", len(checkpoint.frames), checkpoint.progress['count'])
+        return self._run(checkpoint.restore(self.filler, listener))
+
+    def _run(self, search: FillSearch) -> FillListener:
+        saved = time.perf_counter()
+        while not search.run(max_nodes=self.node_interval):
+            if self.duration_interval is None or time.perf_counter() - saved >= self.duration_interval:
+                self.save(search)
+                saved = time.perf_counter()
+        self.save(search)
+        return search.listener
+
+    def save(self, search: FillSearch):
+        save_checkpoint(Checkpoint.capture(search), self.pathname)
+        self.checkpoints += 1
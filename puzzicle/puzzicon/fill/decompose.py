@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import copy
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple, Dict, List, Optional, Set, Tuple
+
+from puzzicle.puzzicon.fill import Answer, Suggestion, Template
+from puzzicle.puzzicon.fill.filler import Filler, FillListener, FirstCompleteListener
+from puzzicle.puzzicon.fill.nogood import NogoodCache
+from puzzicle.puzzicon.fill.state import FillState, components
+
+_log = logging.getLogger(__name__)
+_DEFAULT_MIN_PARALLEL_ANSWERS = 4
+
+# set in each worker process by _initialize_worker
+_worker_filler: Optional[Filler] = None
+
+
+def _component_state(state: FillState, component: Tuple[int, ...], fixed: List[Answer]) -> FillState:
+    """
+    Creates a state whose incomplete answers are those of a component. The
+    component's answers come first, followed by the complete answers of the
+    state and the given fixed answers, whose words are then unavailable.
+    """
+    answers = [state.answers[a_idx] for a_idx in component]
+    answers += [answer for answer in state.answers if answer.is_complete()]
+    answers += fixed
+    return FillState.from_answers(tuple(answers), (1, len(state.crosses)))
+
+
+def _fill_component(filler: Filler, state: FillState, thresholds: Tuple[Optional[int], Optional[float]]) -> Tuple[Optional[FillState], int, bool]:
+    """
+    Searches for a fill of a component's state with a copy of a filler that
+    has no tracer and its own nogood cache, because the answer indexes of the
+    component's state differ from those of the grid.
+    @return: the complete state, if found; the number of nodes visited; and whether the search
+    finished, rather than being stopped by the node or duration threshold
+    """
+    component_filler = copy.copy(filler)
+    component_filler.tracer = None
+    if filler.nogoods is not None:
+        component_filler.nogoods = NogoodCache(filler.nogoods.capacity)
+    listener = FirstCompleteListener(*thresholds)
+    search = component_filler.search(state, listener)
+    search.run()
+    finished = listener.value() is not None or not search.is_stopped()
+    return listener.value(), listener.count, finished
+
+
+def _initialize_worker(filler: Filler):
+    global _worker_filler
+    _worker_filler = copy.copy(filler)
+    _worker_filler.decomposer = Decomposer()
+
+
+def _fill_component_in_worker(state: FillState, thresholds: Tuple[Optional[int], Optional[float]]) -> Tuple[Optional[FillState], int, bool]:
+    return _fill_component(_worker_filler, state, thresholds)
+
+
+class Decomposition(NamedTuple):
+
+    components: List[Tuple[int, ...]]      # groups of answer indexes that share no open cells
+    suggestion: Optional[Suggestion]       # suggestion that fills every group, if their fills could be combined
+    unfillable: bool                       # true iff some group cannot be filled
+
+
+class Decomposer(object):
+
+    """
+    Search stage that splits a state whose incomplete answers form separate
+    groups, connected only through open cells, into one problem per group.
+
+    A filler with a decomposer checks each state it visits. If the state has
+    more than one group, each group is searched for a fill on its own, with
+    the words of the complete answers unavailable. If some group cannot be
+    filled, neither can the state, and no other group's fill is revisited.
+    Otherwise the fills are combined into a single suggestion that completes
+    the state. Fills of different groups that use the same word are resolved
+    by searching the later group again with the earlier groups' words
+    unavailable; if that fails, the filler searches the state and its
+    descendants as a whole. Because a decomposer checks every state, groups
+    that separate only after the cells that connect them are filled are
+    split when that happens.
+
+    Only one fill is found for each group, so a filler consults its decomposer
+    only if the listener stops at the first complete state; other searches
+    branch as usual. If max_workers is specified, groups with at least
+    min_parallel_answers incomplete answers are searched in a pool of worker
+    processes, created when first needed and shut down by close().
+    """
+
+    def __init__(self, max_workers: Optional[int]=None, min_parallel_answers: int=_DEFAULT_MIN_PARALLEL_ANSWERS, mp_context=None):
+        self.max_workers = max_workers
+        self.min_parallel_answers = min_parallel_answers
+        self.mp_context = mp_context
+        self.decompositions = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state['_executor'] = None
+        return state
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def _get_executor(self, filler: Filler) -> ProcessPoolExecutor:
+        if self._executor is None:
+            mp_context = self.mp_context or multiprocessing.get_context()
+            self._executor = ProcessPoolExecutor(self.max_workers, mp_context=mp_context,
+                                                 initializer=_initialize_worker, initargs=(filler,))
+        return self._executor
+
+    def solve(self, filler: Filler, state: FillState, listener: FillListener) -> Optional[Decomposition]:
+        """
+        Fills each group of a state's incomplete answers separately. Nodes
+        visited by the groups' searches are added to the listener's count, and
+        the searches are limited to the nodes and time that the listener's
+        thresholds leave.
+        @param filler: the filler
+        @param state: the state
+        @param listener: the listener of the search that visited the state
+        @return: the decomposition, with no suggestion if the groups' fills could not be
+        combined; or None if the state has only one group
+        """
+        groups = components(state)
+        if len(groups) < 2:
+            return None
+        self.decompositions += 1
+        filled = self._fill_each(filler, state, groups, listener)
+        if filled is None:
+            return Decomposition(groups, None, False)
+        if not all(filled):
+            return Decomposition(groups, None, True)
+        fills: List[Tuple[Answer, ...]] = []
+        words: Set[str] = set()
+        for group, group_state in zip(groups, filled):
+            group_fill = group_state.answers[:len(group)]
+            group_words = set([''.join(answer.pattern) for answer in group_fill])
+            if not words.isdisjoint(group_words):
+                fixed = [answer for earlier in fills for answer in earlier]
+                group_state, count, _ = _fill_component(filler, _component_state(state, group, fixed), self._remaining(listener))
+                listener.count += count
+                if group_state is None:
+                    _log.debug("fills of %s groups could not be combined", len(groups))
+                    return Decomposition(groups, None, False)
+                group_fill = group_state.answers[:len(group)]
+                group_words = set([''.join(answer.pattern) for answer in group_fill])
+            fills.append(group_fill)
+            words.update(group_words)
+        return Decomposition(groups, _combine(state, groups, fills), False)
+
+    # noinspection PyMethodMayBeStatic
+    def _remaining(self, listener: FillListener) -> Tuple[Optional[int], Optional[float]]:
+        """Gets the node and duration thresholds for a group's search from what the listener's thresholds leave."""
+        node_threshold, duration_threshold = None, None
+        if listener.node_threshold is not None:
+            node_threshold = max(listener.node_threshold - listener.count, 0)
+        if listener.duration_threshold is not None:
+            elapsed = 0.0 if listener.start is None else time.perf_counter() - listener.start
+            duration_threshold = max(listener.duration_threshold - elapsed, 0.0)
+        return node_threshold, duration_threshold
+
+    def _fill_each(self, filler: Filler, state: FillState, groups: List[Tuple[int, ...]], listener: FillListener) -> Optional[List[Optional[FillState]]]:
+        """
+        Searches each group on its own.
+        @return: list of the complete state of each group, or None for a group that cannot be
+        filled; or None if some search was cut short by the listener's node or duration threshold
+        """
+        group_states = [_component_state(state, group, []) for group in groups]
+        futures = {}
+        if self.max_workers is not None and sum([len(group) >= self.min_parallel_answers for group in groups]) > 1:
+            executor = self._get_executor(filler)
+            for i, group in enumerate(groups):
+                if len(group) >= self.min_parallel_answers:
+                    futures[i] = executor.submit(_fill_component_in_worker, group_states[i], self._remaining(listener))
+        results: List[Optional[FillState]] = []
+        conclusive = True
+        for i, group_state in enumerate(group_states):
+            if i in futures:
+                group_state, count, finished = futures[i].result()
+            else:
+                group_state, count, finished = _fill_component(filler, group_state, self._remaining(listener))
+            listener.count += count
+            conclusive = conclusive and finished
+            results.append(group_state)
+            if group_state is None and finished:
+                for future in futures.values():
+                    future.cancel()
+                return results
+        return results if conclusive else None
+
+
+def _combine(state: FillState, groups: List[Tuple[int, ...]], fills: List[Tuple[Answer, ...]]) -> Suggestion:
+    legend_updates: Dict[int, str] = {}
+    new_entries: Dict[int, Answer] = {}
+    for group, group_fill in zip(groups, fills):
+        for a_idx, answer in zip(group, group_fill):
+            for spot, letter in zip(state.answers[a_idx].content, answer.pattern):
+                if not Template.is_value_defined(spot):
+                    legend_updates[spot] = letter
+            new_entries[a_idx] = answer
+    return Suggestion(legend_updates, new_entries)
@@ -1,20 +1,30 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import itertools
 import logging
+import random
 import time
-from typing import Optional, Callable, Any
+from typing import Optional, Callable, Any, Iterator, List, Set, Dict, Tuple
 
-from puzzicle.puzzicon.fill import Answer
+from puzzicle.puzzicon.fill import Answer, Suggestion, Template, Pattern, BankItem
 from puzzicle.puzzicon.fill.bank import Bank
+from puzzicle.puzzicon.fill.nogood import NogoodCache
+from puzzicle.puzzicon.fill.ordering import MinimumRemainingValues, LeastConstrainingValue, SlotCounts
+from puzzicle.puzzicon.fill.propagation import ArcConsistency, Domains
 from puzzicle.puzzicon.fill.state import FillState
 
 _log = logging.getLogger(__name__)
 _CONTINUE = False
 _STOP = True
+_EMPTY_ITERATOR = iter(())
 
 class FillListener(object):
 
+    # true iff the listener stops the search at the first complete state it accepts,
+    # so that any one complete state reached from a node is as good as any other
+    stops_at_first = False
+
     def __init__(self, node_threshold: int=None, duration_threshold: float=None):
         self.node_threshold = node_threshold
         self.count = 0
@@ -50,8 +60,44 @@ class FillListener(object):
     def value(self):
         raise NotImplementedError("subclass must implement")
 
+    # noinspection PyMethodMayBeStatic,PyUnusedLocal
+    def admits(self, state: FillState) -> bool:
+        """
+        Checks whether a state should be searched. A listener may reject states
+        whose subtrees cannot contain anything it is looking for.
+        @param state: a state that has not been visited
+        @return: true iff the state and its subtree are to be searched
+        """
+        return True
+
+    def spawn(self) -> 'FillListener':
+        """Creates a listener with the same thresholds and no results, for use on a subtree."""
+        return type(self)(self.node_threshold, self.duration_threshold)
+
+    def absorb(self, other: 'FillListener'):
+        """Merges the node count and results of a listener that was spawned from this one."""
+        self.count += other.count
+
+    def progress(self) -> Dict[str, Any]:
+        """
+        Captures the node count, elapsed time and results of a search in progress,
+        so that they can be saved and restored to a listener for the resumed search.
+        @return: dictionary of picklable values
+        """
+        elapsed = None if self.start is None else time.perf_counter() - self.start
+        return {'count': self.count, 'elapsed': elapsed}
+
+    def restore(self, progress: Dict[str, Any]):
+        """Sets the node count, elapsed time and results captured by progress()."""
+        self.count = progress['count']
+        if progress['elapsed'] is not None:
+            self.start = time.perf_counter() - progress['elapsed']
+
+
 class FirstCompleteListener(FillListener):
 
+    stops_at_first = True
+
     def __init__(self, node_threshold: int=None, duration_threshold: float=None):
         super().__init__(node_threshold, duration_threshold)
         self.completed = None
@@ -65,6 +111,20 @@ class FirstCompleteListener(FillListener):
     def value(self):
         return self.completed
 
+    def absorb(self, other: 'FirstCompleteListener'):
+        super().absorb(other)
+        if self.completed is None:
+            self.completed = other.completed
+
+    def progress(self) -> Dict[str, Any]:
+        progress = super().progress()
+        progress['completed'] = self.completed
+        return progress
+
+    def restore(self, progress: Dict[str, Any]):
+        super().restore(progress)
+        self.completed = progress['completed']
+
 
 class AllCompleteListener(FillListener):
 
@@ -80,6 +140,19 @@ class AllCompleteListener(FillListener):
             self.completed.add(state)
         return _CONTINUE
 
+    def absorb(self, other: 'AllCompleteListener'):
+        super().absorb(other)
+        self.completed.update(other.completed)
+
+    def progress(self) -> Dict[str, Any]:
+        progress = super().progress()
+        progress['completed'] = set(self.completed)
+        return progress
+
+    def restore(self, progress: Dict[str, Any]):
+        super().restore(progress)
+        self.completed = set(progress['completed'])
+
 
 class FillStateNode(object):
 
@@ -87,6 +160,320 @@ class FillStateNode(object):
         self.state: FillState = state
         self.parent: Optional[FillStateNode] = parent
         self.known_unfillable: bool = False
+        self.domains: Optional[Domains] = None
+        self.slot_counts: Optional[SlotCounts] = None
+        self.decomposable: bool = parent is None or parent.decomposable
+
+
+class _Frame(object):
+
+    """Search stack record holding a node and the iterators over its unexplored branches."""
+
+    __slots__ = ('node', 'answer_indexes', 'answer_idx', 'suggestions', 'suggestion', 'conflicts', 'solved', 'decomposition',
+                 'num_answers', 'num_suggestions', 'answers_rng_state', 'suggestions_rng_state')
+
+    def __init__(self, node: FillStateNode, suggestion: Optional[Suggestion]=None):
+        self.node = node
+        self.answer_indexes: Iterator[int] = _EMPTY_ITERATOR
+        self.answer_idx: Optional[int] = None
+        self.suggestions: Iterator[Suggestion] = _EMPTY_ITERATOR
+        self.suggestion = suggestion            # the suggestion that produced this frame's node from its parent
+        self.conflicts: Set[int] = set()        # levels of earlier frames whose suggestions caused failures here
+        self.solved = False                     # true once a complete state has been reached from this frame
+        self.decomposition = None               # the decomposer's result for this frame's node, if any
+        # positions in the iterators and random states when they were created, so that a checkpoint can recreate them
+        self.num_answers = 0
+        self.num_suggestions = 0
+        self.answers_rng_state = None
+        self.suggestions_rng_state = None
+
+
+class FillSearch(object):
+
+    """
+    Depth-first search over fill states that keeps an explicit stack of frames
+    instead of recursing, so grid size is not limited by the interpreter's
+    recursion limit. A search is paused by calling pause() (from a tracer or
+    listener, for example) or by running it with a node budget, and it is
+    resumed by calling run() again.
+
+    Answers are supplied in the order of the filler's selector, if it has one,
+    or else by FillState.provide_unfilled with the filler's sorter. If the
+    filler has a random number generator, it breaks ties between answers and
+    between suggestions.
+
+    If the filler has backjumping enabled, each node branches only on the first
+    answer supplied, and when a node's suggestions are exhausted, the search
+    jumps back to the deepest frame whose suggestion defined a cell of the
+    failed answer or of an answer that crosses it, or completed a word that
+    the failed answer could otherwise have used or that a crossing answer could
+    be completed with. The number of frames jumped over is counted in
+    levels_skipped.
+
+    If the filler has a decomposer, the listener stops at the first complete
+    state, and the incomplete answers of a node form groups that share no open
+    cells, the decomposer fills the groups separately, and the node's only child
+    is the state that their fills complete; the node has no children if some
+    group cannot be filled. If the groups' fills cannot be combined, the node
+    and its descendants are searched without the decomposer.
+
+    If the filler has a nogood cache, the state of each frame that is popped
+    without a complete state having been reached from it is added to the cache,
+    and new states found in the cache are skipped.
+    """
+
+    def __init__(self, filler: 'Filler', root: FillStateNode, listener: FillListener):
+        self.filler = filler
+        self.listener = listener
+        self.stack: List[_Frame] = []
+        self.outcome: Optional[bool] = None
+        self.levels_skipped = 0
+        self._next: Optional[FillStateNode] = root
+        self._next_suggestion: Optional[Suggestion] = None
+        self._pause_requested = False
+        self._cell_levels: Dict[int, int] = {}
+        self._answer_cells: Optional[List[Tuple[int, ...]]] = None
+
+    def is_finished(self) -> bool:
+        return self.outcome is not None
+
+    def is_stopped(self) -> bool:
+        """Returns true iff the listener stopped the search."""
+        return self.outcome == _STOP
+
+    def pause(self):
+        """Requests that the search stop after visiting the current node."""
+        self._pause_requested = True
+
+    def run(self, max_nodes: Optional[int]=None) -> bool:
+        """
+        Runs the search until it is finished or paused.
+        @param max_nodes: maximum number of nodes to visit before pausing
+        @return: true iff the search is finished
+        """
+        self._pause_requested = False
+        stack = self.stack
+        while self.outcome is None:
+            node = self._next
+            if node is not None:
+                if max_nodes is not None:
+                    if max_nodes <= 0:
+                        break
+                    max_nodes -= 1
+                self._next = None
+                self._visit(node)
+                if self._pause_requested:
+                    break
+            elif stack:
+                self._next = self._advance(stack[-1])
+            else:
+                self.outcome = _CONTINUE
+        return self.outcome is not None
+
+    def _visit(self, node: FillStateNode):
+        filler = self.filler
+        if filler.tracer is not None:
+            filler.tracer(node)
+        if self.listener.accept(node.state, filler.bank) == _STOP:
+            self.outcome = _STOP
+            return
+        suggestion, self._next_suggestion = self._next_suggestion, None
+        decomposition = None
+        if filler.decomposer is not None and node.decomposable and self.listener.stops_at_first and not node.state.is_complete():
+            decomposition = filler.decomposer.solve(filler, node.state, self.listener)
+            if decomposition is not None and decomposition.suggestion is None and not decomposition.unfillable:
+                # the groups' fills could not be combined, so neither this node nor its descendants are decomposed
+                node.decomposable = False
+                decomposition = None
+        selector = filler.selector
+        if decomposition is None and selector is not None:
+            previous = node.parent.slot_counts if node.parent is not None else None
+            node.slot_counts = selector.count(node.state, previous, suggestion, node.domains)
+        if filler.backjumping:
+            level = len(self.stack)
+            if suggestion is not None:
+                for grid_idx in suggestion.legend_updates:
+                    self._cell_levels[grid_idx] = level
+        frame = _Frame(node, suggestion)
+        frame.decomposition = decomposition
+        self._branch(frame)
+        self.stack.append(frame)
+        if node.state.is_complete():
+            for frame in self.stack:
+                frame.solved = True
+
+    def _branch(self, frame: _Frame):
+        """Creates the iterator over the answers to branch on from a frame's node."""
+        filler = self.filler
+        if filler.rng is not None:
+            frame.answers_rng_state = filler.rng.getstate()
+        if frame.decomposition is not None:
+            if frame.decomposition.suggestion is not None:
+                frame.suggestions = iter([frame.decomposition.suggestion])
+            return
+        if filler.selector is None:
+            answer_indexes = frame.node.state.provide_unfilled(filler.sorter, filler.rng)
+        else:
+            answer_indexes = filler.selector.order(frame.node.slot_counts, filler.rng)
+        if filler.backjumping:
+            answer_indexes = itertools.islice(answer_indexes, 1)
+        frame.answer_indexes = answer_indexes
+
+    def _suggest(self, frame: _Frame, answer_idx: int):
+        """Creates the iterator over the suggestions for an answer of a frame's node."""
+        filler = self.filler
+        if filler.rng is not None:
+            frame.suggestions_rng_state = filler.rng.getstate()
+        frame.answer_idx = answer_idx
+        frame.num_suggestions = 0
+        frame.suggestions = filler.bank.suggest(frame.node.state, answer_idx, filler.suggestion_bucket_size, filler.orderer, filler.rng)
+
+    def _advance(self, frame: _Frame) -> Optional[FillStateNode]:
+        """
+        Creates the node for the next unexplored suggestion of a frame,
+        backtracking if none remain.
+        """
+        while True:
+            suggestion = next(frame.suggestions, None)
+            if suggestion is not None:
+                frame.num_suggestions += 1
+                new_node = self._child(frame, suggestion)
+                if new_node is None:
+                    # propagation and nogood failures can depend on any earlier suggestion
+                    frame.conflicts.update(range(1, len(self.stack)))
+                    continue
+                self._next_suggestion = suggestion
+                return new_node
+            answer_idx = next(frame.answer_indexes, None)
+            if answer_idx is None:
+                self._backtrack()
+                return None
+            frame.num_answers += 1
+            self._suggest(frame, answer_idx)
+
+    def _child(self, frame: _Frame, suggestion: Suggestion) -> Optional[FillStateNode]:
+        """Creates the node for a suggestion, or returns None if the nogood cache, listener or propagator rejects it."""
+        new_state = frame.node.state.advance(suggestion)
+        nogoods = self.filler.nogoods
+        if nogoods is not None and nogoods.is_known_unfillable(new_state):
+            return None
+        if not self.listener.admits(new_state):
+            # the rejected subtree may hold complete states, so no ancestor may be recorded as unfillable
+            for ancestor in self.stack:
+                ancestor.solved = True
+            return None
+        new_node = FillStateNode(new_state, frame.node)
+        propagator = self.filler.propagator
+        if propagator is not None:
+            new_node.domains = propagator.propagate(new_state, frame.node.domains)
+            if new_node.domains is None:
+                return None
+        return new_node
+
+    def split(self, max_states: int) -> List[FillState]:
+        """
+        Removes unexplored children from the shallowest frame that has some left
+        for its current answer, so that their subtrees can be searched elsewhere.
+        That frame and its ancestors are then treated as solved, because whether
+        the removed subtrees can be filled is not known here.
+        @param max_states: maximum number of children to remove
+        @return: states of the removed children
+        """
+        for depth, frame in enumerate(self.stack):
+            states = []
+            while len(states) < max_states:
+                suggestion = next(frame.suggestions, None)
+                if suggestion is None:
+                    break
+                frame.num_suggestions += 1
+                new_node = self._child(frame, suggestion)
+                if new_node is not None:
+                    states.append(new_node.state)
+            if states:
+                for ancestor in self.stack[:depth + 1]:
+                    ancestor.solved = True
+                return states
+        return []
+
+    def _pop(self):
+        frame = self.stack.pop()
+        if not frame.solved:
+            frame.node.known_unfillable = True
+            if self.filler.nogoods is not None:
+                self.filler.nogoods.add(frame.node.state)
+        if frame.suggestion is not None and self.filler.backjumping:
+            for grid_idx in frame.suggestion.legend_updates:
+                del self._cell_levels[grid_idx]
+
+    def _backtrack(self):
+        stack = self.stack
+        frame = stack[-1]
+        if not self.filler.backjumping or frame.answer_idx is None:
+            self._pop()
+            return
+        top = len(stack) - 1
+        if frame.solved:
+            conflicts = set(range(1, top + 1))
+        else:
+            conflicts = frame.conflicts | self._relevant_levels(frame)
+        culprit = max(conflicts) if conflicts else 0
+        for _ in range(top - culprit + 1):
+            self._pop()
+        self.levels_skipped += top - culprit
+        conflicts.discard(culprit)
+        if stack:
+            stack[-1].conflicts.update(conflicts)
+
+    def _relevant_levels(self, frame: _Frame) -> Set[int]:
+        """
+        Lists the levels of the frames whose suggestions could have caused the
+        suggestions for a frame's answer to be exhausted: those that defined a
+        cell of the answer or of a crossing answer, those that completed a
+        word that would have been a viable fill for the answer if it were unused,
+        and those that completed a word that a crossing answer could be completed
+        with, because a fill that completes a crossing answer with a used word
+        is rejected.
+        """
+        if self._answer_cells is None:
+            root = self.stack[0].node.state
+            self._answer_cells = [tuple([spot for spot in answer.content if not Template.is_value_defined(spot)]) for answer in root.answers]
+        answer_cells, state, answer_idx = self._answer_cells, frame.node.state, frame.answer_idx
+        cells = set(answer_cells[answer_idx])
+        crossing = set()
+        for grid_idx in answer_cells[answer_idx]:
+            for b_idx in state.crosses[grid_idx]:
+                cells.update(answer_cells[b_idx])
+                crossing.add(b_idx)
+        crossing.discard(answer_idx)
+        levels = set()
+        for grid_idx in cells:
+            level = self._cell_levels.get(grid_idx, None)
+            if level is not None:
+                levels.add(level)
+        pattern = state.answers[answer_idx].pattern
+        crossing_patterns = [state.answers[b_idx].pattern for b_idx in crossing]
+        for level in range(1, len(self.stack)):
+            if level in levels:
+                continue
+            for new_entry in self.stack[level].suggestion.new_entries.values():
+                if any([_matches(new_entry.pattern, p) for p in crossing_patterns]):
+                    levels.add(level)
+                    break
+                if _matches(new_entry.pattern, pattern):
+                    bank_item = BankItem.from_word(''.join(new_entry.pattern))
+                    if self.filler.bank.evaluate(state, answer_idx, bank_item) is not None:
+                        levels.add(level)
+                        break
+        return levels
+
+
+def _matches(word: Pattern, pattern: Pattern) -> bool:
+    if len(word) != len(pattern):
+        return False
+    for w, p in zip(word, pattern):
+        if p is not None and p != w:
+            return False
+    return True
 
 
 class Filler(object):
@@ -95,27 +482,35 @@ class Filler(object):
         self.bank = bank
         self.tracer = tracer
         self.sorter: Optional[Callable[[Answer], Any]] = None
+        self.selector: Optional[MinimumRemainingValues] = None
+        self.orderer: Optional[LeastConstrainingValue] = None
+        self.rng: Optional[random.Random] = None
+        self.suggestion_bucket_size: Optional[int] = None
+        self.propagator: Optional[ArcConsistency] = None
+        self.backjumping = False
+        self.nogoods: Optional[NogoodCache] = None
+        self.decomposer: Optional['Decomposer'] = None
 
     def fill(self, state: FillState, listener: FillListener=None) -> FillListener:
         listener = listener or FirstCompleteListener()
-        self._fill(FillStateNode(state), listener)
+        search = self.search(state, listener)
+        search.run()
+        if self.backjumping:
+            _log.debug("%s levels skipped by backjumping", search.levels_skipped)
+        if self.nogoods is not None:
+            _log.debug("%s", self.nogoods)
         return listener
 
-    def _fill(self, node: FillStateNode, listener: FillListener) -> bool:
-        if self.tracer is not None:
-            self.tracer(node)
-        if listener.accept(node.state, self.bank) == _STOP:
-            return _STOP
-        action_flag = _CONTINUE
-        for answer_idx in node.state.provide_unfilled(self.sorter):
-            for suggestion in self.bank.suggest(node.state, answer_idx):
-                new_state = node.state.advance(suggestion)
-                new_node = FillStateNode(new_state, node)
-                continue_now =  self._fill(new_node, listener)
-                if continue_now != _CONTINUE:
-                    action_flag = _STOP
-                    break
-            if action_flag == _STOP:
-                break
-        return action_flag
+    def search(self, state: FillState, listener: FillListener) -> FillSearch:
+        """
+        Creates a search that has not yet been run.
+        @param state: the initial state
+        @param listener: the listener
+        @return: the search
+        """
+        return FillSearch(self, FillStateNode(state), listener)
 
+    def _fill(self, node: FillStateNode, listener: FillListener) -> bool:
+        search = FillSearch(self, node, listener)
+        search.run()
+        return search.outcome
@@ -0,0 +1,427 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import itertools
+import logging
+import operator
+from collections import defaultdict, abc
+from typing import Dict, List, Iterable, Iterator, Optional, Sequence, Set, Tuple
+
+from puzzicle.puzzicon.fill import BankItem, Pattern, WordTuple
+
+_log = logging.getLogger(__name__)
+_EMPTY_SET = frozenset()
+_BITS_ZERO = b'0'
+_BITS_ONE = b'1'
+_RENDERING = operator.attrgetter('rendering')
+_TABLEAU = operator.attrgetter('tableau')
+_DEFAULT_COUNT_CACHE_SIZE = 1 << 16
+
+
+try:
+    popcount = int.bit_count  # Python 3.10+
+except AttributeError:
+    def popcount(mask: int) -> int:
+        return bin(mask).count('1')
+
+
+def iterate_bits(mask: int) -> Iterator[int]:
+    """
+    Returns an iterator that supplies the positions of the bits that are set in a mask, lowest first.
+    @param mask: the bit mask
+    @return: iterator over bit positions
+    """
+    digits = bin(mask)[:1:-1]  # least significant bit first, without the '0b' prefix
+    position = digits.find('1')
+    while position >= 0:
+        yield position
+        position = digits.find('1', position + 1)
+
+
+def _column_masks(column: str) -> Dict[str, int]:
+    """
+    Creates a mask for each distinct letter in a column of letters, where bit i
+    of a letter's mask is set iff the letter is at index i of the column.
+    """
+    masks = {}
+    if column.isascii():
+        encoded = column.encode('ascii')
+        for code in set(encoded):
+            table = bytearray(_BITS_ZERO * 256)
+            table[code] = _BITS_ONE[0]
+            masks[chr(code)] = int(encoded.translate(table)[::-1], 2)
+        return masks
+    return _key_masks(column, len(column))
+
+
+def _key_masks(keys: Iterable, num_keys: int) -> Dict:
+    """
+    Creates a mask for each distinct key in a sequence, where bit i of a key's
+    mask is set iff the key is at index i of the sequence.
+    """
+    bits = defaultdict(lambda: bytearray((num_keys + 7) // 8))
+    for i, key in enumerate(keys):
+        bits[key][i >> 3] |= 1 << (i & 7)
+    masks = {}
+    for key, buffer in bits.items():
+        masks[key] = int.from_bytes(buffer, 'little')
+    return masks
+
+
+class PackedWords(abc.Sequence):
+
+    """
+    Sequence of bank items stored as rows of letter codes in one buffer. The
+    code of a letter is its Latin-1 byte, and row i holds the i-th word, so the
+    words take one byte per letter. Items are created when they are accessed.
+    Only words whose letters are single characters and whose only constituent
+    is the word itself can be packed.
+    """
+
+    def __init__(self, length: int, codes: bytes):
+        assert length > 0, "length must be positive"
+        self.length = length
+        self.codes = codes
+        self.size = len(codes) // length
+
+    @staticmethod
+    def pack(length: int, renderings: Sequence[str]) -> Optional['PackedWords']:
+        """
+        Packs words of one length.
+        @param length: the length of each word
+        @param renderings: the words
+        @return: the packed words, or None if some letter is not in Latin-1
+        """
+        if length < 1:
+            return None
+        try:
+            return PackedWords(length, ''.join(renderings).encode('latin-1'))
+        except UnicodeEncodeError:
+            return None
+
+    def __len__(self):
+        return self.size
+
+    def rendering(self, i: int) -> str:
+        start = i * self.length
+        return self.codes[start:start + self.length].decode('latin-1')
+
+    def __getitem__(self, i: int) -> BankItem:
+        if i < 0:
+            i += self.size
+        if not 0 <= i < self.size:
+            raise IndexError("index out of range")
+        return BankItem.from_word(self.rendering(i))
+
+    def renderings(self) -> Iterator[str]:
+        decoded = self.codes.decode('latin-1')
+        length = self.length
+        return (decoded[start:start + length] for start in range(0, len(decoded), length))
+
+    def __iter__(self) -> Iterator[BankItem]:
+        return map(BankItem.from_word, self.renderings())
+
+    def find(self, rendering: str) -> int:
+        """
+        Finds a word by binary search over the rows, which are sorted.
+        @param rendering: the word
+        @return: the row, or -1 if not found
+        """
+        try:
+            target = rendering.encode('latin-1')
+        except UnicodeEncodeError:
+            return -1
+        codes, length = self.codes, self.length
+        if len(target) != length:
+            return -1
+        lo, hi = 0, self.size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if codes[mid * length:(mid + 1) * length] < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.size and codes[lo * length:(lo + 1) * length] == target:
+            return lo
+        return -1
+
+
+def _is_packable(item: BankItem) -> bool:
+    return len(item.tableau) == len(item.rendering) and item.constituents == {item.rendering}
+
+
+class LengthBucket(object):
+
+    """Words of one length and, for each position, a bitset of the words that have each letter there."""
+
+    def __init__(self, length: int, items: Sequence[BankItem]):
+        self.length = length
+        self.items = items
+        self.full = (1 << len(items)) - 1
+        masks = []
+        concatenated = ''.join(self.renderings())
+        for position in range(length):
+            masks.append(_column_masks(concatenated[position::length]))
+        self.masks: Tuple[Dict[str, int], ...] = tuple(masks)
+        self.histogram: Tuple[Dict[str, int], ...] = tuple([{k: popcount(v) for k, v in m.items()} for m in masks])
+
+    @staticmethod
+    def create(length: int, items: Sequence[BankItem]) -> 'LengthBucket':
+        """
+        Creates a bucket whose items are packed if they can be.
+        @param length: length of the items
+        @param items: items, sorted by rendering
+        @return: the bucket
+        """
+        packed = None
+        if all(map(_is_packable, items)):
+            packed = PackedWords.pack(length, [item.rendering for item in items])
+        return LengthBucket(length, items if packed is None else packed)
+
+    @staticmethod
+    def from_words(length: int, renderings: Sequence[str]) -> 'LengthBucket':
+        """
+        Creates a bucket of words that have single-character letters and are their own constituents.
+        @param length: length of the words
+        @param renderings: the words, sorted
+        @return: the bucket
+        """
+        packed = PackedWords.pack(length, renderings)
+        return LengthBucket(length, [BankItem.from_word(r) for r in renderings] if packed is None else packed)
+
+    def size(self) -> int:
+        return len(self.items)
+
+    def renderings(self) -> Iterator[str]:
+        if isinstance(self.items, PackedWords):
+            return self.items.renderings()
+        return map(_RENDERING, self.items)
+
+    def mask(self, position: int, letter: str) -> int:
+        return self.masks[position].get(letter, 0)
+
+    def intersect(self, pattern: Pattern) -> int:
+        """
+        Intersects the bitsets for each letter defined by a pattern.
+        @param pattern: pattern whose length is the length of this bucket
+        @return: mask of the indexes of matching items
+        """
+        mask = self.full
+        masks = self.masks
+        for position, letter in enumerate(pattern):
+            if letter is not None:
+                mask &= masks[position].get(letter, 0)
+                if not mask:
+                    break
+        return mask
+
+    def count(self, pattern: Pattern) -> Optional[int]:
+        """
+        Counts the items that match a pattern if it can be done without an intersection,
+        that is, if the pattern defines at most one letter.
+        @param pattern: pattern whose length is the length of this bucket
+        @return: the count, or None if the pattern defines more than one letter
+        """
+        defined_position = None
+        for position, letter in enumerate(pattern):
+            if letter is not None:
+                if defined_position is not None:
+                    return None
+                defined_position = position
+        if defined_position is None:
+            return len(self.items)
+        return self.histogram[defined_position].get(pattern[defined_position], 0)
+
+    def select(self, mask: int) -> Iterator[BankItem]:
+        items = self.items
+        return map(items.__getitem__, iterate_bits(mask))
+
+    def find(self, rendering: str) -> int:
+        """
+        Finds an item by binary search over the sorted items.
+        @param rendering: rendering of the item
+        @return: index of the item, or -1 if not found
+        """
+        items = self.items
+        if isinstance(items, PackedWords):
+            return items.find(rendering)
+        lo, hi = 0, len(items)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if items[mid].rendering < rendering:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(items) and items[lo].rendering == rendering:
+            return lo
+        return -1
+
+
+class BitsetIndex(object):
+
+    """
+    Index of bank items keyed by (length, position, letter). Each key maps to
+    a bitset over the words of that length, so a pattern lookup is the
+    intersection of one bitset per defined letter. Memory is linear in the
+    number of words and there is no cap on word length.
+
+    Counts of patterns that define at most one letter are answered from
+    per-position letter histograms; counts of other patterns are cached,
+    evicting the oldest entry once the cache holds count_cache_size entries.
+    """
+
+    def __init__(self, buckets: Dict[int, LengthBucket], count_cache_size: int=_DEFAULT_COUNT_CACHE_SIZE):
+        self.buckets = buckets
+        self.count_cache_size = count_cache_size
+        self._count_cache: Dict[Pattern, int] = {}
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state['_count_cache'] = {}
+        return state
+
+    @staticmethod
+    def build(items: Iterable[BankItem]) -> 'BitsetIndex':
+        by_length: Dict[int, List[BankItem]] = defaultdict(list)
+        for item in items:
+            by_length[item.length()].append(item)
+        buckets = {}
+        for length, bucket_items in by_length.items():
+            # renderings of equal length sort the same as their tableaus
+            bucket_items.sort(key=_RENDERING)
+            buckets[length] = LengthBucket.create(length, bucket_items)
+        return BitsetIndex(buckets)
+
+    @staticmethod
+    def from_words(words: Iterable[str]) -> 'BitsetIndex':
+        """
+        Builds an index of words without creating a bank item for each. Each
+        word becomes an item whose letters are its characters.
+        @param words: the words; duplicates are ignored
+        @return: the index
+        """
+        by_length: Dict[int, Set[str]] = defaultdict(set)
+        for word in words:
+            by_length[len(word)].add(word)
+        return BitsetIndex(dict([(length, LengthBucket.from_words(length, sorted(bucket_words)))
+                                 for length, bucket_words in by_length.items()]))
+
+    def bucket(self, length: int) -> Optional[LengthBucket]:
+        return self.buckets.get(length, None)
+
+    def with_changes(self, added: Iterable[BankItem], removed: Iterable[str]) -> 'BitsetIndex':
+        """
+        Creates an index with some items added and some removed. Only the
+        buckets of lengths that have changes are rebuilt; the others are shared
+        with this index.
+        @param added: items to add; items already present are ignored
+        @param removed: renderings of items to remove
+        @return: a new index
+        """
+        added_by_length: Dict[int, List[BankItem]] = defaultdict(list)
+        for item in added:
+            added_by_length[item.length()].append(item)
+        removed_by_length: Dict[int, Set[str]] = defaultdict(set)
+        for rendering in removed:
+            removed_by_length[len(rendering)].add(rendering)
+        buckets = dict(self.buckets)
+        for length in set(added_by_length.keys()) | set(removed_by_length.keys()):
+            old_bucket = self.buckets.get(length, None)
+            removals = removed_by_length[length]
+            if old_bucket is not None and isinstance(old_bucket.items, PackedWords) and all(map(_is_packable, added_by_length[length])):
+                renderings = set(old_bucket.renderings()) - removals
+                renderings.update([item.rendering for item in added_by_length[length]])
+                if renderings:
+                    buckets[length] = LengthBucket.from_words(length, sorted(renderings))
+                else:
+                    buckets.pop(length, None)
+                continue
+            items = [] if old_bucket is None else [item for item in old_bucket.items if item.rendering not in removals]
+            present = set([item.rendering for item in items])
+            for item in added_by_length[length]:
+                if item.rendering not in present:
+                    present.add(item.rendering)
+                    items.append(item)
+            if items:
+                items.sort(key=_RENDERING)
+                buckets[length] = LengthBucket.create(length, items)
+            else:
+                buckets.pop(length, None)
+        return BitsetIndex(buckets, self.count_cache_size)
+
+    def size(self) -> int:
+        return sum([b.size() for b in self.buckets.values()])
+
+    def count(self, pattern: Pattern) -> int:
+        """
+        Counts the items that match a pattern.
+        @param pattern: the pattern
+        @return: count of matching items
+        """
+        cache = self._count_cache
+        try:
+            return cache[pattern]
+        except KeyError:
+            pass
+        bucket = self.buckets.get(len(pattern), None)
+        if bucket is None:
+            return 0
+        count = bucket.count(pattern)
+        if count is None:
+            count = popcount(bucket.intersect(pattern))
+            if len(cache) >= self.count_cache_size:
+                del cache[next(iter(cache))]
+            cache[pattern] = count
+        return count
+
+    def filter(self, pattern: Pattern) -> Iterator[BankItem]:
+        """
+        Returns an iterator that supplies the items that match a pattern, in sorted order.
+        @param pattern: the pattern
+        @return: iterator over matching items
+        """
+        bucket = self.buckets.get(len(pattern), None)
+        if bucket is None:
+            return _EMPTY_SET.__iter__()
+        return bucket.select(bucket.intersect(pattern))
+
+    def __str__(self):
+        return "BitsetIndex<num_words={},lengths={}>".format(self.size(), sorted(self.buckets.keys()))
+
+
+class IndexedDeposits(abc.Collection):
+
+    """Read-only collection of the items in an index, usable as the deposits of a bank."""
+
+    def __init__(self, index: BitsetIndex):
+        self.index = index
+
+    def __len__(self):
+        return self.index.size()
+
+    def __iter__(self) -> Iterator[BankItem]:
+        return itertools.chain.from_iterable([self.index.buckets[length].items for length in sorted(self.index.buckets)])
+
+    def __contains__(self, item):
+        if not isinstance(item, BankItem):
+            return False
+        bucket = self.index.bucket(item.length())
+        return bucket is not None and bucket.find(item.rendering) >= 0
+
+
+class IndexedTableaus(abc.Collection):
+
+    """Read-only collection of the tableaus of the items in an index, usable as the tableaus of a bank."""
+
+    def __init__(self, index: BitsetIndex):
+        self.index = index
+
+    def __len__(self):
+        return self.index.size()
+
+    def __iter__(self) -> Iterator[WordTuple]:
+        return map(_TABLEAU, IndexedDeposits(self.index))
+
+    def __contains__(self, tableau):
+        bucket = self.index.bucket(len(tableau))
+        return bucket is not None and bucket.find(''.join(tableau)) >= 0
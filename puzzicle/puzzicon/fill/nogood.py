@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import logging
+from collections import OrderedDict, defaultdict
+from typing import NamedTuple, Tuple, FrozenSet, Dict, List, Optional, Sequence
+
+from puzzicle.puzzicon.fill import Pattern
+from puzzicle.puzzicon.fill.state import FillState, components
+
+_log = logging.getLogger(__name__)
+_DEFAULT_CAPACITY = 100 * 1000
+
+
+class NogoodStats(NamedTuple):
+
+    hits: int
+    misses: int
+    evictions: int
+    size: int
+    capacity: int
+
+
+class Signature(NamedTuple):
+
+    """
+    Portion of a fill state, or of a group of its incomplete answers that shares
+    no open cells with the others, that determines whether it can be filled.
+    """
+
+    open_answers: Tuple[Tuple[int, Pattern], ...]     # index and pattern of each incomplete answer
+    used: FrozenSet[str]                               # used words that match the pattern of some incomplete answer
+
+    @staticmethod
+    def of(state: FillState, group: Optional[Sequence[int]]=None) -> 'Signature':
+        """
+        Creates the signature of a state or of a group of its incomplete answers.
+        @param state: the state
+        @param group: sorted indexes of the answers in the group, or None for every incomplete answer
+        @return: the signature
+        """
+        if group is None:
+            open_answers = tuple([(a_idx, state.answers[a_idx].pattern) for a_idx, word in enumerate(state.used) if word is None])
+        else:
+            open_answers = tuple([(a_idx, state.answers[a_idx].pattern) for a_idx in group])
+        # a used word that matches none of the patterns cannot affect how they are filled
+        letters: Dict[int, List[Tuple[Tuple[int, str], ...]]] = defaultdict(list)
+        for _, pattern in open_answers:
+            letters[len(pattern)].append(tuple([(i, p) for i, p in enumerate(pattern) if p is not None]))
+        used = frozenset([u for u in state.used if u is not None and _matches_any(u, letters.get(len(u), ()))])
+        return Signature(open_answers, used)
+
+
+def _matches_any(word: str, letters: Sequence[Tuple[Tuple[int, str], ...]]) -> bool:
+    """
+    Checks whether a word matches any of a list of patterns.
+    @param word: the word
+    @param letters: for each pattern, the position and letter of each defined cell
+    @return: true if the word has the letters of some pattern
+    """
+    for defined in letters:
+        if all([word[i] == p for i, p in defined]):
+            return True
+    return False
+
+
+class NogoodCache(object):
+
+    """
+    Bounded store of the signatures of states proven unfillable. Two states
+    reached by placing words in different orders have the same signature if
+    their incomplete answers have the same patterns and the same relevant words
+    are used, so a filler can skip the second one. When the cache is full,
+    the least recently used signature is evicted.
+
+    A state whose incomplete answers form more than one group, with no open
+    cell shared between groups, is also known to be unfillable if one of its
+    groups has the signature of an unfillable state whose incomplete answers
+    were just that group. Such a group cannot be filled whatever happens in
+    the other groups, so a failure in one part of the grid is recognized after
+    changes in another. A state with several groups is recorded as a whole,
+    because it may be unfillable only because the groups' fills share words.
+    """
+
+    def __init__(self, capacity: int=_DEFAULT_CAPACITY):
+        assert capacity > 0, "capacity must be positive"
+        self.capacity = capacity
+        self._signatures: Dict[Signature, bool] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _find(self, state: FillState) -> Optional[Signature]:
+        """Finds the recorded signature of a state or of one of its groups."""
+        signature = Signature.of(state)
+        if signature in self._signatures:
+            return signature
+        groups = components(state)
+        if len(groups) > 1:
+            for group in groups:
+                signature = Signature.of(state, group)
+                if signature in self._signatures:
+                    return signature
+        return None
+
+    def is_known_unfillable(self, state: FillState) -> bool:
+        signature = self._find(state)
+        if signature is not None:
+            self._signatures.move_to_end(signature)
+            self.hits += 1
+            return True
+        self.misses += 1
+        return False
+
+    def add(self, state: FillState):
+        """Records that a state cannot be filled."""
+        signature = Signature.of(state)
+        self._signatures[signature] = True
+        self._signatures.move_to_end(signature)
+        if len(self._signatures) > self.capacity:
+            self._signatures.popitem(last=False)
+            self.evictions += 1
+
+    def size(self) -> int:
+        return len(self._signatures)
+
+    def stats(self) -> NogoodStats:
+        return NogoodStats(self.hits, self.misses, self.evictions, len(self._signatures), self.capacity)
+
+    def __str__(self):
+        return "NogoodCache<hits={},misses={},evictions={},size={},capacity={}>".format(*self.stats())
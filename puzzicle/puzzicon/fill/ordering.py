@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import heapq
+import logging
+import random
+from collections import Counter
+from typing import NamedTuple, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from puzzicle.puzzicon.fill import BankItem, Pattern, Suggestion, Template
+from puzzicle.puzzicon.fill.bank import Bank
+from puzzicle.puzzicon.fill.index import popcount
+from puzzicle.puzzicon.fill.propagation import Domains
+from puzzicle.puzzicon.fill.state import FillState
+
+_log = logging.getLogger(__name__)
+
+
+class SlotCounts(NamedTuple):
+
+    """Selection data for the incomplete answers of a fill state."""
+
+    candidates: Dict[int, int]      # maps each incomplete answer index to its number of candidate words
+    crossings: Dict[int, int]       # maps each incomplete answer index to its number of incomplete crossing answers
+
+
+class MinimumRemainingValues(object):
+
+    """
+    Slot selector that supplies the incomplete answers of a state in order of
+    how many words could fill them, fewest first, breaking ties by how many
+    incomplete answers cross their open cells, most first.
+
+    Candidate words are counted with the bank's count structures, or taken from
+    the sizes of the domains if the state has been propagated. The counts for
+    a state created from its parent by a suggestion are copied from the
+    parent's, and only the answers that contain a cell defined by the
+    suggestion are counted again. Answers are supplied from a heap, so a
+    search that branches on the first answer only does not order the rest.
+    If some answer has no candidates, no answer after it is supplied.
+    """
+
+    def __init__(self, bank: Bank):
+        self.bank = bank
+
+    def count(self, state: FillState, previous: Optional[SlotCounts]=None, suggestion: Optional[Suggestion]=None, domains: Optional[Domains]=None) -> SlotCounts:
+        """
+        Counts the candidate words and open crossings of the incomplete answers of a state.
+        @param state: the state
+        @param previous: counts for the state's parent
+        @param suggestion: the suggestion that created the state from its parent
+        @param domains: the state's propagated domains
+        @return: the counts
+        """
+        if previous is None or suggestion is None:
+            candidates, crossings = {}, {}
+            changed: Iterable[int] = range(len(state.answers))
+        else:
+            candidates, crossings = dict(previous.candidates), dict(previous.crossings)
+            changed: Set[int] = set()
+            for grid_idx in suggestion.legend_updates:
+                changed.update(state.crosses[grid_idx])
+        for a_idx in changed:
+            answer = state.answers[a_idx]
+            if answer.is_complete():
+                candidates.pop(a_idx, None)
+                crossings.pop(a_idx, None)
+                continue
+            if domains is None:
+                candidates[a_idx] = self.bank.count(answer.pattern)
+            crossings[a_idx] = self._count_crossings(state, a_idx)
+        if domains is not None:
+            for a_idx, mask in domains.words.items():
+                candidates[a_idx] = popcount(mask)
+        return SlotCounts(candidates, crossings)
+
+    # noinspection PyMethodMayBeStatic
+    def _count_crossings(self, state: FillState, a_idx: int) -> int:
+        crossing = set()
+        for spot in state.answers[a_idx].content:
+            if not Template.is_value_defined(spot):
+                crossing.update(state.crosses[spot])
+        crossing.discard(a_idx)
+        return len(crossing)
+
+    # noinspection PyMethodMayBeStatic
+    def order(self, counts: SlotCounts, rng: Optional[random.Random]=None) -> Iterator[int]:
+        """
+        Returns an iterator that supplies the indexes of incomplete answers, most constrained first.
+        @param counts: the counts for the state
+        @param rng: random number generator used to break remaining ties, or None to break them by index
+        @return: iterator over answer indexes
+        """
+        crossings = counts.crossings
+        if rng is None:
+            heap = [(num_candidates, -crossings[a_idx], 0.0, a_idx) for a_idx, num_candidates in counts.candidates.items()]
+        else:
+            heap = [(num_candidates, -crossings[a_idx], rng.random(), a_idx) for a_idx, num_candidates in counts.candidates.items()]
+        heapq.heapify(heap)
+        while heap:
+            num_candidates, _, _, a_idx = heapq.heappop(heap)
+            yield a_idx
+            if num_candidates == 0:
+                # no word fits, so the state cannot be filled whatever is tried for the other answers
+                return
+
+
+class LeastConstrainingValue(object):
+
+    """
+    Value orderer that ranks the words that could fill an answer by how many
+    words they leave for the answers that cross it, most first.
+
+    For each open cell of the answer and each other answer that contains the
+    cell, a table of the number of bank words that match the crossing answer's
+    pattern with each letter at the crossing position is computed once per
+    answer. A word's score is the product of the table entries for its
+    letters, or their minimum if minimum is true. A word with a score of zero
+    would leave some crossing answer without a fill, so it is not ranked.
+    """
+
+    def __init__(self, bank: Bank, minimum: bool=False):
+        self.bank = bank
+        self.minimum = minimum
+
+    def letter_tables(self, state: FillState, answer_idx: int) -> List[Tuple[int, Dict[str, int]]]:
+        """
+        Counts, for each open cell of an answer and each answer that crosses it there,
+        the words that fit the crossing answer with each letter in the cell.
+        @param state: the state
+        @param answer_idx: index of the answer
+        @return: list of position in the answer and map of letter to count
+        """
+        tables = []
+        for position, spot in enumerate(state.answers[answer_idx].content):
+            if Template.is_value_defined(spot):
+                continue
+            for b_idx in state.crosses[spot]:
+                if b_idx == answer_idx:
+                    continue
+                crossing = state.answers[b_idx]
+                tables.append((position, self._letter_counts(crossing.pattern, crossing.content.index(spot))))
+        return tables
+
+    def _letter_counts(self, pattern: Pattern, position: int) -> Dict[str, int]:
+        index = self.bank.index
+        if index is None:
+            return Counter([item.tableau[position] for item in self.bank.filter(pattern)])
+        bucket = index.bucket(len(pattern))
+        if bucket is None:
+            return {}
+        mask = bucket.intersect(pattern)
+        counts = {}
+        for letter, letter_mask in bucket.masks[position].items():
+            count = popcount(mask & letter_mask)
+            if count > 0:
+                counts[letter] = count
+        return counts
+
+    def score(self, tables: List[Tuple[int, Dict[str, int]]], item: BankItem) -> int:
+        tableau = item.tableau
+        if self.minimum:
+            score = None
+            for position, counts in tables:
+                count = counts.get(tableau[position], 0)
+                if count == 0:
+                    return 0
+                score = count if score is None else min(score, count)
+            return 1 if score is None else score
+        score = 1
+        for position, counts in tables:
+            score *= counts.get(tableau[position], 0)
+            if score == 0:
+                return 0
+        return score
+
+    def rank(self, state: FillState, answer_idx: int, items: Iterable[BankItem]) -> List[Tuple[int, BankItem]]:
+        """
+        Scores words that could fill an answer.
+        @param state: the state
+        @param answer_idx: index of the answer
+        @param items: words that match the answer's pattern
+        @return: list of score and word, highest score first, without words that score zero
+        """
+        tables = self.letter_tables(state, answer_idx)
+        scored = []
+        for item in items:
+            score = self.score(tables, item)
+            if score > 0:
+                scored.append((score, item))
+        scored.sort(key=_SCORE, reverse=True)
+        return scored
+
+
+# noinspection PyPep8Naming
+def _SCORE(scored: Tuple[int, BankItem]) -> int:
+    return scored[0]
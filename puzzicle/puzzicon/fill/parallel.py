@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import logging
+import multiprocessing
+import queue
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List, Optional, Tuple, Iterator
+
+from puzzicle.puzzicon.fill.bank import Bank
+from puzzicle.puzzicon.fill.filler import Filler, FillSearch, FillStateNode, _CONTINUE
+from puzzicle.puzzicon.fill.filler import FillListener, FirstCompleteListener, AllCompleteListener
+from puzzicle.puzzicon.fill.state import FillState
+
+_log = logging.getLogger(__name__)
+_STOP_CHECK_INTERVAL = 1000
+_POLL_INTERVAL = 0.05
+_COMPLETE, _COUNT, _STOLEN, _DONE = range(4)
+
+# set in each worker process by _initialize_worker
+_worker_filler: Optional[Filler] = None
+_worker_stop = None
+_worker_visited = None
+
+
+class _FrontierSearch(FillSearch):
+
+    """Search that visits the nodes above a given depth and collects the nodes at that depth instead of visiting them."""
+
+    def __init__(self, filler: Filler, root: FillStateNode, listener: FillListener, depth: int):
+        super().__init__(filler, root, listener)
+        self.depth = depth
+        self.frontier: List[FillState] = []
+
+    def _visit(self, node: FillStateNode):
+        if len(self.stack) < self.depth:
+            super()._visit(node)
+            return
+        self._next_suggestion = None
+        # whether a subtree can be filled is not known here, so no ancestor may be recorded as unfillable
+        for frame in self.stack:
+            frame.solved = True
+        self.frontier.append(node.state)
+
+
+def _initialize_worker(filler: Filler, stop, visited):
+    global _worker_filler, _worker_stop, _worker_visited
+    _worker_filler = filler
+    _worker_stop = stop
+    _worker_visited = visited
+
+
+def _fill_subtree(state: FillState, listener: FillListener) -> Tuple[FillListener, bool]:
+    if _worker_stop.is_set():
+        return listener, False
+    search = _worker_filler.search(state, listener)
+    reported = 0
+    while True:
+        finished = search.run(max_nodes=_STOP_CHECK_INTERVAL)
+        with _worker_visited.get_lock():
+            _worker_visited.value += listener.count - reported
+            total = _worker_visited.value
+        reported = listener.count
+        if finished or _worker_stop.is_set():
+            break
+        if listener.node_threshold is not None and total >= listener.node_threshold:
+            _worker_stop.set()
+            break
+    return listener, search.is_stopped()
+
+
+class ParallelFiller(object):
+
+    """
+    Filler that searches the subtrees below the first split_depth levels of
+    the search tree in a pool of worker processes. The levels above that are
+    searched in the calling process, and each node at the split depth becomes
+    a task whose root is visited by a worker.
+
+    The filler (with its bank) is sent to each worker once, when the worker
+    starts; with the default start method on Linux, workers are forked and
+    share the bank's memory until they write to it. Otherwise the filler's
+    bank, sorter, selector, orderer, tracer and propagator must be picklable.
+
+    Each task is given a listener spawned from the caller's listener, and
+    results and node counts are absorbed into the caller's listener as tasks
+    finish. When some task is stopped by its listener (for example, a
+    FirstCompleteListener that found a complete state), or the merged listener
+    is over its threshold, the other workers are signaled to stop and pending
+    tasks are cancelled. Workers add their node counts to a shared total every
+    few nodes, so a node threshold applies to the total, which may overshoot
+    it by a few nodes per worker. The first complete state found is the first
+    one that some worker reports, not necessarily the first in sequential
+    order. Nogood caches are not shared among workers.
+    """
+
+    def __init__(self, filler: Filler, max_workers: Optional[int]=None, split_depth: int=1, mp_context=None):
+        assert split_depth > 0, "split depth must be positive"
+        self.filler = filler
+        self.max_workers = max_workers
+        self.split_depth = split_depth
+        self.mp_context = mp_context
+
+    def fill(self, state: FillState, listener: FillListener=None) -> FillListener:
+        listener = listener or FirstCompleteListener()
+        search = _FrontierSearch(self.filler, FillStateNode(state), listener, self.split_depth)
+        search.run()
+        if search.is_stopped() or not search.frontier:
+            return listener
+        _log.debug("searching %s subtrees in parallel", len(search.frontier))
+        mp_context = self.mp_context or multiprocessing.get_context()
+        stop = mp_context.Event()
+        visited = mp_context.Value('q', listener.count)
+        with ProcessPoolExecutor(self.max_workers, mp_context=mp_context,
+                                 initializer=_initialize_worker, initargs=(self.filler, stop, visited)) as executor:
+            futures = [executor.submit(_fill_subtree, subtree, listener.spawn()) for subtree in search.frontier]
+            for future in as_completed(futures):
+                if future.cancelled():
+                    continue
+                subtree_listener, stopped = future.result()
+                listener.absorb(subtree_listener)
+                if stopped or stop.is_set() or listener.is_over_threshold():
+                    stop.set()
+                    for pending in futures:
+                        pending.cancel()
+        return listener
+
+
+class _StreamingListener(FillListener):
+
+    """Listener that holds the complete states found since they were last drained."""
+
+    def __init__(self):
+        super().__init__()
+        self.found: List[FillState] = []
+
+    def check_state(self, state: FillState, bank: Bank):
+        if state.is_complete():
+            self.found.append(state)
+        return _CONTINUE
+
+    def value(self):
+        return self.found
+
+
+def _steal_worker(filler: Filler, tasks, results, pending, idle, stop, check_interval: int, steal_batch: int):
+    while True:
+        with idle.get_lock():
+            idle.value += 1
+        state = None
+        while state is None and not stop.is_set():
+            try:
+                state = tasks.get(timeout=_POLL_INTERVAL)
+            except queue.Empty:
+                if pending.value == 0:
+                    break
+        with idle.get_lock():
+            idle.value -= 1
+        if state is None:
+            break
+        _search_stealable(filler, state, tasks, results, pending, idle, stop, check_interval, steal_batch)
+        with pending.get_lock():
+            pending.value -= 1
+    results.put((_DONE, None))
+
+
+def _search_stealable(filler: Filler, state: FillState, tasks, results, pending, idle, stop, check_interval: int, steal_batch: int):
+    listener = _StreamingListener()
+    search = filler.search(state, listener)
+    reported = 0
+    while True:
+        finished = search.run(max_nodes=check_interval)
+        for complete in listener.found:
+            results.put((_COMPLETE, complete))
+        listener.found.clear()
+        if listener.count > reported:
+            results.put((_COUNT, listener.count - reported))
+            reported = listener.count
+        if finished or stop.is_set():
+            return
+        if idle.value > 0 and tasks.empty():
+            stolen = search.split(steal_batch)
+            if stolen:
+                with pending.get_lock():
+                    pending.value += len(stolen)
+                for subtree in stolen:
+                    tasks.put(subtree)
+                results.put((_STOLEN, len(stolen)))
+
+
+class WorkStealingFiller(object):
+
+    """
+    Filler that balances an unevenly shaped search among worker processes.
+    The search starts as a single task in a shared queue. Every check_interval
+    nodes, a worker that sees an idle worker and an empty queue moves up to
+    steal_batch unexplored children of the shallowest frame of its search into
+    the queue, where idle workers take them as new tasks. The search is over
+    when no task is queued or running.
+
+    Complete states are sent back to the calling process as they are found
+    and supplied by stream(), so they need not be accumulated in one set.
+    As in a sequential search, a fill reached by placing its words in
+    different orders is found once for each order.
+    Node counts are merged into the caller's listener, and each complete
+    state is passed to the listener's check_state method; the search stops
+    when the listener asks it to or is over its threshold.
+    """
+
+    def __init__(self, filler: Filler, num_workers: Optional[int]=None, check_interval: int=100, steal_batch: int=4, mp_context=None):
+        self.filler = filler
+        self.num_workers = num_workers or multiprocessing.cpu_count()
+        self.check_interval = check_interval
+        self.steal_batch = steal_batch
+        self.mp_context = mp_context
+        self.steals = 0
+
+    def stream(self, state: FillState, listener: FillListener=None) -> Iterator[FillState]:
+        """
+        Returns an iterator that supplies complete states as workers find them.
+        @param state: the initial state
+        @param listener: listener that receives the node count and complete states
+        @return: iterator over complete states
+        """
+        listener = listener or AllCompleteListener()
+        if listener.start is None:
+            listener.start = time.perf_counter()
+        mp_context = self.mp_context or multiprocessing.get_context()
+        tasks, results = mp_context.Queue(), mp_context.Queue()
+        pending, idle = mp_context.Value('q', 1), mp_context.Value('q', 0)
+        stop = mp_context.Event()
+        tasks.put(state)
+        args = (self.filler, tasks, results, pending, idle, stop, self.check_interval, self.steal_batch)
+        workers = [mp_context.Process(target=_steal_worker, args=args, daemon=True) for _ in range(self.num_workers)]
+        for worker in workers:
+            worker.start()
+        num_running = len(workers)
+        try:
+            while num_running > 0:
+                kind, value = results.get()
+                if kind == _DONE:
+                    num_running -= 1
+                elif kind == _STOLEN:
+                    self.steals += value
+                elif kind == _COUNT:
+                    listener.count += value
+                    if listener.is_over_threshold():
+                        stop.set()
+                elif not stop.is_set():
+                    keep_going = listener.check_state(value, self.filler.bank)
+                    yield value
+                    if keep_going != _CONTINUE:
+                        stop.set()
+        finally:
+            stop.set()
+            # workers exit only after the results they have sent are consumed
+            while num_running > 0:
+                kind, value = results.get()
+                if kind == _DONE:
+                    num_running -= 1
+                elif kind == _COUNT:
+                    listener.count += value
+            for worker in workers:
+                worker.join()
+        _log.debug("%s subtrees stolen", self.steals)
+
+    def fill(self, state: FillState, listener: FillListener=None) -> FillListener:
+        listener = listener or AllCompleteListener()
+        for _ in self.stream(state, listener):
+            pass
+        return listener
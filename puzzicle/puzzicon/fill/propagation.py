@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import logging
+from typing import NamedTuple, Dict, FrozenSet, Optional, Set
+
+from puzzicle.puzzicon.fill import Template
+from puzzicle.puzzicon.fill.bank import Bank
+from puzzicle.puzzicon.fill.index import BitsetIndex, LengthBucket, popcount
+from puzzicle.puzzicon.fill.state import FillState
+
+_log = logging.getLogger(__name__)
+
+
+class Domains(NamedTuple):
+
+    """Candidate values remaining for the open parts of a fill state."""
+
+    words: Dict[int, int]                       # maps each incomplete answer index to a mask over the bank words of its length
+    letters: Dict[int, FrozenSet[str]]          # maps grid indexes of open cells to candidate letters, once restricted
+    positions: Dict[int, Dict[int, int]]        # maps answer index to map of open grid index to position in the answer
+    strengths: Dict[int, int]                   # maps each incomplete answer index to its strength when the domain was computed
+
+
+def _open_positions(content: Template) -> Dict[int, int]:
+    return {spot: position for position, spot in enumerate(content) if not Template.is_value_defined(spot)}
+
+
+class ArcConsistency(object):
+
+    """
+    Constraint propagation stage that maintains a domain of candidate words for
+    each incomplete answer and a set of candidate letters for each open cell,
+    and prunes them until every letter is supported by some word of each
+    answer that contains the cell, and vice versa. A state whose domains
+    become empty cannot be filled. Words already used in the state are
+    excluded from the domains.
+    """
+
+    def __init__(self, bank: Bank):
+        self.bank = bank
+        index = bank.index
+        if index is None:
+            index = BitsetIndex.build(bank.deposits)
+        self.index: BitsetIndex = index
+
+    def is_consistent(self, state: FillState) -> bool:
+        return self.propagate(state) is not None
+
+    def propagate(self, state: FillState, previous: Optional[Domains]=None) -> Optional[Domains]:
+        """
+        Prunes the domains of a state to arc consistency.
+
+        If the domains of an ancestor of the state are provided, they are used
+        as a starting point and only the answers that changed since then are revisited.
+        @param state: the state
+        @param previous: domains of an ancestor of the state
+        @return: the domains, or None if some domain is empty
+        """
+        if previous is None:
+            return self._propagate_fresh(state)
+        return self._propagate_from(state, previous)
+
+    def _propagate_fresh(self, state: FillState) -> Optional[Domains]:
+        words: Dict[int, int] = {}
+        positions: Dict[int, Dict[int, int]] = {}
+        strengths: Dict[int, int] = {}
+        for a_idx, answer in enumerate(state.answers):
+            if answer.is_complete():
+                continue
+            bucket = self.index.bucket(answer.length())
+            if bucket is None:
+                return None
+            words[a_idx] = bucket.intersect(answer.pattern)
+            positions[a_idx] = _open_positions(answer.content)
+            strengths[a_idx] = answer.strength
+        domains = Domains(words, {}, positions, strengths)
+        if not self._exclude_used(domains, state, range(len(state.answers))):
+            return None
+        return self._revise(state, domains, set(words.keys()))
+
+    def _propagate_from(self, state: FillState, previous: Domains) -> Optional[Domains]:
+        words = dict(previous.words)
+        letters = dict(previous.letters)
+        strengths = dict(previous.strengths)
+        domains = Domains(words, letters, previous.positions, strengths)
+        queue: Set[int] = set()
+        completed = []
+        for a_idx in previous.words:
+            answer = state.answers[a_idx]
+            if answer.strength == strengths[a_idx]:
+                continue
+            if answer.is_complete():
+                del words[a_idx]
+                del strengths[a_idx]
+                completed.append(a_idx)
+                continue
+            bucket = self.index.bucket(answer.length())
+            words[a_idx] &= bucket.intersect(answer.pattern)
+            strengths[a_idx] = answer.strength
+            queue.add(a_idx)
+        for a_idx, answer in enumerate(state.answers):
+            if a_idx in words:
+                for grid_idx, position in previous.positions[a_idx].items():
+                    if answer.pattern[position] is not None:
+                        letters.pop(grid_idx, None)
+        if not self._exclude_used(domains, state, completed, queue):
+            return None
+        return self._revise(state, domains, queue)
+
+    def _exclude_used(self, domains: Domains, state: FillState, answer_indexes, queue: Optional[Set[int]]=None) -> bool:
+        """Removes the words of the given complete answers from the domains of incomplete answers."""
+        words = domains.words
+        for u_idx in answer_indexes:
+            rendering = state.used[u_idx]
+            if rendering is None:
+                continue
+            length = len(rendering)
+            bucket = self.index.bucket(length)
+            if bucket is None:
+                continue
+            used_mask = bucket.intersect(tuple(rendering))
+            if not used_mask:
+                continue
+            for a_idx in words:
+                if state.answers[a_idx].length() == length and words[a_idx] & used_mask:
+                    words[a_idx] &= ~used_mask
+                    if queue is not None:
+                        queue.add(a_idx)
+        for a_idx in words:
+            if not words[a_idx]:
+                return False
+        return True
+
+    def _revise(self, state: FillState, domains: Domains, queue: Set[int]) -> Optional[Domains]:
+        words, letters, positions = domains.words, domains.letters, domains.positions
+        buckets: Dict[int, LengthBucket] = self.index.buckets
+        while queue:
+            a_idx = queue.pop()
+            domain = words[a_idx]
+            if not domain:
+                return None
+            bucket_masks = buckets[state.answers[a_idx].length()].masks
+            for grid_idx, position in positions[a_idx].items():
+                if state.answers[a_idx].pattern[position] is not None:
+                    continue
+                current = letters.get(grid_idx, None)
+                supported = frozenset([letter for letter, mask in bucket_masks[position].items()
+                                       if (domain & mask) and (current is None or letter in current)])
+                if not supported:
+                    return None
+                if current is not None and len(supported) == len(current):
+                    continue
+                letters[grid_idx] = supported
+                for b_idx in state.crosses[grid_idx]:
+                    if b_idx == a_idx or b_idx not in words:
+                        continue
+                    b_masks = buckets[state.answers[b_idx].length()].masks[positions[b_idx][grid_idx]]
+                    allowed = 0
+                    for letter in supported:
+                        allowed |= b_masks.get(letter, 0)
+                    revised = words[b_idx] & allowed
+                    if revised != words[b_idx]:
+                        if not revised:
+                            return None
+                        words[b_idx] = revised
+                        queue.add(b_idx)
+        return domains
+
+    def sizes(self, domains: Domains) -> Dict[int, int]:
+        """Returns a map of incomplete answer index to number of candidate words."""
+        return {a_idx: popcount(mask) for a_idx, mask in domains.words.items()}
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import logging
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from puzzicle.puzzicon.fill import BankItem, Pattern
+from puzzicle.puzzicon.fill.bank import Bank
+from puzzicle.puzzicon.fill.filler import FillListener, _CONTINUE
+from puzzicle.puzzicon.fill.index import _key_masks
+from puzzicle.puzzicon.fill.state import FillState
+
+_log = logging.getLogger(__name__)
+_DEFAULT_CACHE_SIZE = 1 << 16
+
+
+class WordScorer(object):
+
+    """
+    Scores of the words of a bank and of fills made from them. The score of a
+    fill is the sum of the scores of its words.
+
+    The best score of the words that match a pattern is an upper bound on the
+    score that a fill can give the answer with that pattern. For a bank with
+    an index, the words of each length are grouped into tiers of equal score,
+    each with a bitset over the words, and the best score is that of the first
+    tier, best first, whose bitset intersects the pattern's. For other banks,
+    the matching words are scored one by one. Best scores are cached,
+    evicting the oldest entry once the cache holds cache_size entries.
+    """
+
+    def __init__(self, bank: Bank, cache_size: int=_DEFAULT_CACHE_SIZE):
+        self.bank = bank
+        self.cache_size = cache_size
+        self._best_cache: Dict[Pattern, Optional[float]] = {}
+        self._tiers: Dict[int, List[Tuple[float, int]]] = {}
+        if bank.index is not None:
+            for length, bucket in bank.index.buckets.items():
+                masks = _key_masks(map(bank.score, bucket.renderings()), bucket.size())
+                self._tiers[length] = sorted(masks.items(), reverse=True)
+
+    def score(self, rendering: str) -> float:
+        return self.bank.score(rendering)
+
+    def best(self, pattern: Pattern) -> Optional[float]:
+        """
+        Finds the best score of the words that match a pattern.
+        @param pattern: the pattern
+        @return: the best score, or None if no word matches
+        """
+        cache = self._best_cache
+        try:
+            return cache[pattern]
+        except KeyError:
+            pass
+        index = self.bank.index
+        if index is None:
+            best = max([self.score(item.rendering) for item in self.bank.filter(pattern)], default=None)
+        else:
+            best = None
+            bucket = index.bucket(len(pattern))
+            if bucket is not None:
+                mask = bucket.intersect(pattern)
+                for score, tier in self._tiers[len(pattern)]:
+                    if mask & tier:
+                        best = score
+                        break
+        if len(cache) >= self.cache_size:
+            del cache[next(iter(cache))]
+        cache[pattern] = best
+        return best
+
+    def fill_score(self, state: FillState) -> float:
+        """Sums the scores of the words of the complete answers of a state."""
+        return sum([self.score(rendering) for rendering in state.used if rendering is not None])
+
+    def bound(self, state: FillState) -> Optional[float]:
+        """
+        Computes an upper bound on the score of any complete state that can be reached from a state.
+        @param state: the state
+        @return: the bound, or None if some incomplete answer matches no word
+        """
+        bound = 0.0
+        for answer, rendering in zip(state.answers, state.used):
+            if rendering is not None:
+                bound += self.score(rendering)
+                continue
+            best = self.best(answer.pattern)
+            if best is None:
+                return None
+            bound += best
+        return bound
+
+
+class HighestScoreFirst(object):
+
+    """Value orderer that ranks the words that could fill an answer by their scores, best first."""
+
+    def __init__(self, scorer: WordScorer):
+        self.scorer = scorer
+
+    # noinspection PyUnusedLocal
+    def rank(self, state: FillState, answer_idx: int, items: Iterable[BankItem]) -> List[Tuple[float, BankItem]]:
+        """
+        Scores words that could fill an answer.
+        @param state: the state
+        @param answer_idx: index of the answer
+        @param items: words that match the answer's pattern
+        @return: list of score and word, highest score first
+        """
+        score = self.scorer.score
+        scored = [(score(item.rendering), item) for item in items]
+        scored.sort(key=_SCORE, reverse=True)
+        return scored
+
+
+# noinspection PyPep8Naming
+def _SCORE(scored: Tuple[float, BankItem]) -> float:
+    return scored[0]
+
+
+class BestFillListener(FillListener):
+
+    """
+    Listener for a branch-and-bound search for the complete state with the
+    best score. It keeps the best complete state visited so far and rejects
+    any state whose bound is not better than that state's score, so the
+    search never descends into a subtree that cannot improve on it. The
+    search continues until the space is exhausted or a threshold is reached;
+    with a duration threshold, the value is the best state found in that time.
+
+    Each improvement is passed to the on_improvement callable, if there is one,
+    along with its score. Listeners spawned for subtrees do not have the
+    callable; improvements they find are reported when they are absorbed.
+    """
+
+    def __init__(self, scorer: WordScorer, node_threshold: int=None, duration_threshold: float=None,
+                 on_improvement: Optional[Callable[[FillState, float], Any]]=None):
+        super().__init__(node_threshold, duration_threshold)
+        self.scorer = scorer
+        self.on_improvement = on_improvement
+        self.best: Optional[FillState] = None
+        self.best_score: Optional[float] = None
+        self.improvements = 0
+
+    def check_state(self, state: FillState, bank: Bank):
+        if state.is_complete():
+            self._offer(state, self.scorer.fill_score(state))
+        return _CONTINUE
+
+    def _offer(self, state: FillState, score: float):
+        if self.best_score is None or score > self.best_score:
+            self.best, self.best_score = state, score
+            self.improvements += 1
+            _log.debug("fill with score %s found after %s nodes", score, self.count)
+            if self.on_improvement is not None:
+                self.on_improvement(state, score)
+
+    def admits(self, state: FillState) -> bool:
+        if self.best_score is None:
+            return True
+        bound = self.scorer.bound(state)
+        return bound is not None and bound > self.best_score
+
+    def value(self):
+        return self.best
+
+    def spawn(self) -> 'BestFillListener':
+        return BestFillListener(self.scorer, self.node_threshold, self.duration_threshold)
+
+    def absorb(self, other: 'BestFillListener'):
+        super().absorb(other)
+        if other.best is not None:
+            self._offer(other.best, other.best_score)
+
+    def progress(self) -> Dict[str, Any]:
+        progress = super().progress()
+        progress.update(best=self.best, best_score=self.best_score, improvements=self.improvements)
+        return progress
+
+    def restore(self, progress: Dict[str, Any]):
+        super().restore(progress)
+        self.best, self.best_score, self.improvements = progress['best'], progress['best_score'], progress['improvements']
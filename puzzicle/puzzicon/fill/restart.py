@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import logging
+import random
+from typing import Iterable, Iterator
+
+from puzzicle.puzzicon.fill.filler import Filler, FillListener, FirstCompleteListener
+from puzzicle.puzzicon.fill.nogood import NogoodCache
+from puzzicle.puzzicon.fill.state import FillState
+
+_log = logging.getLogger(__name__)
+
+
+def luby(i: int) -> int:
+    """
+    Returns the i-th term of the Luby sequence 1, 1, 2, 1, 1, 2, 4, 1, 1, 2, ...
+    @param i: term number, starting at 1
+    @return: the term
+    """
+    assert i > 0, "term number must be positive"
+    while True:
+        k = i.bit_length()
+        if i == (1 << k) - 1:
+            return 1 << (k - 1)
+        i -= (1 << (k - 1)) - 1
+
+
+class LubySchedule(object):
+
+    """Node budgets that are a unit times the terms of the Luby sequence."""
+
+    def __init__(self, unit: int=100):
+        assert unit > 0, "unit must be positive"
+        self.unit = unit
+
+    def __iter__(self) -> Iterator[int]:
+        i = 1
+        while True:
+            yield self.unit * luby(i)
+            i += 1
+
+
+class GeometricSchedule(object):
+
+    """Node budgets that start at an initial value and grow by a constant factor."""
+
+    def __init__(self, initial: int=100, factor: float=1.5):
+        assert initial > 0, "initial budget must be positive"
+        assert factor >= 1, "factor must be at least 1"
+        self.initial = initial
+        self.factor = factor
+
+    def __iter__(self) -> Iterator[int]:
+        budget = float(self.initial)
+        while True:
+            yield int(budget)
+            budget *= self.factor
+
+
+class RestartingFiller(object):
+
+    """
+    Filler that runs a sequence of searches from the same state, each with a
+    node budget taken from a schedule, until one finishes. Each search breaks
+    ties between answers and between suggestions at random, so a search that
+    is stuck below some early choice is likely to take a different path after
+    it restarts.
+
+    Unfillable states found by each search are recorded in the filler's nogood
+    cache, which is kept across restarts; if the filler has no cache, one is
+    created for the duration of the fill. A search is only cut short by its
+    budget, so when one finishes, its outcome is that of a complete search:
+    either the listener stopped it or there is no fill. The listener is shared
+    by all the searches, so its thresholds apply to the total, and a listener
+    that collects every complete state may see some of them more than once.
+    If the schedule runs out of budgets, the fill ends without a result, as
+    it would if the listener's threshold were reached.
+    """
+
+    def __init__(self, filler: Filler, schedule: Iterable[int]=None, seed=None):
+        self.filler = filler
+        self.schedule = schedule or LubySchedule()
+        self.rng = random.Random(seed)
+        self.restarts = 0
+
+    def fill(self, state: FillState, listener: FillListener=None) -> FillListener:
+        listener = listener or FirstCompleteListener()
+        filler = self.filler
+        self.restarts = 0
+        original_rng, original_nogoods = filler.rng, filler.nogoods
+        filler.rng = self.rng
+        if filler.nogoods is None:
+            filler.nogoods = NogoodCache()
+        try:
+            for budget in self.schedule:
+                search = filler.search(state, listener)
+                if search.run(max_nodes=budget):
+                    break
+                self.restarts += 1
+                _log.debug("restarting after %s nodes; %s", budget, filler.nogoods)
+        finally:
+            filler.rng, filler.nogoods = original_rng, original_nogoods
+        return listener
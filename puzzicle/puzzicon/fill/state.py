@@ -2,9 +2,10 @@
 # -*- coding: utf-8 -*-
 
 import logging
+import random
 from collections import defaultdict
 from typing import NamedTuple
-from typing import Tuple, List, Dict, Optional, Iterator, Callable
+from typing import Tuple, List, Dict, Optional, Iterator, Callable, Set
 from typing import Union
 import puzzicle.puzzicon
 from puzzicle.puzzicon.fill import Answer, Suggestion, Template
@@ -54,11 +55,17 @@ class FillState(NamedTuple):
     def is_complete(self):
         return self.num_incomplete == 0
 
-    def provide_unfilled(self, sorter: Optional[Callable[[Answer], int]]=None) -> Iterator[int]:
-        """Return an iterator supplying indexes of answers that are not complete."""
+    def provide_unfilled(self, sorter: Optional[Callable[[Answer], int]]=None, rng: Optional[random.Random]=None) -> Iterator[int]:
+        """
+        Return an iterator supplying indexes of answers that are not complete.
+        @param sorter: sort key function for answers
+        @param rng: random number generator used to break ties between answers, or None to break them by index
+        """
         if sorter is None:
             sorter = default_answer_sort_key
         indexes_and_answers = list(filter(lambda idx_and_answer: not idx_and_answer[1].is_complete(), enumerate(self.answers)))
+        if rng is not None:
+            rng.shuffle(indexes_and_answers)
         def sort_key(idx_and_answer: Tuple[int, Answer]):
             return sorter(idx_and_answer[1])
         indexes_and_answers.sort(key=sort_key)
@@ -78,14 +85,14 @@ class FillState(NamedTuple):
                     rendering = ''.join(new_answer.content)
                     used[a_idx] = rendering
                     num_incomplete -= 1
-        for grid_idx in suggestion.legend_updates:
-            crossing_answer_indexes = self.crosses[grid_idx]
-            pass
-            for a_idx in crossing_answer_indexes:
-                pass
+        # only the answers that cross an updated cell change, and only at those cells
+        cell_values_by_answer: Dict[int, List[Tuple[int, str]]] = defaultdict(list)
+        for grid_idx, value in suggestion.legend_updates.items():
+            for a_idx in self.crosses[grid_idx]:
                 if a_idx not in newly_defined_answer_indexes:
-                    changed_answer = answers[a_idx].update(suggestion.legend_updates)
-                    answers[a_idx] = changed_answer
+                    cell_values_by_answer[a_idx].append((grid_idx, value))
+        for a_idx, cell_values in cell_values_by_answer.items():
+            answers[a_idx] = answers[a_idx].update_cells(cell_values)
         if num_incomplete == self.num_incomplete:
             # avoid re-tupling used list if nothing changed
             return FillState(tuple(answers), self.crosses, self.used, num_incomplete)
@@ -94,26 +101,22 @@ class FillState(NamedTuple):
 
     @staticmethod
     def from_grid(grid: GridModel) -> 'FillState':
-        answers: List[Answer] = []
-        for entry in grid.entries():
-            indexes = []
-            for square in entry.squares:
-                index = grid.get_index(square)
-                indexes.append(index)
-            answers.append(Answer.create(indexes))
-        return FillState.from_answers(tuple(answers), grid.dims())
+        topology = grid.topology()
+        answers = tuple([Answer.create(topology.slot(slot_idx)) for slot_idx in range(topology.num_slots())])
+        crosses = tuple([topology.slots_at(grid_idx) for grid_idx in range(grid.num_rows * grid.num_cols)])
+        return FillState(answers, crosses, (None,) * len(answers), len(answers))
 
     # noinspection PyProtectedMember
     def render(self, grid: GridModel, newline="\n", none_val='_', dark=puzzicle.puzzicon.grid._DARK) -> str:
         legend = {}
-        entries = grid.entries()
-        assert len(entries) == len(self.answers)
+        topology = grid.topology()
+        assert topology.num_slots() == len(self.answers)
         for i in range(len(self.answers)):
-            entry, pattern = entries[i], self.answers[i].pattern
-            assert len(entry.squares) == len(pattern)
-            for j in range(len(pattern)):
-                if pattern[j] is not None:
-                    legend[entry.squares[j].index] = pattern[j]
+            cells, pattern = topology.slot(i), self.answers[i].pattern
+            assert len(cells) == len(pattern)
+            for grid_idx, letter in zip(cells, pattern):
+                if letter is not None:
+                    legend[grid_idx] = letter
         rows = []
         for r in range(grid.num_rows):
             row = []
@@ -169,3 +172,29 @@ class FillState(NamedTuple):
         return updated_answers
 
 
+def components(state: FillState) -> List[Tuple[int, ...]]:
+    """
+    Partitions the incomplete answers of a state into groups such that no
+    open cell is shared by answers of different groups.
+    @param state: the state
+    @return: list of groups of answer indexes, each sorted
+    """
+    grouped: Set[int] = set()
+    groups = []
+    for a_idx, word in enumerate(state.used):
+        if word is not None or a_idx in grouped:
+            continue
+        members = [a_idx]
+        grouped.add(a_idx)
+        i = 0
+        while i < len(members):
+            for spot in state.answers[members[i]].content:
+                if not isinstance(spot, int):   # inlined Template.is_value_defined, as this runs at every node
+                    continue
+                for b_idx in state.crosses[spot]:
+                    if b_idx not in grouped:
+                        grouped.add(b_idx)
+                        members.append(b_idx)
+            i += 1
+        groups.append(tuple(sorted(members)))
+    return groups
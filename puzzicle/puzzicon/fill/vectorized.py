@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Optional NumPy matcher for patterns that are too long for a bank's pattern
+registry. If NumPy is not installed, is_available returns false and banks
+fall back to matching each deposit in turn.
+"""
+
+import logging
+from collections import defaultdict
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from puzzicle.puzzicon.fill import BankItem, Pattern
+from puzzicle.puzzicon.fill.index import _is_packable, _RENDERING
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+_log = logging.getLogger(__name__)
+
+
+def is_available() -> bool:
+    return numpy is not None
+
+
+def _code(letter: str) -> Optional[int]:
+    if len(letter) != 1:
+        return None
+    code = ord(letter)
+    return code if code < 256 else None
+
+
+def _matches(item: BankItem, pattern: Pattern) -> bool:
+    for position, letter in enumerate(pattern):
+        if letter is not None and letter != item.tableau[position]:
+            return False
+    return True
+
+
+class ArrayMatcher(object):
+
+    """
+    Words of each length stored as a 2-D array of Latin-1 letter codes with
+    one row per position, so that each position's letters are contiguous.
+    A pattern is evaluated by comparing one row of the array with each
+    defined letter and intersecting the results, which yields the indexes
+    of the matching words. Items that cannot be coded this way, such as words
+    with non-Latin-1 letters, are matched one by one.
+    """
+
+    def __init__(self, items: Iterable[BankItem]):
+        assert is_available(), "numpy is not installed"
+        by_length: Dict[int, List[BankItem]] = defaultdict(list)
+        self.residue: Dict[int, List[BankItem]] = defaultdict(list)
+        for item in items:
+            if item.length() > 0 and _is_packable(item) and all([_code(letter) is not None for letter in item.tableau]):
+                by_length[item.length()].append(item)
+            else:
+                self.residue[item.length()].append(item)
+        self.items: Dict[int, List[BankItem]] = {}
+        self.columns = {}
+        for length, length_items in by_length.items():
+            length_items.sort(key=_RENDERING)
+            codes = numpy.frombuffer(''.join(map(_RENDERING, length_items)).encode('latin-1'), dtype=numpy.uint8)
+            self.items[length] = length_items
+            self.columns[length] = numpy.ascontiguousarray(codes.reshape(len(length_items), length).T)
+
+    def rows(self, pattern: Pattern):
+        """
+        Finds the words that match a pattern.
+        @param pattern: the pattern
+        @return: array of the indexes of matching words among the coded words of the pattern's length
+        """
+        columns = self.columns.get(len(pattern), None)
+        if columns is None:
+            return numpy.empty(0, dtype=numpy.intp)
+        selected = None
+        for position, letter in enumerate(pattern):
+            if letter is None:
+                continue
+            code = _code(letter)
+            if code is None:
+                return numpy.empty(0, dtype=numpy.intp)
+            column = columns[position] == code
+            if selected is None:
+                selected = column
+            else:
+                numpy.logical_and(selected, column, out=selected)
+        if selected is None:
+            return numpy.arange(columns.shape[1])
+        return numpy.flatnonzero(selected)
+
+    def filter(self, pattern: Pattern) -> Iterator[BankItem]:
+        """
+        Returns an iterator that supplies the items that match a pattern. Coded
+        items are supplied first, in sorted order, followed by other items.
+        @param pattern: the pattern
+        @return: iterator over matching items
+        """
+        items = self.items.get(len(pattern), None)
+        if items is not None:
+            yield from map(items.__getitem__, self.rows(pattern).tolist())
+        for item in self.residue.get(len(pattern), ()):
+            if _matches(item, pattern):
+                yield item
+
+    def count(self, pattern: Pattern) -> int:
+        count = len(self.rows(pattern)) if len(pattern) in self.columns else 0
+        for item in self.residue.get(len(pattern), ()):
+            if _matches(item, pattern):
+                count += 1
+        return count
@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 
 import math
-from typing import List, Tuple, NamedTuple
+from typing import List, Tuple, NamedTuple, Optional
 import itertools
 
 
@@ -53,12 +53,117 @@ class Entry(object):
         return "Entry<at={};{}>".format(self.location, self.squares)
 
 
+class GridTopology(object):
+
+    """
+    Slots of a grid, their numbering and how they cross, stored as flat tuples
+    of integers. Slots are in the same order as GridModel.entries. The cells
+    of slot i are slot_cells[slot_offsets[i]:slot_offsets[i + 1]]; for the
+    cell at position k of that range, crossing_slots[k] is the index of the
+    other slot that contains the cell, or -1 if there is none, and
+    crossing_positions[k] is the position of the cell in that slot. The slots
+    that contain grid index g are cell_slots[cell_offsets[g]:cell_offsets[g + 1]].
+    cell_numbers[g] is the number of the slots that start at grid index g, or 0.
+    """
+
+    def __init__(self, num_rows: int, num_cols: int, directions: Tuple[int, ...], numbers: Tuple[int, ...],
+                 slot_offsets: Tuple[int, ...], slot_cells: Tuple[int, ...]):
+        self.num_rows = num_rows
+        self.num_cols = num_cols
+        self.slot_directions = directions
+        self.slot_numbers = numbers
+        self.slot_offsets = slot_offsets
+        self.slot_cells = slot_cells
+        self.slot_starts = tuple([slot_cells[offset] for offset in slot_offsets[:-1]])
+        self.slot_lengths = tuple([slot_offsets[i + 1] - slot_offsets[i] for i in range(len(directions))])
+        num_cells = num_rows * num_cols
+        memberships: List[List[Tuple[int, int]]] = [[] for _ in range(num_cells)]
+        for slot_idx in range(len(directions)):
+            for position in range(self.slot_lengths[slot_idx]):
+                memberships[slot_cells[slot_offsets[slot_idx] + position]].append((slot_idx, position))
+        cell_offsets, cell_slots = [0], []
+        for membership in memberships:
+            cell_slots += [slot_idx for slot_idx, _ in membership]
+            cell_offsets.append(len(cell_slots))
+        self.cell_offsets = tuple(cell_offsets)
+        self.cell_slots = tuple(cell_slots)
+        crossing_slots, crossing_positions = [], []
+        for slot_idx in range(len(directions)):
+            for grid_idx in self.slot(slot_idx):
+                others = [(other, position) for other, position in memberships[grid_idx] if other != slot_idx]
+                other, position = others[0] if others else (-1, -1)
+                crossing_slots.append(other)
+                crossing_positions.append(position)
+        self.crossing_slots = tuple(crossing_slots)
+        self.crossing_positions = tuple(crossing_positions)
+        cell_numbers = [0] * num_cells
+        for slot_idx, number in enumerate(numbers):
+            cell_numbers[self.slot_starts[slot_idx]] = number
+        self.cell_numbers = tuple(cell_numbers)
+
+    @staticmethod
+    def build(grid: 'GridModel') -> 'GridTopology':
+        num_rows, num_cols = grid.num_rows, grid.num_cols
+        dark = [[square.dark() for square in row] for row in grid.rows]
+
+        def is_open(r: int, c: int) -> bool:
+            return r < num_rows and c < num_cols and not dark[r][c]
+
+        directions, numbers, slot_offsets, slot_cells = [], [], [0], []
+        number = 1
+        for r, c in itertools.product(range(num_rows), range(num_cols)):
+            if dark[r][c]:
+                continue
+            either = False
+            for direction, (dr, dc) in enumerate(((0, 1), (1, 0))):
+                if (c if dc else r) == 0 or (not is_open(r - dr, c - dc) and is_open(r + dr, c + dc)):
+                    row, col = r, c
+                    while is_open(row, col):
+                        slot_cells.append(row * num_cols + col)
+                        row, col = row + dr, col + dc
+                    slot_offsets.append(len(slot_cells))
+                    directions.append(direction)
+                    numbers.append(number)
+                    either = True
+            if either:
+                number += 1
+        return GridTopology(num_rows, num_cols, tuple(directions), tuple(numbers), tuple(slot_offsets), tuple(slot_cells))
+
+    def num_slots(self) -> int:
+        return len(self.slot_directions)
+
+    def slot(self, slot_idx: int) -> Tuple[int, ...]:
+        """Gets the grid indexes of the cells of a slot."""
+        return self.slot_cells[self.slot_offsets[slot_idx]:self.slot_offsets[slot_idx + 1]]
+
+    def slots_at(self, grid_idx: int) -> Tuple[int, ...]:
+        """Gets the indexes of the slots that contain a cell."""
+        return self.cell_slots[self.cell_offsets[grid_idx]:self.cell_offsets[grid_idx + 1]]
+
+    def location(self, slot_idx: int) -> Location:
+        start = self.slot_starts[slot_idx]
+        direction = _DOWN if self.slot_directions[slot_idx] else _ACROSS
+        return Location(direction, self.slot_numbers[slot_idx], start // self.num_cols, start % self.num_cols)
+
+
 class GridModel(object):
 
     def __init__(self, rows: List[List[Square]]):
         self.rows = rows
         self.num_rows = len(rows)
         self.num_cols = len(rows[0]) if len(rows) > 0 else 0
+        self._topology: Optional[GridTopology] = None
+
+    def topology(self) -> GridTopology:
+        """
+        Gets the topology of this grid, computing it on first use. The
+        topology is cached, so the squares of the grid must not change
+        after this is called.
+        @return: the topology
+        """
+        if self._topology is None:
+            self._topology = GridTopology.build(self)
+        return self._topology
 
     @staticmethod
     def determine_dims(grid_chars: str) -> Tuple[int, int]:
@@ -156,20 +261,11 @@ class GridModel(object):
         return squares
 
     def entries(self) -> List[Entry]:
-        number = 1
+        topology = self.topology()
         entries = []
-        for r, c in itertools.product(range(self.num_rows), range(self.num_cols)):
-            either = False
-            if self.is_across(r, c):
-                squares = self.until_dead_across(r, c)
-                entries.append(Entry(Location(_ACROSS, number, r, c), squares))
-                either = True
-            if self.is_down(r, c):
-                squares = self.until_dead_down(r, c)
-                entries.append(Entry(Location(_DOWN, number, r, c), squares))
-                either = True
-            if either:
-                number += 1
+        for slot_idx in range(topology.num_slots()):
+            squares = [self.rows[grid_idx // self.num_cols][grid_idx % self.num_cols] for grid_idx in topology.slot(slot_idx)]
+            entries.append(Entry(topology.location(slot_idx), squares))
         return entries
 
     def __str__(self):
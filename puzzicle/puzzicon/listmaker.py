@@ -2,7 +2,7 @@
 
 import sys
 from typing import Optional, TextIO, Callable
-from puzzicle.puzzicon import Puzzeme, InvalidPuzzemeException
+from puzzicle.puzzicon import InvalidPuzzemeException, get_canonicalizer
 import re
 
 
@@ -27,19 +27,16 @@ class ListMaker(object):
         assert error_mode in ('keep', 'drop', 'halt')
         self.allowed = 'alphanumeric'
         self.preserve_case = preserve_case
+        self.canonicalize = get_canonicalizer(self.allowed, {'case'} if preserve_case else frozenset())
 
     def transliterate(self, line: str, ofile: Optional[TextIO]=None) -> Optional[str]:
         line = self.clean(line)
         cs = None
-        create_kwargs = {
-            'allowed': self.allowed,
-            'preserve': {'case'} if self.preserve_case else frozenset()
-        }
         try:
             if self.preserve_spaces:
-                cs = [Puzzeme.canonicalize(part, **create_kwargs) for part in line.split()]
+                cs = [self.canonicalize(part) for part in line.split()]
             else:
-                cs = [Puzzeme.canonicalize(line, **create_kwargs)]
+                cs = [self.canonicalize(line)]
         except InvalidPuzzemeException:
             if self.error_mode == 'halt':
                 raise
@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Indexes and query planning for Puzzarian searches.
+
+Predicates created by Filters describe the puzzemes they accept: an exact
+stature, an exact canonical form, or a wildcard or regular expression
+pattern. Patterns made only of letters, single-character wildcards and
+runs of any characters are reduced to a shape: an exact or minimum length,
+letters at fixed positions from either end, and a literal prefix and
+suffix. The planner estimates the number of candidates each index would
+supply for the shapes of a query, takes them from the index that supplies
+the fewest, and applies every predicate to each candidate, so an index only
+narrows the candidates and never decides a match by itself.
+"""
+
+import bisect
+import logging
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from puzzicle.puzzicon import Puzzeme, Filters, StaturePredicate, CanonicalPredicate
+from puzzicle.puzzicon import WildcardPredicate, RegexPredicate
+from puzzicle.puzzicon.fill import Pattern
+from puzzicle.puzzicon.fill.index import iterate_bits, popcount, _column_masks
+
+_log = logging.getLogger(__name__)
+_ANY = object()        # exactly one character
+_ANY_RUN = object()    # zero or more characters
+_QUANTIFIERS = frozenset('*+?{')
+_PREFIX_END = '\U0010ffff'
+
+
+def wildcard_tokens(pattern: str) -> Optional[List]:
+    """
+    Tokenizes a shell-style wildcard pattern.
+    @param pattern: the pattern
+    @return: list of literal characters and wildcard tokens, or None if the
+    pattern contains a character set
+    """
+    tokens = []
+    for ch in pattern:
+        if ch == '*':
+            if not tokens or tokens[-1] is not _ANY_RUN:
+                tokens.append(_ANY_RUN)
+        elif ch == '?':
+            tokens.append(_ANY)
+        elif ch == '[':
+            return None
+        else:
+            tokens.append(ch)
+    return tokens
+
+
+def regex_tokens(pattern: str) -> Optional[List]:
+    """
+    Tokenizes a regular expression that is matched against an entire string.
+    @param pattern: the regular expression
+    @return: list of literal characters and wildcard tokens, or None if the
+    expression contains anything other than letters, digits, '.', '.*', '.+'
+    and anchors at either end
+    """
+    if pattern.startswith('^'):
+        pattern = pattern[1:]
+    if pattern.endswith('$') and not pattern.endswith('\\$'):
+        pattern = pattern[:-1]
+    tokens = []
+    i = 0
+    while i < len(pattern):
+        ch = pattern[i]
+        following = pattern[i + 1] if i + 1 < len(pattern) else None
+        if ch == '.':
+            if following == '*':
+                tokens.append(_ANY_RUN)
+                i += 1
+            elif following == '+':
+                tokens += [_ANY, _ANY_RUN]
+                i += 1
+            elif following in _QUANTIFIERS:
+                return None
+            else:
+                tokens.append(_ANY)
+        elif ch.isascii() and ch.isalnum():
+            if following in _QUANTIFIERS:
+                return None
+            tokens.append(ch)
+        else:
+            return None
+        i += 1
+    return tokens
+
+
+class Shape(NamedTuple):
+
+    """
+    Description of the strings that match a pattern. The head letters are
+    (position, letter) pairs counted from the start; the tail letters are
+    counted from the end, so that the last character is at position 0.
+    """
+
+    length: Optional[int]
+    min_length: int
+    head: Tuple[Tuple[int, str], ...]
+    tail: Tuple[Tuple[int, str], ...]
+    prefix: str
+    suffix: str
+
+    @staticmethod
+    def of(tokens: Sequence) -> 'Shape':
+        runs = [i for i, token in enumerate(tokens) if token is _ANY_RUN]
+        head_end = runs[0] if runs else len(tokens)
+        tail_start = runs[-1] + 1 if runs else 0
+        head = tuple([(i, token) for i, token in enumerate(tokens[:head_end]) if isinstance(token, str)])
+        tail_tokens = tokens[tail_start:]
+        tail = tuple([(len(tail_tokens) - 1 - i, token) for i, token in enumerate(tail_tokens) if isinstance(token, str)])
+        min_length = len(tokens) - len(runs)
+        return Shape(None if runs else len(tokens), min_length, head, tail,
+                     _literal_run(tokens[:head_end]), _literal_run(tail_tokens[::-1])[::-1])
+
+    def letters(self, length: int) -> Iterator[Tuple[int, str]]:
+        """Supplies (position, letter) pairs counted from the start of a string of a given length."""
+        yield from self.head
+        for position, letter in self.tail:
+            yield length - 1 - position, letter
+
+    def pattern(self) -> Optional[Pattern]:
+        """
+        Gets the fill pattern equivalent to this shape.
+        @return: the pattern, or None if the length of the shape is not fixed
+        """
+        if self.length is None:
+            return None
+        letters: List[Optional[str]] = [None] * self.length
+        for position, letter in self.head:
+            letters[position] = letter
+        return Pattern(letters)
+
+
+def _literal_run(tokens: Sequence) -> str:
+    letters = []
+    for token in tokens:
+        if not isinstance(token, str):
+            break
+        letters.append(token)
+    return ''.join(letters)
+
+
+def shape_of(predicate: Callable) -> Optional[Shape]:
+    """
+    Gets the shape of the canonical forms that a predicate accepts.
+    @param predicate: a predicate created by Filters, or any other callable
+    @return: the shape, or None if the predicate is not understood
+    """
+    tokens = None
+    if isinstance(predicate, CanonicalPredicate) and predicate.literal is not None:
+        tokens = list(predicate.literal)
+    elif isinstance(predicate, WildcardPredicate):
+        tokens = wildcard_tokens(predicate.pattern)
+    elif isinstance(predicate, RegexPredicate):
+        tokens = regex_tokens(predicate.pattern)
+    elif isinstance(predicate, StaturePredicate) and predicate.value is not None:
+        tokens = [_ANY] * predicate.value
+    return None if tokens is None else Shape.of(tokens)
+
+
+def pattern_of(predicate: Callable) -> Optional[Pattern]:
+    """
+    Translates a predicate created by Filters into a fill pattern, if the
+    predicate accepts exactly the strings of one length that have certain
+    letters at certain positions, as does the wildcard pattern '?A??E'.
+    @param predicate: the predicate
+    @return: the pattern, or None if the predicate is not equivalent to a pattern
+    """
+    shape = shape_of(predicate)
+    return None if shape is None else shape.pattern()
+
+
+class _StatureBucket(object):
+
+    """Puzzemes of one stature and, for each position, a bitset of the puzzemes that have each letter there."""
+
+    def __init__(self, length: int, ranks: List[int], canonicals: Sequence[str]):
+        self.ranks = ranks
+        self.full = (1 << len(ranks)) - 1
+        concatenated = ''.join([canonicals[rank] for rank in ranks])
+        self.masks = tuple([_column_masks(concatenated[position::length]) for position in range(length)])
+
+    def intersect(self, letters: Iterable[Tuple[int, str]]) -> int:
+        mask = self.full
+        for position, letter in letters:
+            mask &= self.masks[position].get(letter, 0)
+            if not mask:
+                break
+        return mask
+
+
+class QueryPlan(NamedTuple):
+
+    """Source of candidates for a query: the name of an index, the number of candidates, and the ranks of the candidates."""
+
+    source: str
+    cost: int
+    ranks: Callable[[], Iterable[int]]
+
+
+class PuzzemeIndex(object):
+
+    """
+    Indexes of a set of puzzemes, which are ranked in order of canonical form.
+    The indexes are a sorted list of canonical forms, for prefixes; a sorted
+    list of reversed canonical forms, for suffixes; and a bitset index of
+    letters at positions for each stature. The suffix and stature indexes
+    are built when first needed.
+    """
+
+    def __init__(self, puzzemes: Iterable[Puzzeme], by_canonical: Optional[Dict[str, Puzzeme]]=None):
+        self.puzzemes: List[Puzzeme] = sorted(puzzemes, key=lambda p: p.canonical)
+        self.canonicals: List[str] = [p.canonical for p in self.puzzemes]
+        self.by_canonical = by_canonical if by_canonical is not None else {p.canonical: p for p in self.puzzemes}
+        self._reversed: Optional[Tuple[List[str], List[int]]] = None
+        self._statures: Optional[Dict[int, List[int]]] = None
+        self._buckets: Dict[int, _StatureBucket] = {}
+
+    def size(self) -> int:
+        return len(self.puzzemes)
+
+    def _reversed_index(self) -> Tuple[List[str], List[int]]:
+        if self._reversed is None:
+            pairs = sorted([(c[::-1], rank) for rank, c in enumerate(self.canonicals)])
+            self._reversed = [key for key, _ in pairs], [rank for _, rank in pairs]
+        return self._reversed
+
+    def _bucket(self, length: int) -> Optional[_StatureBucket]:
+        if self._statures is None:
+            statures: Dict[int, List[int]] = {}
+            for rank, canonical in enumerate(self.canonicals):
+                statures.setdefault(len(canonical), []).append(rank)
+            self._statures = statures
+        bucket = self._buckets.get(length, None)
+        if bucket is None:
+            ranks = self._statures.get(length, None)
+            if ranks is None:
+                return None
+            bucket = _StatureBucket(length, ranks, self.canonicals)
+            self._buckets[length] = bucket
+        return bucket
+
+    @staticmethod
+    def _range(keys: List[str], prefix: str) -> Tuple[int, int]:
+        return bisect.bisect_left(keys, prefix), bisect.bisect_left(keys, prefix + _PREFIX_END)
+
+    def _exact_plan(self, predicates: Sequence[Callable]) -> Optional[QueryPlan]:
+        literals = set([p.literal for p in predicates if isinstance(p, CanonicalPredicate) and p.literal is not None])
+        if not literals:
+            return None
+        puzzeme = self.by_canonical.get(literals.pop(), None) if len(literals) == 1 else None
+        if puzzeme is None:
+            return QueryPlan('exact', 0, tuple)
+        rank = bisect.bisect_left(self.canonicals, puzzeme.canonical)
+        return QueryPlan('exact', 1, lambda: (rank,))
+
+    def filter(self, pattern: Pattern) -> Iterator[Puzzeme]:
+        """
+        Finds the puzzemes whose canonical forms match a fill pattern.
+        @param pattern: the pattern
+        @return: iterator over the matches in order of canonical form
+        """
+        bucket = self._bucket(len(pattern))
+        if bucket is None:
+            return iter(())
+        mask = bucket.intersect([(position, letter) for position, letter in enumerate(pattern) if letter is not None])
+        return map(self.puzzemes.__getitem__, map(bucket.ranks.__getitem__, iterate_bits(mask)))
+
+    def _stature_plan(self, shapes: Sequence[Shape]) -> Optional[QueryPlan]:
+        lengths = set([shape.length for shape in shapes if shape.length is not None])
+        if not lengths:
+            return None
+        length = lengths.pop()
+        bucket = self._bucket(length) if not lengths else None
+        if bucket is None or any([shape.min_length > length for shape in shapes]):
+            return QueryPlan('stature', 0, tuple)
+        mask = bucket.intersect([letter for shape in shapes for letter in shape.letters(length)])
+        return QueryPlan('stature', popcount(mask), lambda: map(bucket.ranks.__getitem__, iterate_bits(mask)))
+
+    def _prefix_plan(self, shapes: Sequence[Shape]) -> Optional[QueryPlan]:
+        prefix = max([shape.prefix for shape in shapes], key=len, default='')
+        if not prefix:
+            return None
+        lo, hi = self._range(self.canonicals, prefix)
+        return QueryPlan('prefix', hi - lo, lambda: range(lo, hi))
+
+    def _suffix_plan(self, shapes: Sequence[Shape]) -> Optional[QueryPlan]:
+        suffix = max([shape.suffix for shape in shapes], key=len, default='')
+        if not suffix:
+            return None
+        keys, ranks = self._reversed_index()
+        lo, hi = self._range(keys, suffix[::-1])
+        return QueryPlan('suffix', hi - lo, lambda: sorted(ranks[lo:hi]))
+
+    def plan(self, predicates: Sequence[Callable]) -> QueryPlan:
+        """
+        Chooses the index that supplies the fewest candidates for a query.
+        @param predicates: predicates on puzzemes
+        @return: the plan
+        """
+        shapes = [shape for shape in map(shape_of, predicates) if shape is not None]
+        plans = [self._exact_plan(predicates), self._stature_plan(shapes), self._prefix_plan(shapes), self._suffix_plan(shapes)]
+        best = QueryPlan('scan', self.size(), lambda: range(self.size()))
+        for plan in plans:
+            if plan is not None and plan.cost < best.cost:
+                best = plan
+        return best
+
+    def query(self, predicates: Optional[Sequence[Callable]]) -> Iterator[Puzzeme]:
+        """
+        Finds the puzzemes that satisfy all of the given predicates.
+        @param predicates: predicates on puzzemes
+        @return: iterator over the matches in order of canonical form
+        """
+        predicates = list(predicates or ())
+        plan = self.plan(predicates)
+        _log.debug("query answered from %s index with %s candidates", plan.source, plan.cost)
+        candidates = map(self.puzzemes.__getitem__, plan.ranks())
+        return filter(Filters.conjoin(predicates), candidates)
@@ -4,7 +4,8 @@ import logging
 import os
 import os.path
 import errno
-from typing import List, Dict, DefaultDict, Iterator
+import random
+from typing import List, Dict, DefaultDict, Iterator, Set
 
 import puz
 
@@ -122,6 +123,12 @@ def create_bank_from_wordlist_file(pathname: str='/usr/share/dict/words'):
     return puzzicle.puzzicon.fill.bank.Bank.with_registry([p.canonical for p in puzzemes], debug=_BANK_DEBUG)
 
 
+def random_words(seed: int=0, count: int=150, letters: str='ABCDE', length: int=3) -> Set[str]:
+    """Creates a set of at most count random words from a small alphabet, so that many of them cross."""
+    rng = random.Random(seed)
+    return set([''.join([rng.choice(letters) for _ in range(length)]) for _ in range(count)])
+
+
 class Render(object):
 
     @staticmethod
@@ -30,6 +30,6 @@ def do_main_with_bank(grid: GridModel, bank: Bank, fill_listener: FillListener):
 
 def do_main(grid: GridModel, wordlist: List[str], rng: random.Random, threshold: int):
     rng.shuffle(wordlist)
-    bank = Bank.with_registry(list(map(str.upper, wordlist)))
+    bank = Bank.with_index(list(map(str.upper, wordlist)))
     print("bank created with", bank.size(), "deposits")
     return do_main_with_bank(grid, bank, FirstCompleteListener(node_threshold=threshold))
\ No newline at end of file
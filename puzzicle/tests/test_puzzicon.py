@@ -2,6 +2,7 @@
 # -*- coding: utf-8 -*-
 
 import io
+import re
 import unittest
 
 from puzzicle import puzzicon
@@ -54,6 +55,17 @@ pumpkin"""
         puzzemes = puzzicon.create_puzzeme_set(ifile)
         self.assertSetEqual({Puzzeme.create('apples'), Puzzeme.create('peaches'), Puzzeme.create('pumpkin')}, puzzemes)
 
+    def test_create_puzzeme_set_batches(self):
+        wordlist = ['apple', 'cant', "can't", '', 'one', 'on e', 'pumpkin', "'", 'Cant']
+        expected = puzzicon.create_puzzeme_set(wordlist)
+        for batch_size, processes in [(1, None), (2, None), (3, 2)]:
+            with self.subTest(batch_size=batch_size, processes=processes):
+                intolerables = []
+                actual = puzzicon.create_puzzeme_set(wordlist, intolerables, batch_size=batch_size, processes=processes)
+                self.assertSetEqual(expected, actual)
+                self.assertIn(Puzzeme.create('cant', "can't", 'Cant'), actual)
+                self.assertListEqual(['', "'"], [rendering for rendering, _ in intolerables])
+
     def test_alphabet(self):
         self.assertEqual(26 * 2, len(puzzicon._ALPHABET_ALPHA))
         self.assertEqual(26 * 2, len(set(puzzicon._ALPHABET_ALPHA)))
@@ -104,6 +116,25 @@ class PuzzemeTest(unittest.TestCase):
 
 
 
+class CanonicalizerTest(unittest.TestCase):
+
+    def test_same_as_regex(self):
+        renderings = ["puzzle's\n", ' Málaga ', 'a1-b2', 'Ærøskøbing', '101st Airborne', '\u4e2d\u6587', '', 'x\ty']
+        for allowed, regex in puzzicon._REGEX_NONCHARMATCH.items():
+            for preserve in [frozenset(), {'case'}]:
+                canonicalizer = puzzicon.get_canonicalizer(allowed, preserve)
+                for rendering in renderings:
+                    with self.subTest(allowed=allowed, preserve=preserve, rendering=rendering):
+                        expected = re.sub(regex, '', puzzicon.unicode_normalize(rendering))
+                        if 'case' not in preserve:
+                            expected = expected.upper()
+                        self.assertEqual(expected, canonicalizer(rendering))
+
+    def test_shared(self):
+        self.assertIs(puzzicon.get_canonicalizer('alpha', {'case'}), puzzicon.get_canonicalizer('alpha', frozenset(['case'])))
+        self.assertIsNot(puzzicon.get_canonicalizer('alpha'), puzzicon.get_canonicalizer('alphanumeric'))
+
+
 class PuzzarianTest(unittest.TestCase):
 
     def test_search_many(self):
@@ -130,6 +130,18 @@ class AnswerTest(TestCase):
         actual = answer.to_updates(BankItem.from_word('GX'))
         self.assertDictEqual({2: 'X'}, actual)
 
+    def test_update(self):
+        answer = Answer.create([0, 'b', 2])
+        updated = answer.update({0: 'a', 1: 'x', 5: 'z'})
+        self.assertEqual(Answer.create(['a', 'b', 2]), updated)
+        self.assertEqual(2, updated.content.strength())
+        self.assertIs(answer, answer.update({5: 'z'}))
+
+    def test_update_cells(self):
+        answer = Answer.create([0, 'b', 2])
+        self.assertEqual(answer.update({0: 'a', 2: 'c'}), answer.update_cells([(0, 'a'), (2, 'c'), (7, 'q')]))
+        self.assertIs(answer, answer.update_cells([(7, 'q')]))
+
 
 class FillStateTest(TestCase):
 
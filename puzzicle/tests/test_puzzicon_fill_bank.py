@@ -1,8 +1,10 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import os
 import random
 import sys
+import tempfile
 import time
 import unittest
 from typing import Tuple, NamedTuple, Iterator, Sequence, List, Set
@@ -11,11 +13,15 @@ import puzzicle.puzzicon
 from puzzicle.puzzicon.fill import Answer
 from puzzicle.puzzicon.fill import Pattern
 from puzzicle.puzzicon.fill.state import FillState
-from puzzicle.puzzicon.fill.bank import Bank
+from puzzicle.puzzicon.fill.bank import Bank, BankLoader, CacheManifest
 from puzzicle.puzzicon.fill import Suggestion
 from puzzicle.puzzicon.fill import WordTuple
 from puzzicle.puzzicon.fill import Template
 from puzzicle.puzzicon.fill import BankItem
+from puzzicle.puzzicon.fill.decompose import Decomposer
+from puzzicle.puzzicon.fill.filler import Filler, FillListener, FirstCompleteListener, AllCompleteListener
+from puzzicle.puzzicon.fill.nogood import NogoodCache
+from puzzicle.puzzicon.grid import GridModel
 import logging
 from puzzicle import tests
 from puzzicle.tests import create_bank
@@ -114,6 +120,62 @@ class BankTest(TestCase):
         self.assertLessEqual(bank.rank_candidate(state, A_from_template(Template('MY'))), 0)
         self.assertLessEqual(bank.rank_candidate(state, A_from_template(Template(('M', None)))), 0)
 
+    def test_rank_candidate_used(self):
+        bank = create_bank('AB', 'CD', 'AC', 'BD')
+        state = FillState.from_answers((Answer.create('AB'), Answer.create([2, 3])), (2, 2))
+        self.assertEqual(0, bank.rank_candidate(state, A_from_template(Template('AB'))))
+        self.assertGreater(bank.rank_candidate(state, A_from_template(Template('CD'))), 0)
+
+    def test_evaluate_crossing_word_used(self):
+        # AB is used, and putting BA in the first answer completes the crossing answer as AB
+        bank = create_bank('AB', 'BA', 'BB', 'CB')
+        state = FillState.from_answers((A(0, 1), A('A', 'B'), A(1, 'B')), (2, 2))
+        self.assertIsNone(bank.evaluate(state, 0, B('BA')))
+        self.assertIsNotNone(bank.evaluate(state, 0, B('CB')))
+
+    def test_evaluate_word_used(self):
+        # whether the word itself is used is not checked by evaluate
+        bank = create_bank('AB', 'BA', 'BB', 'CB')
+        state = FillState.from_answers((A(0, 1), A('C', 'B'), A(1, 'B')), (2, 2))
+        self.assertIsNotNone(bank.evaluate(state, 0, B('CB')))
+
+    def _fillers(self, bank: Bank) -> Iterator[Tuple[str, Filler]]:
+        yield 'plain', Filler(bank)
+        filler = Filler(bank)
+        filler.backjumping = True
+        yield 'backjumping', filler
+        filler = Filler(bank)
+        filler.backjumping = True
+        filler.nogoods = NogoodCache()
+        yield 'nogoods', filler
+        filler = Filler(bank)
+        filler.decomposer = Decomposer()
+        yield 'decomposition', filler
+
+    def _fill(self, mode: str, filler: Filler) -> Set[Tuple[str, ...]]:
+        """Fills a 2x2 grid, or two 2x2 regions if the filler decomposes, and returns the words of each fill."""
+        if mode == 'decomposition':
+            grid, listener = GridModel.build('__.__' * 2 + '.....' * 3), FirstCompleteListener()
+        else:
+            grid, listener = GridModel.build('____'), AllCompleteListener()
+        value = filler.fill(FillState.from_grid(grid), listener).value()
+        states = value if isinstance(value, set) else ([] if value is None else [value])
+        return set([tuple([''.join(answer.pattern) for answer in state.answers]) for state in states])
+
+    def test_fill_crossing_word_used(self):
+        # any fill of a 2x2 region from three words repeats a word in a crossing
+        for mode, filler in self._fillers(create_bank('AA', 'AB', 'BA')):
+            with self.subTest(mode=mode):
+                self.assertSetEqual(set(), self._fill(mode, filler))
+
+    def test_fill_crossing_words_distinct(self):
+        for mode, filler in self._fillers(create_bank('AB', 'CD', 'AC', 'BD', 'EF', 'GH', 'EG', 'FH', 'AA', 'BB')):
+            with self.subTest(mode=mode):
+                fills = self._fill(mode, filler)
+                self.assertEqual(1 if mode == 'decomposition' else 4, len(fills))
+                for fill in fills:
+                    self.assertEqual(len(fill), len(set(fill)), "words are used once")
+
     def test_not_already_used_predicate(self):
         already_used = {'ABC'}
         is_not_already_used = Bank.not_already_used_predicate(already_used)
@@ -125,6 +187,15 @@ class BankTest(TestCase):
         count = bank.count_filter(Pattern(('A', None)))
         self.assertEqual(3, count)
 
+    def test_count_any_length(self):
+        words = ['ABCDEFGHIJKL', 'ABCDEFGHIJKX', 'QBCDEFGHIJKL', 'AB', 'AC']
+        pattern = Pattern(['A'] + [None] * 11)
+        for bank in [create_bank(*words), Bank.with_index(words)]:
+            with self.subTest():
+                self.assertEqual(2, bank.count(pattern))
+                self.assertEqual(2, bank.count(Pattern(('A', None))))
+                self.assertEqual(0, bank.count(Pattern(('A', 'X', None))))
+
     def test_filter_unused(self):
         bank = create_bank('AB', 'CD', 'AC', 'BD', 'XY', 'JJ', 'OP', 'BX', 'AX')
         answer = Answer.create(['A', 2])
@@ -165,11 +236,75 @@ class BankTest(TestCase):
         actual = collect_new_entries(bank.suggest(state, 2))
         self.assertSetEqual({A2('AC'), A2('AX')}, actual)
 
+    def test_suggest_in_buckets(self):
+        bank = create_bank('AB', 'CD', 'AC', 'BD', 'XY', 'JJ', 'OP', 'BX', 'AX', 'CX', 'DX')
+        answers: Tuple[Answer, ...] = (A(0,1), A(2,3), A(0,2), A(1,3))
+        state = FillState.from_answers(answers, (2, 2))
+        everything = list(bank.suggest(state, 0))
+        bucketed = bank.suggest(state, 0, bucket_size=2)
+        self.assertNotIsInstance(bucketed, list)
+        bucketed = list(bucketed)
+        self.assertSetEqual(collect_new_entries(everything), collect_new_entries(bucketed))
+        self.assertEqual(len(everything), len(bucketed))
+        self.assertListEqual([s.rank for s in everything], [s.rank for s in bucketed])
+
+    def test_suggest_in_buckets_best_first(self):
+        # the Z words are last in filter order, but they leave the most words for the crossing answer
+        words = ['AC', 'BD', 'ZA', 'ZB', 'ZC']
+        for bank in [create_bank(*words), Bank.with_index(words)]:
+            with self.subTest(bank=bank):
+                state = FillState.from_answers((A(0, 1), A(0, 2)), (1, 3))
+                bound = bank.rank_bound(state, 0)
+                bucketed = list(bank.suggest(state, 0, bucket_size=1))
+                self.assertListEqual(['ZA', 'ZB', 'ZC'], sorted([''.join(s.new_entries[0].pattern) for s in bucketed[:3]]))
+                self.assertListEqual([s.rank for s in bank.suggest(state, 0)], [s.rank for s in bucketed])
+                for s in bucketed:
+                    self.assertEqual(s.rank, bound(B(''.join(s.new_entries[0].pattern))))
+
+    def test_sort_in_buckets(self):
+        evaluations = [Suggestion({0: 'A'}, {0: A2('A')}, rank) if rank else None for rank in [1, 3, None, 2, 5, 4, None]]
+        actual = [s.rank for s in Bank._sort_in_buckets(iter(evaluations), 3)]
+        self.assertListEqual([3, 1, 5, 4, 2], actual)
+
     def test_filter(self):
         bank = create_bank('ABC', 'DEF', 'ABX', 'G', 'HI', 'ACC')
         actual = set(bank.filter(Pattern(['A', 'B', None])))
         self.assertSetEqual({B('ABC'), B('ABX')}, actual)
 
+    def test_search(self):
+        words = ['ABC', 'DEF', 'ABX', 'G', 'HI', 'ACC', 'AXCX']
+        Filters = puzzicle.puzzicon.Filters
+        for bank in [Bank.with_registry(words), Bank.with_index(words)]:
+            with self.subTest(bank=bank):
+                self.assertSetEqual({'ABC', 'ACC'}, set([b.rendering for b in bank.search(Filters.canonical_wildcard('A?C'))]))
+                self.assertSetEqual({'ABC', 'ACC', 'AXCX'}, set([b.rendering for b in bank.search(Filters.canonical_wildcard('A?C*'))]))
+                self.assertSetEqual({'ABX'}, set([b.rendering for b in bank.search(Filters.canonical_regex('^.BX$'))]))
+                self.assertSetEqual({'DEF', 'G', 'HI'}, set([b.rendering for b in bank.search(Filters.canonical_regex('[D-H].*'))]))
+
+    def test_with_index_same_as_registry(self):
+        words = ['AB', 'CD', 'AC', 'BD', 'XY', 'JJ', 'OP', 'BX', 'AX', 'ABC', 'ABX', 'CAB']
+        registered = Bank.with_registry(words)
+        indexed = Bank.with_index(words)
+        patterns = [('A', None), (None, None), (None, 'X'), ('Q', None), ('A', 'B', None), (None, None, None, None)]
+        for pattern in map(Pattern, patterns):
+            with self.subTest():
+                self.assertListEqual(list(registered.filter(pattern)), list(indexed.filter(pattern)), f"filter {pattern}")
+                self.assertEqual(registered.count_filter(pattern), indexed.count_filter(pattern), f"count {pattern}")
+
+    def test_with_index_long_pattern(self):
+        words = ['ABCDEFGHIJKLMNO', 'ABCDEFGHIJKLMNX', 'QBCDEFGHIJKLMNO']
+        bank = Bank.with_index(words)
+        pattern = Pattern(['A'] + [None] * 14)
+        self.assertEqual(2, bank.count_filter(pattern))
+        self.assertSetEqual({B(words[0]), B(words[1])}, set(bank.filter(pattern)))
+
+    def test_suggest_with_index(self):
+        bank = Bank.with_index(['AB', 'CD', 'AC', 'BD', 'XY', 'JJ', 'OP'])
+        answers: Tuple[Answer, ...] = (A(0,1), A(2,3), A(0,2), A(1,3))
+        state = FillState.from_answers(answers, (2, 2))
+        actual = collect_new_entries(bank.suggest(state, 0))
+        self.assertSetEqual({A2('AB'), A2('AC'), A2('JJ')}, actual)
+
     def test_big_bank(self):
         self.skipTest("this has an error but I can't remember what it's supposed to do")
         start = time.perf_counter()
@@ -187,3 +322,85 @@ class BankTest(TestCase):
         actual = set(render_words(bank))
         self.assertSetEqual({"CONSCIOUSNESS", "DESTAING", "SEWING", "ALLO", "AINT"}, actual)
 
+
+class BankWithChangesTest(TestCase):
+
+    def test_with_changes(self):
+        bank = Bank.with_index(['AB', 'CD', 'EFG', 'HIJ'])
+        changed = bank.with_changes(['XY', 'KLMN', 'AB'], ['CD', 'QQ'])
+        self.assertSetEqual({'AB', 'XY', 'EFG', 'HIJ', 'KLMN'}, set([item.rendering for item in changed.deposits]))
+        self.assertEqual(5, changed.size())
+        self.assertIs(bank.index.bucket(3), changed.index.bucket(3), "unchanged bucket is shared")
+        self.assertListEqual(['AB'], [item.rendering for item in changed.filter(Pattern(('A', None)))])
+        self.assertTrue(changed.has_word(WordTuple('XY')))
+        self.assertFalse(changed.has_word(WordTuple('CD')))
+
+    def test_with_changes_removes_length(self):
+        bank = Bank.with_index(['AB', 'CDE'])
+        changed = bank.with_changes([], ['CDE'])
+        self.assertIsNone(changed.index.bucket(3))
+        self.assertEqual(0, changed.count(Pattern((None, None, None))))
+
+
+class BankLoaderTest(TestCase):
+
+    def _write(self, pathname: str, words: List[str]):
+        with open(pathname, 'w') as ofile:
+            for word in words:
+                print(word, file=ofile)
+
+    def test_manifest_skips_rehash(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            wordlist = os.path.join(tempdir, 'words.txt')
+            self._write(wordlist, ['apple', 'pear'])
+            manifest = CacheManifest(os.path.join(tempdir, 'cache'))
+            digest = manifest.hash_file(wordlist)
+            entry = manifest.files[os.path.abspath(wordlist)]
+            entry['sha256'] = 'recorded'
+            self.assertEqual('recorded', manifest.hash_file(wordlist), "file unchanged, so not rehashed")
+            self._write(wordlist, ['apple', 'pears'])
+            self.assertNotEqual(digest, manifest.hash_file(wordlist))
+            self.assertTrue(os.path.isfile(manifest.pathname))
+
+    def test_load_cached(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            wordlist = os.path.join(tempdir, 'words.txt')
+            self._write(wordlist, ['apple', 'pear', "plum's", 'café'])
+            loader = BankLoader(os.path.join(tempdir, 'cache'))
+            fresh = loader.load(wordlist)
+            cached = loader.load(wordlist)
+            self.assertSetEqual({'APPLE', 'PEAR', 'PLUM', 'CAFE'}, set([item.rendering for item in fresh.deposits]))
+            self.assertSetEqual(set(fresh.deposits), set(cached.deposits))
+
+    def test_load_delta(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            wordlist = os.path.join(tempdir, 'words.txt')
+            cache_dir = os.path.join(tempdir, 'cache')
+            self._write(wordlist, ['apple', 'pear', 'plum', 'Café', 'cafe', 'figs'])
+            BankLoader(cache_dir, max_word_length=4).load(wordlist)
+            self._write(wordlist, ['apple', 'pear', 'kiwi', '', '---', 'cafe', 'figs', 'fig'])
+            loader = BankLoader(cache_dir, max_word_length=4)
+            calls = []
+            loader.load_fresh = lambda pathname: calls.append(pathname)
+            bank = loader.load(wordlist)
+            self.assertListEqual([], calls, "expect bank updated, not rebuilt")
+            self.assertSetEqual({'PEAR', 'KIWI', 'CAFE', 'FIGS', 'FIG'}, set([item.rendering for item in bank.deposits]))
+            self.assertSetEqual(set(bank.deposits), set(BankLoader(cache_dir, max_word_length=4).load(wordlist).deposits))
+            # files of the previous bank are removed
+            self.assertEqual(3, len(os.listdir(cache_dir)), "expect manifest, bank and canonical forms")
+
+    def test_load_delta_keeps_shared_files(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            wordlist = os.path.join(tempdir, 'words.txt')
+            cache_dir = os.path.join(tempdir, 'cache')
+            self._write(wordlist, ['apple', 'pear', 'plum'])
+            BankLoader(cache_dir, tag='a').load(wordlist)
+            BankLoader(cache_dir, tag='b').load(wordlist)
+            self._write(wordlist, ['apple', 'pear', 'kiwi'])
+            bank = BankLoader(cache_dir, tag='a').load(wordlist)
+            self.assertSetEqual({'APPLE', 'PEAR', 'KIWI'}, set([item.rendering for item in bank.deposits]))
+            # the entry for the other tag still refers to the previous canonical forms
+            bank = BankLoader(cache_dir, tag='b').load_delta(wordlist)
+            self.assertIsNotNone(bank)
+            self.assertSetEqual({'APPLE', 'PEAR', 'KIWI'}, set([item.rendering for item in bank.deposits]))
+            self.assertEqual(4, len(os.listdir(cache_dir)), "expect manifest, two banks and canonical forms")
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import logging
+import os.path
+import pickle
+import tempfile
+from unittest import TestCase
+
+from puzzicle import tests
+from puzzicle.puzzicon.fill import Pattern, WordTuple
+from puzzicle.puzzicon.fill import bankfile
+from puzzicle.puzzicon.fill.bank import Bank, BankSerializer
+from puzzicle.puzzicon.fill.filler import Filler, AllCompleteListener
+from puzzicle.puzzicon.fill.state import FillState
+from puzzicle.puzzicon.grid import GridModel
+
+_log = logging.getLogger(__name__)
+
+tests.configure_logging()
+
+_WORDS = ['AB', 'CDE', 'FG', 'AC', 'BDF', 'EG', 'AD', 'ADG', 'EDC', 'BF', 'ABCDEFGHIJKLMNOPQRSTU']
+
+
+class BankFileTest(TestCase):
+
+    def _round_trip(self, bank: Bank) -> Bank:
+        with tempfile.TemporaryDirectory() as tempdir:
+            pathname = os.path.join(tempdir, 'bank.bin')
+            BankSerializer().serialize_to_file(bank, pathname)
+            self.assertTrue(bankfile.is_bank_file(pathname))
+            return BankSerializer().deserialize_from_file(pathname)
+
+    def test_round_trip(self):
+        bank = Bank.with_index(_WORDS)
+        mapped = self._round_trip(bank)
+        self.assertEqual(bank.size(), mapped.size())
+        self.assertSetEqual(set(bank.deposits), set(mapped.deposits))
+        for pattern in [('A', None), (None, None, None), ('E', None, 'C'), tuple('ABCDEFGHIJKLMNOPQRST') + (None,)]:
+            with self.subTest(pattern=pattern):
+                pattern = Pattern(pattern)
+                self.assertListEqual(list(bank.filter(pattern)), list(mapped.filter(pattern)))
+                self.assertEqual(bank.count(pattern), mapped.count(pattern))
+        self.assertTrue(mapped.has_word(WordTuple('BDF')))
+        self.assertFalse(mapped.has_word(WordTuple('BDG')))
+        self.assertFalse(mapped.has_word(WordTuple('BDFG')))
+
+    def test_round_trip_non_latin(self):
+        bank = Bank.with_index(['ÉTÉ', 'ΑΒΓ', 'ABC'])
+        mapped = self._round_trip(bank)
+        self.assertListEqual(['ΑΒΓ'], [item.rendering for item in mapped.filter(Pattern(('Α', None, None)))])
+        self.assertTrue(mapped.has_word(WordTuple('ÉTÉ')))
+
+    def test_fill_with_mapped_bank(self):
+        grid = GridModel.build('__.___.__')
+        expected = Filler(Bank.with_index(_WORDS)).fill(FillState.from_grid(grid), AllCompleteListener())
+        actual = Filler(self._round_trip(Bank.with_index(_WORDS))).fill(FillState.from_grid(grid), AllCompleteListener())
+        self.assertSetEqual(expected.value(), actual.value())
+        self.assertEqual(expected.count, actual.count)
+
+    def test_pickle_mapped_bank(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            pathname = os.path.join(tempdir, 'bank.bin')
+            BankSerializer().serialize_to_file(Bank.with_index(_WORDS), pathname)
+            mapped = BankSerializer().deserialize_from_file(pathname)
+            mapped.count(Pattern(('A', 'B')))
+            unpickled = pickle.loads(pickle.dumps(mapped))
+            self.assertSetEqual(set(mapped.deposits), set(unpickled.deposits))
+            self.assertEqual(1, unpickled.count(Pattern(('A', 'B'))))
+
+    def test_masks_read_from_file(self):
+        bank = Bank.with_index(_WORDS)
+        mapped = self._round_trip(bank)
+        for length, bucket in bank.index.buckets.items():
+            mapped_bucket = mapped.index.buckets[length]
+            for position, masks in enumerate(bucket.masks):
+                with self.subTest(length=length, position=position):
+                    self.assertDictEqual(masks, dict(mapped_bucket.masks[position]))
+                    self.assertEqual(0, mapped_bucket.masks[position].get('Z', 0))
+
+    def test_close(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            pathname = os.path.join(tempdir, 'bank.bin')
+            BankSerializer().serialize_to_file(Bank.with_index(_WORDS), pathname)
+            mapped = bankfile._MappedFile(pathname)
+            mapping = mapped.mapping
+            mapped.close()
+            self.assertTrue(mapping.closed)
+            mapped.close()
+
+    def test_pickle_fallback(self):
+        bank = Bank.with_registry(['AB', 'CD'])
+        self.assertFalse(bankfile.is_mappable(bank))
+        with tempfile.TemporaryDirectory() as tempdir:
+            pathname = os.path.join(tempdir, 'bank.bin')
+            BankSerializer().serialize_to_file(bank, pathname)
+            self.assertFalse(bankfile.is_bank_file(pathname))
+            loaded = BankSerializer().deserialize_from_file(pathname)
+        self.assertSetEqual(set(bank.deposits), set(loaded.deposits))
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import logging
+import os
+import random
+import tempfile
+from typing import Callable, List
+from unittest import TestCase
+
+from puzzicle import tests
+from puzzicle.puzzicon.fill.bank import Bank
+from puzzicle.puzzicon.fill.checkpoint import Checkpoint, CheckpointingFiller, save_checkpoint, load_checkpoint
+from puzzicle.puzzicon.fill.decompose import Decomposer
+from puzzicle.puzzicon.fill.filler import Filler, FillListener, FillStateNode, AllCompleteListener, FirstCompleteListener
+from puzzicle.puzzicon.fill.nogood import NogoodCache
+from puzzicle.puzzicon.fill.ordering import MinimumRemainingValues, LeastConstrainingValue
+from puzzicle.puzzicon.fill.propagation import ArcConsistency
+from puzzicle.puzzicon.fill.quality import WordScorer, BestFillListener
+from puzzicle.puzzicon.fill.state import FillState
+from puzzicle.puzzicon.grid import GridModel
+
+_log = logging.getLogger(__name__)
+
+tests.configure_logging()
+
+
+_WORDS_3x3 = ['ABC', 'DEF', 'GHI', 'ADG', 'BEH', 'CFI', 'AEI', 'BCD', 'CDE', 'EFG', 'HIA', 'ADI', 'BEG', 'CFH']
+
+
+def _configure(bank: Bank, setting: str) -> Filler:
+    filler = Filler(bank)
+    if setting == 'backjumping':
+        filler.backjumping = True
+        filler.nogoods = NogoodCache()
+    elif setting == 'ordering':
+        filler.selector = MinimumRemainingValues(bank)
+        filler.orderer = LeastConstrainingValue(bank)
+        filler.rng = random.Random(0)
+    elif setting == 'bucketed':
+        filler.backjumping = True
+        filler.suggestion_bucket_size = 2
+        filler.rng = random.Random(0)
+    elif setting == 'propagation':
+        filler.backjumping = True
+        filler.propagator = ArcConsistency(bank)
+        filler.nogoods = NogoodCache()
+    elif setting == 'decomposition':
+        filler.backjumping = True
+        filler.decomposer = Decomposer()
+    return filler
+
+
+class CheckpointTest(TestCase):
+
+    def _trace(self, filler: Filler, visited: List):
+        def tracer(node: FillStateNode):
+            visited.append(node.state)
+        filler.tracer = tracer
+
+    def _compare(self, grid: GridModel, bank: Bank, setting: str, create_listener: Callable[[], FillListener]):
+        state = FillState.from_grid(grid)
+        expected = []
+        filler = _configure(bank, setting)
+        self._trace(filler, expected)
+        expected_listener = filler.fill(state, create_listener())
+        for pause_at in sorted(set([0, 1, 2, len(expected) // 2, len(expected) - 1, len(expected)])):
+            with self.subTest(setting=setting, pause_at=pause_at):
+                actual = []
+                filler = _configure(bank, setting)
+                self._trace(filler, actual)
+                search = filler.search(state, create_listener())
+                search.run(max_nodes=pause_at)
+                iterators = [(frame.answer_indexes, frame.suggestions) for frame in search.stack]
+                checkpoint = Checkpoint.capture(search)
+                # capturing does not replace or advance the iterators
+                self.assertListEqual(iterators, [(frame.answer_indexes, frame.suggestions) for frame in search.stack])
+                with tempfile.TemporaryDirectory() as tempdir:
+                    pathname = os.path.join(tempdir, 'checkpoint')
+                    save_checkpoint(checkpoint, pathname)
+                    # the captured search continues as before
+                    search.run()
+                    self.assertListEqual(expected, actual)
+                    checkpoint = load_checkpoint(pathname)
+                resumed = []
+                filler = _configure(bank, setting)
+                self._trace(filler, resumed)
+                search = checkpoint.restore(filler, create_listener())
+                search.run()
+                self.assertListEqual(expected, actual[:pause_at] + resumed)
+                self.assertEqual(expected_listener.count, search.listener.count)
+                self.assertEqual(expected_listener.value(), search.listener.value())
+
+    def test_resume(self):
+        grid = GridModel.build('_________')
+        bank = Bank.with_index(_WORDS_3x3)
+        for setting in ['backjumping', 'bucketed', 'propagation']:
+            self._compare(grid, bank, setting, AllCompleteListener)
+
+    def test_resume_first(self):
+        grid = GridModel.build('__.___.__')
+        bank = tests.create_bank('AB', 'CDE', 'FG', 'AC', 'BDF', 'EG', 'AD', 'ADG', 'EDC', 'BF')
+        for setting in ['none', 'backjumping', 'ordering']:
+            self._compare(grid, bank, setting, FirstCompleteListener)
+
+    def test_resume_decomposed(self):
+        grid = GridModel.build('___.___' * 3 + '.......' + '___.___' * 3)
+        self._compare(grid, Bank.with_index(tests.random_words()), 'decomposition', FirstCompleteListener)
+
+    def test_resume_best(self):
+        rng = random.Random(1)
+        bank = Bank.with_index(_WORDS_3x3).with_scores(dict([(word, rng.randint(1, 50)) for word in _WORDS_3x3]))
+        self._compare(GridModel.build('_________'), bank, 'backjumping', lambda: BestFillListener(WordScorer(bank)))
+
+
+class CheckpointingFillerTest(TestCase):
+
+    def test_fill(self):
+        grid = GridModel.build('_________')
+        bank = Bank.with_index(_WORDS_3x3)
+        expected = _configure(bank, 'backjumping').fill(FillState.from_grid(grid), AllCompleteListener())
+        with tempfile.TemporaryDirectory() as tempdir:
+            pathname = os.path.join(tempdir, 'checkpoint')
+            checkpointing = CheckpointingFiller(_configure(bank, 'backjumping'), pathname, node_interval=5, duration_interval=None)
+            listener = checkpointing.fill(FillState.from_grid(grid), AllCompleteListener())
+            self.assertSetEqual(expected.value(), listener.value())
+            self.assertGreater(checkpointing.checkpoints, 2)
+            self.assertTrue(load_checkpoint(pathname).is_finished())
+            self.assertFalse(os.path.exists(pathname + '.tmp'))
+
+    def test_resume(self):
+        grid = GridModel.build('_________')
+        bank = Bank.with_index(_WORDS_3x3)
+        expected = _configure(bank, 'backjumping').fill(FillState.from_grid(grid), AllCompleteListener())
+        visited = []
+
+        def interrupt(node: FillStateNode):
+            visited.append(node)
+            if len(visited) == 12:
+                raise KeyboardInterrupt()
+        with tempfile.TemporaryDirectory() as tempdir:
+            pathname = os.path.join(tempdir, 'checkpoint')
+            filler = _configure(bank, 'backjumping')
+            filler.tracer = interrupt
+            checkpointing = CheckpointingFiller(filler, pathname, node_interval=5, duration_interval=None)
+            with self.assertRaises(KeyboardInterrupt):
+                checkpointing.fill(FillState.from_grid(grid), AllCompleteListener())
+            self.assertEqual(2, checkpointing.checkpoints)
+            self.assertEqual(10, load_checkpoint(pathname).progress['count'])
+            resumed = CheckpointingFiller(_configure(bank, 'backjumping'), pathname, node_interval=5, duration_interval=None).resume(AllCompleteListener())
+            self.assertSetEqual(expected.value(), resumed.value())
+            self.assertEqual(expected.count, resumed.count)
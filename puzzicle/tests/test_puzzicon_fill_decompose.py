@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import logging
+import time
+from typing import Collection
+from unittest import TestCase
+
+from puzzicle import tests
+from puzzicle.puzzicon.fill.bank import Bank
+from puzzicle.puzzicon.fill.decompose import Decomposer, components
+from puzzicle.puzzicon.fill.filler import Filler, FirstCompleteListener, AllCompleteListener
+from puzzicle.puzzicon.fill.nogood import NogoodCache
+from puzzicle.puzzicon.fill.ordering import MinimumRemainingValues
+from puzzicle.puzzicon.fill.quality import WordScorer, BestFillListener
+from puzzicle.puzzicon.fill.state import FillState
+from puzzicle.puzzicon.grid import GridModel
+
+_log = logging.getLogger(__name__)
+
+tests.configure_logging()
+
+# four 3x3 regions separated by dark squares
+_GRID_7x7 = '___.___' * 3 + '.......' + '___.___' * 3
+# four 2x2 regions separated by dark squares
+_GRID_5x5 = '__.__' * 2 + '.....' + '__.__' * 2
+
+
+def _square_fills(count: int):
+    """Creates the words of count 2x2 fills that share no letters."""
+    words = []
+    for i in range(count):
+        a, b, c, d = [chr(ord('A') + 4 * i + j) for j in range(4)]
+        words += [a + b, c + d, a + c, b + d]
+    return words
+
+
+class ComponentsTest(TestCase):
+
+    def test_components(self):
+        state = FillState.from_grid(GridModel.build(_GRID_7x7))
+        self.assertListEqual([(0, 1, 2, 3, 8, 10), (4, 5, 6, 7, 9, 11), (12, 13, 14, 15, 20, 22), (16, 17, 18, 19, 21, 23)], components(state))
+
+    def test_components_connected(self):
+        state = FillState.from_grid(GridModel.build('_________'))
+        self.assertListEqual([(0, 1, 2, 3, 4, 5)], components(state))
+
+    def test_components_complete_answers_excluded(self):
+        grid = GridModel.build(_GRID_5x5)
+        state = Filler(Bank.with_index(_square_fills(4))).fill(FillState.from_grid(grid)).value()
+        self.assertIsNotNone(state)
+        self.assertListEqual([], components(state))
+
+
+class DecomposerTest(TestCase):
+
+    def _assert_fill(self, bank_words: Collection[str], state: FillState):
+        self.assertIsNotNone(state)
+        self.assertTrue(state.is_complete())
+        renderings = [''.join(answer.pattern) for answer in state.answers]
+        self.assertEqual(len(renderings), len(set(renderings)), "words are used once")
+        self.assertSetEqual(set(), set(renderings) - set(bank_words))
+
+    def test_fill(self):
+        words = tests.random_words()
+        bank = Bank.with_index(words)
+        for selector in [None, MinimumRemainingValues(bank)]:
+            for backjumping in [False, True]:
+                with self.subTest(selector=selector, backjumping=backjumping):
+                    filler = Filler(bank)
+                    filler.selector = selector
+                    filler.backjumping = backjumping
+                    filler.decomposer = Decomposer()
+                    listener = filler.fill(FillState.from_grid(GridModel.build(_GRID_7x7)), FirstCompleteListener())
+                    self._assert_fill(words, listener.value())
+                    self.assertEqual(1, filler.decomposer.decompositions)
+
+    def test_fill_duplicates_resolved(self):
+        words = _square_fills(4)
+        filler = Filler(Bank.with_index(words))
+        filler.decomposer = Decomposer()
+        self._assert_fill(words, filler.fill(FillState.from_grid(GridModel.build(_GRID_5x5))).value())
+
+    def test_fill_duplicates_unresolved(self):
+        for nogoods in [None, NogoodCache()]:
+            with self.subTest(nogoods=nogoods):
+                filler = Filler(Bank.with_index(_square_fills(3)))
+                filler.backjumping = True
+                filler.nogoods = nogoods
+                filler.decomposer = Decomposer()
+                listener = filler.fill(FillState.from_grid(GridModel.build(_GRID_5x5)))
+                self.assertIsNone(listener.value())
+                # once the fills cannot be combined, no descendant is decomposed
+                self.assertEqual(1, filler.decomposer.decompositions)
+
+    def test_fill_unfillable_component(self):
+        # the 2-letter answers at the bottom cannot be filled from 3-letter words
+        grid = GridModel.build('___._' * 3 + '.....' + '__.__')
+        filler = Filler(Bank.with_index(tests.random_words()))
+        filler.decomposer = Decomposer()
+        listener = filler.fill(FillState.from_grid(grid), FirstCompleteListener())
+        self.assertIsNone(listener.value())
+        self.assertEqual(1, filler.decomposer.decompositions)
+
+    def test_fill_node_threshold(self):
+        filler = Filler(Bank.with_index(tests.random_words()))
+        filler.decomposer = Decomposer()
+        listener = filler.fill(FillState.from_grid(GridModel.build(_GRID_7x7)), FirstCompleteListener(5))
+        self.assertIsNone(listener.value())
+
+    def test_fill_duration_threshold(self):
+        # the groups are 4x4 regions that take the plain filler minutes to search
+        grid = GridModel.build('____.....' * 4 + '.........' + '.....____' * 4)
+        filler = Filler(Bank.with_index(tests.random_words(count=30, length=4)))
+        filler.decomposer = Decomposer()
+        start = time.perf_counter()
+        listener = filler.fill(FillState.from_grid(grid), FirstCompleteListener(duration_threshold=0.5))
+        self.assertLess(time.perf_counter() - start, 5.0)
+        self.assertIsNone(listener.value())
+        self.assertEqual(1, filler.decomposer.decompositions)
+
+    def test_fill_parallel(self):
+        words = tests.random_words(1)
+        filler = Filler(Bank.with_index(words))
+        filler.backjumping = True
+        with Decomposer(max_workers=2, min_parallel_answers=2) as decomposer:
+            filler.decomposer = decomposer
+            listener = filler.fill(FillState.from_grid(GridModel.build(_GRID_7x7)), FirstCompleteListener())
+        self._assert_fill(words, listener.value())
+
+    def test_fill_all_not_decomposed(self):
+        grid = GridModel.build('__..__......___.')
+        bank = Bank.with_index(['AB', 'CD', 'AC', 'BD', 'XYZ', 'QRS'])
+        expected = Filler(bank).fill(FillState.from_grid(grid), AllCompleteListener()).value()
+        self.assertEqual(4, len(expected))
+        filler = Filler(bank)
+        filler.decomposer = Decomposer()
+        self.assertSetEqual(expected, filler.fill(FillState.from_grid(grid), AllCompleteListener()).value())
+        self.assertEqual(0, filler.decomposer.decompositions)
+
+    def test_fill_best_not_decomposed(self):
+        grid = GridModel.build('__..__......___.')
+        bank = Bank.with_index(['AB', 'CD', 'AC', 'BD', 'XYZ', 'QRS']).with_scores({'QRS': 10, 'AC': 5})
+        filler = Filler(bank)
+        filler.decomposer = Decomposer()
+        listener = filler.fill(FillState.from_grid(grid), BestFillListener(WordScorer(bank)))
+        self.assertEqual(15, listener.best_score)
+        self.assertEqual(0, filler.decomposer.decompositions)
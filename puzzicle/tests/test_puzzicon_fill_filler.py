@@ -1,16 +1,21 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import inspect
+import itertools
 import logging
 import random
+import sys
 from typing import NamedTuple, List
 from unittest import TestCase
 
 from puzzicle import tests
+from puzzicle.puzzicon.fill import Answer
 from puzzicle.puzzicon.fill.bank import Bank
 from puzzicle.puzzicon.fill.filler import FillListener, FirstCompleteListener, AllCompleteListener
 from puzzicle.puzzicon.fill.filler import FillStateNode
-from puzzicle.puzzicon.fill.filler import Filler
+from puzzicle.puzzicon.fill.filler import Filler, FillSearch
+from puzzicle.puzzicon.fill.nogood import NogoodCache
 from puzzicle.puzzicon.fill.state import FillState
 from puzzicle.puzzicon.grid import GridModel
 from puzzicle.tests import Render
@@ -140,4 +145,166 @@ class FillerTest(TestCase):
         fill_result = self._do_fill(grid, FirstCompleteListener(100000), bank)
         state = fill_result.value
         # noinspection PyTypeChecker
-        self._check_filled(state, set(map(str.upper, _WORDS_5x5)))
\ No newline at end of file
+        self._check_filled(state, set(map(str.upper, _WORDS_5x5)))
+
+    def test_fill_5x5_first_bucketed_suggestions(self):
+        grid = GridModel.build('.._____________________..')
+        bank = tests.create_bank(*(_WORDS_5x5 + _NONWORDS_5x5))
+        filler = Filler(bank)
+        filler.suggestion_bucket_size = 4
+        listener = filler.fill(FillState.from_grid(grid), FirstCompleteListener(100000))
+        self._check_filled(listener.value(), set(map(str.upper, _WORDS_5x5)))
+
+    def _create_backjump_problem(self):
+        # answer 0 decides the fate of answer 4, which crosses it, but answers 1-3 are filled in between
+        answers = tuple([Answer.create(c) for c in [(0, 1, 2), (3, 4), (5, 6), (7, 8), (2, 9, 10, 11), (11, 12)]])
+        state = FillState.from_answers(answers, (1, 13))
+        bank = Bank.with_index(['ABA', 'ABB', 'AXYZ', 'BXYQ', 'EF', 'GH', 'IJ', 'KL', 'MN'])
+        return state, bank
+
+    def test_fill_backjumping(self):
+        state, bank = self._create_backjump_problem()
+        node_counts, levels_skipped = [], []
+        for backjumping in [False, True]:
+            filler = Filler(bank)
+            filler.sorter = lambda answer: {3: 0, 2: 1, 4: 2}[answer.length()]
+            filler.backjumping = backjumping
+            listener = FirstCompleteListener()
+            search = filler.search(state, listener)
+            search.run()
+            self.assertIsNone(listener.value())
+            node_counts.append(listener.count)
+            levels_skipped.append(search.levels_skipped)
+        self.assertEqual(0, levels_skipped[0])
+        self.assertGreater(levels_skipped[1], 0)
+        self.assertLess(node_counts[1], node_counts[0])
+
+    def test_fill_backjumping_finds_all(self):
+        grid = GridModel.build('__.___.__')
+        bank = tests.create_bank(*(_WORDS_3x3 + _NONWORDS_3x3))
+        expected = Filler(bank).fill(FillState.from_grid(grid), AllCompleteListener()).value()
+        filler = Filler(bank)
+        filler.backjumping = True
+        actual = filler.fill(FillState.from_grid(grid), AllCompleteListener()).value()
+        self.assertSetEqual(expected, actual)
+
+    def test_fill_backjumping_crossing_word_used(self):
+        # answers D, C, A, B are filled in that order; with C = MP, filling A as AM completes
+        # its crossing B as MP, which is used, so C is a culprit although it shares no cells
+        answers = tuple([Answer.create(c) for c in [(0, 1), (1, 2), (3, 4), (2, 5, 6)]])
+        state = FillState.from_answers(answers, (1, 7))
+        bank = Bank.with_index(['PQR', 'AM', 'MP', 'ZZ'])
+        expected = {('AM', 'MP', 'ZZ', 'PQR')}
+        for backjumping, nogoods in [(False, None), (True, None), (True, NogoodCache())]:
+            with self.subTest(backjumping=backjumping, nogoods=nogoods):
+                filler = Filler(bank)
+                # cells 5, 3 and 0 are open until D, C and A are filled
+                filler.sorter = lambda answer: [5 in answer.content, 3 in answer.content, 0 in answer.content, True].index(True)
+                filler.backjumping = backjumping
+                filler.nogoods = nogoods
+                value = filler.fill(state, AllCompleteListener()).value()
+                self.assertSetEqual(expected, set([tuple([''.join(answer.pattern) for answer in s.answers]) for s in value]))
+
+    def test_fill_5x5_first_backjumping(self):
+        grid = GridModel.build('.._____________________..')
+        bank = tests.create_bank(*(_WORDS_5x5 + _NONWORDS_5x5))
+        filler = Filler(bank)
+        filler.backjumping = True
+        listener = filler.fill(FillState.from_grid(grid), FirstCompleteListener(100000))
+        self._check_filled(listener.value(), set(map(str.upper, _WORDS_5x5)))
+
+    def test_fill_with_nogoods(self):
+        grid = GridModel.build('__.___.__')
+        bank = tests.create_bank(*(_WORDS_3x3 + _NONWORDS_3x3))
+        plain = Filler(bank).fill(FillState.from_grid(grid), AllCompleteListener())
+        filler = Filler(bank)
+        filler.nogoods = NogoodCache()
+        actual = filler.fill(FillState.from_grid(grid), AllCompleteListener())
+        self.assertSetEqual(plain.value(), actual.value())
+        self.assertGreater(filler.nogoods.hits, 0)
+        self.assertLess(actual.count, plain.count)
+
+    def test_fill_deeper_than_recursion_limit(self):
+        num_answers = 200
+        answers = tuple([Answer.create((2 * i, 2 * i + 1)) for i in range(num_answers)])
+        state = FillState.from_answers(answers, (num_answers, 2))
+        words = [''.join(pair) for pair in itertools.islice(itertools.product('ABCDEFGHIJKLMNOP', repeat=2), num_answers)]
+        bank = Bank.with_index(words)
+        original_limit = sys.getrecursionlimit()
+        sys.setrecursionlimit(len(inspect.stack()) + 50)
+        try:
+            listener = Filler(bank).fill(state, FirstCompleteListener())
+        finally:
+            sys.setrecursionlimit(original_limit)
+        self.assertIsNotNone(listener.value())
+        self.assertTrue(listener.value().is_complete())
+        self.assertSetEqual(set(words), set(listener.value().used))
+
+    def test_search_pause_and_resume(self):
+        grid = GridModel.build('__.___.__')
+        bank = tests.create_bank(*(_WORDS_3x3 + _NONWORDS_3x3))
+        uninterrupted = Filler(bank).fill(FillState.from_grid(grid), AllCompleteListener())
+        listener = AllCompleteListener()
+        search: FillSearch = Filler(bank).search(FillState.from_grid(grid), listener)
+        num_runs = 1
+        while not search.run(max_nodes=2):
+            self.assertEqual(2 * num_runs, listener.count)
+            num_runs += 1
+        self.assertGreater(num_runs, 1)
+        self.assertEqual(uninterrupted.count, listener.count)
+        self.assertSetEqual(uninterrupted.value(), listener.value())
+
+    def test_search_pause_from_tracer(self):
+        grid = GridModel.build('____')
+        bank = tests.create_bank(*_WORDS_2x2)
+        listener = AllCompleteListener()
+        search = None
+        def tracer(node: FillStateNode):
+            if node.state.num_incomplete == 2:
+                search.pause()
+        search = Filler(bank, tracer).search(FillState.from_grid(grid), listener)
+        self.assertFalse(search.run())
+        self.assertEqual(2, search.stack[-1].node.state.num_incomplete)
+        while not search.run():
+            pass
+        self.assertEqual(2, len(listener.value()))
+
+    def test_search_split(self):
+        grid = GridModel.build('__.___.__')
+        bank = tests.create_bank(*(_WORDS_3x3 + _NONWORDS_3x3))
+        expected = Filler(bank).fill(FillState.from_grid(grid), AllCompleteListener())
+        listener = AllCompleteListener()
+        search = Filler(bank).search(FillState.from_grid(grid), listener)
+        search.run(max_nodes=2)
+        stolen = search.split(3)
+        self.assertTrue(0 < len(stolen) <= 3)
+        self.assertTrue(search.stack[0].solved)
+        search.run()
+        for state in stolen:
+            Filler(bank).fill(state, listener)
+        self.assertSetEqual(expected.value(), listener.value())
+        self.assertEqual(expected.count, listener.count)
+
+
+class FillListenerTest(TestCase):
+
+    def test_spawn_and_absorb(self):
+        grid = GridModel.build('____')
+        bank = tests.create_bank(*_WORDS_2x2)
+        listener = AllCompleteListener(node_threshold=100)
+        spawned = [listener.spawn() for _ in range(2)]
+        self.assertEqual(100, spawned[0].node_threshold)
+        Filler(bank).fill(FillState.from_grid(grid), spawned[0])
+        for other in spawned:
+            listener.absorb(other)
+        self.assertEqual(spawned[0].count, listener.count)
+        self.assertSetEqual(spawned[0].value(), listener.value())
+
+    def test_absorb_first(self):
+        grid = GridModel.build('____')
+        bank = tests.create_bank(*_WORDS_2x2)
+        listener = FirstCompleteListener()
+        spawned = Filler(bank).fill(FillState.from_grid(grid), listener.spawn())
+        listener.absorb(spawned)
+        self.assertIs(spawned.value(), listener.value())
+        self.assertEqual(spawned.count, listener.count)
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import logging
+from unittest import TestCase
+
+from puzzicle import tests
+from puzzicle.puzzicon.fill import BankItem
+from puzzicle.puzzicon.fill import Pattern
+from puzzicle.puzzicon.fill.index import BitsetIndex, PackedWords, iterate_bits
+
+_log = logging.getLogger(__name__)
+
+tests.configure_logging()
+
+
+def _create_index(*words) -> BitsetIndex:
+    return BitsetIndex.build([BankItem.from_word(w) for w in words])
+
+
+class ModuleMethodsTest(TestCase):
+
+    def test_iterate_bits(self):
+        self.assertListEqual([], list(iterate_bits(0)))
+        self.assertListEqual([0], list(iterate_bits(1)))
+        self.assertListEqual([1, 3, 64], list(iterate_bits((1 << 64) | 0b1010)))
+
+
+class BitsetIndexTest(TestCase):
+
+    def test_filter(self):
+        index = _create_index('ABC', 'DEF', 'ABX', 'G', 'HI', 'ACC')
+        actual = [item.rendering for item in index.filter(Pattern(['A', 'B', None]))]
+        self.assertListEqual(['ABC', 'ABX'], actual)
+
+    def test_filter_all_of_length(self):
+        index = _create_index('CAB', 'ABC', 'DEF', 'HI')
+        actual = [item.rendering for item in index.filter(Pattern([None, None, None]))]
+        self.assertListEqual(['ABC', 'CAB', 'DEF'], actual)
+
+    def test_filter_none(self):
+        index = _create_index('ABC', 'DEF')
+        self.assertListEqual([], list(index.filter(Pattern(['A', 'E', None]))))
+        self.assertListEqual([], list(index.filter(Pattern(['Q', None, None]))))
+        self.assertListEqual([], list(index.filter(Pattern([None, None]))))
+
+    def test_count(self):
+        index = _create_index('AB', 'CD', 'AC', 'BD', 'XY', 'JJ', 'OP', 'BX', 'AX')
+        self.assertEqual(3, index.count(Pattern(('A', None))))
+        self.assertEqual(9, index.count(Pattern((None, None))))
+        self.assertEqual(1, index.count(Pattern(('J', 'J'))))
+        self.assertEqual(0, index.count(Pattern(('J', 'X'))))
+        self.assertEqual(0, index.count(Pattern((None, None, None))))
+
+    def test_count_cached(self):
+        index = _create_index('AB', 'AC', 'BC', 'ABC')
+        pattern = Pattern(('A', 'C'))
+        self.assertEqual(1, index.count(pattern))
+        self.assertDictEqual({pattern: 1}, index._count_cache)
+        self.assertEqual(2, index.count(Pattern(('A', None))))
+        self.assertEqual(1, len(index._count_cache), "single-letter patterns are answered from histogram")
+
+    def test_count_cache_eviction(self):
+        index = _create_index('AB', 'AC', 'BC')
+        index.count_cache_size = 2
+        for pattern in [('A', 'B'), ('A', 'C'), ('B', 'C')]:
+            index.count(Pattern(pattern))
+        self.assertSetEqual({('A', 'C'), ('B', 'C')}, set(index._count_cache.keys()))
+
+    def test_long_words(self):
+        words = ['ABCDEFGHIJKLMNOPQRSTU', 'ABCDEFGHIJKLMNOPQRSTV', 'ZBCDEFGHIJKLMNOPQRSTU']
+        index = _create_index(*words)
+        pattern = Pattern([None] * 20 + ['U'])
+        self.assertEqual(2, index.count(pattern))
+        self.assertListEqual([words[0], words[2]], [item.rendering for item in index.filter(pattern)])
+
+    def test_non_ascii(self):
+        index = _create_index('ÉTÉ', 'ETE')
+        self.assertListEqual(['ÉTÉ'], [item.rendering for item in index.filter(Pattern(['É', None, None]))])
+
+    def test_from_words_same_as_build(self):
+        words = ['ABC', 'DEF', 'ABX', 'G', 'HI', 'ACC', 'ÉTÉ', 'ΑΒΓ']
+        built, packed = _create_index(*words), BitsetIndex.from_words(words)
+        self.assertSetEqual(set(built.buckets.keys()), set(packed.buckets.keys()))
+        for length, bucket in built.buckets.items():
+            with self.subTest(length=length):
+                self.assertListEqual(list(bucket.items), list(packed.buckets[length].items))
+        self.assertIsInstance(packed.buckets[2].items, PackedWords)
+        self.assertNotIsInstance(packed.buckets[3].items, PackedWords)
+
+
+class PackedWordsTest(TestCase):
+
+    def test_sequence(self):
+        words = PackedWords.pack(3, ['ABC', 'ABX', 'ÉTÉ'])
+        self.assertEqual(3, len(words))
+        self.assertEqual(BankItem.from_word('ABX'), words[1])
+        self.assertEqual(BankItem.from_word('ÉTÉ'), words[-1])
+        self.assertListEqual(['ABC', 'ABX', 'ÉTÉ'], list(words.renderings()))
+        with self.assertRaises(IndexError):
+            words[3]
+
+    def test_find(self):
+        words = PackedWords.pack(3, ['ABC', 'ABX', 'DEF', 'ÉTÉ'])
+        self.assertListEqual([0, 1, 2, 3], [words.find(w) for w in ['ABC', 'ABX', 'DEF', 'ÉTÉ']])
+        self.assertListEqual([-1, -1, -1, -1], [words.find(w) for w in ['ABD', 'AB', 'ΑΒΓ', 'ZZZ']])
+
+    def test_pack_non_latin(self):
+        self.assertIsNone(PackedWords.pack(3, ['ABC', 'ΑΒΓ']))
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import logging
+from unittest import TestCase
+
+from puzzicle import tests
+from puzzicle.puzzicon.fill import Suggestion, Answer, Template
+from puzzicle.puzzicon.fill.nogood import NogoodCache, Signature
+from puzzicle.puzzicon.fill.state import FillState
+from puzzicle.puzzicon.grid import GridModel
+
+_log = logging.getLogger(__name__)
+
+tests.configure_logging()
+
+
+def _place(state: FillState, a_idx: int, word: str) -> FillState:
+    content = state.answers[a_idx].content
+    legend_updates = {grid_idx: letter for grid_idx, letter in zip(content, word)
+                      if not Template.is_value_defined(grid_idx)}
+    return state.advance(Suggestion(legend_updates, {a_idx: Answer.create(tuple(word))}))
+
+
+class SignatureTest(TestCase):
+
+    def test_order_independent(self):
+        state = FillState.from_grid(GridModel.build('_________'))
+        across_first = _place(_place(state, 0, 'ABC'), 3, 'ADG')
+        down_first = _place(_place(state, 3, 'ADG'), 0, 'ABC')
+        self.assertEqual(Signature.of(across_first), Signature.of(down_first))
+
+    def test_used_words_of_open_lengths_only(self):
+        state = FillState.from_answers((Answer.create((0, 1)), Answer.create((2, 3, 4))), (1, 5))
+        state = _place(state, 0, 'AB')
+        signature = Signature.of(state)
+        self.assertSetEqual(set(), signature.used)
+        self.assertEqual(1, len(signature.open_answers))
+
+    def test_used_words_matching_open_patterns_only(self):
+        answers = (Answer.create((0, 1)), Answer.create((1, 2)), Answer.create((3, 4)))
+        state = FillState.from_answers(answers, (1, 5))
+        self.assertSetEqual(set(), Signature.of(_place(_place(state, 2, 'XY'), 0, 'AB')).used)
+        self.assertSetEqual({'BY'}, Signature.of(_place(_place(state, 2, 'BY'), 0, 'AB')).used)
+
+    def test_group(self):
+        state = FillState.from_answers((Answer.create((0, 1)), Answer.create((2, 3, 4))), (1, 5))
+        state = _place(state, 0, 'AB')
+        self.assertEqual(Signature.of(state), Signature.of(state, (1,)))
+
+
+class NogoodCacheTest(TestCase):
+
+    def test_hits_and_misses(self):
+        state = FillState.from_grid(GridModel.build('____'))
+        cache = NogoodCache()
+        self.assertFalse(cache.is_known_unfillable(state))
+        cache.add(state)
+        self.assertTrue(cache.is_known_unfillable(state))
+        self.assertFalse(cache.is_known_unfillable(_place(state, 0, 'AB')))
+        stats = cache.stats()
+        self.assertEqual((1, 2, 0, 1), (stats.hits, stats.misses, stats.evictions, stats.size))
+
+    def test_evicts_least_recently_used(self):
+        state = FillState.from_grid(GridModel.build('____'))
+        states = [_place(state, 0, word) for word in ['AB', 'CD', 'EF']]
+        cache = NogoodCache(capacity=2)
+        cache.add(states[0])
+        cache.add(states[1])
+        self.assertTrue(cache.is_known_unfillable(states[0]))
+        cache.add(states[2])
+        self.assertEqual(1, cache.evictions)
+        self.assertEqual(2, cache.size())
+        self.assertTrue(cache.is_known_unfillable(states[0]))
+        self.assertFalse(cache.is_known_unfillable(states[1]))
+        self.assertTrue(cache.is_known_unfillable(states[2]))
+
+    def test_unfillable_group(self):
+        state = FillState.from_answers((Answer.create((0, 1)), Answer.create((2, 3, 4))), (1, 5))
+        cache = NogoodCache()
+        cache.add(_place(state, 0, 'AB'))
+        self.assertTrue(cache.is_known_unfillable(state))
+        self.assertTrue(cache.is_known_unfillable(_place(state, 0, 'CD')))
+
+    def test_several_groups_recorded_whole(self):
+        state = FillState.from_answers((Answer.create((0, 1)), Answer.create((2, 3, 4))), (1, 5))
+        cache = NogoodCache()
+        cache.add(state)
+        self.assertTrue(cache.is_known_unfillable(state))
+        self.assertFalse(cache.is_known_unfillable(_place(state, 0, 'AB')))
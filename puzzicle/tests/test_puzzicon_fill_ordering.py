@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import logging
+from unittest import TestCase
+
+from puzzicle import tests
+from puzzicle.puzzicon.fill import Suggestion, Answer
+from puzzicle.puzzicon.fill.bank import Bank
+from puzzicle.puzzicon.fill.filler import Filler, FirstCompleteListener, AllCompleteListener
+from puzzicle.puzzicon.fill.ordering import MinimumRemainingValues, LeastConstrainingValue
+from puzzicle.puzzicon.fill.propagation import ArcConsistency
+from puzzicle.puzzicon.fill.state import FillState
+from puzzicle.puzzicon.grid import GridModel
+
+_log = logging.getLogger(__name__)
+
+tests.configure_logging()
+
+
+class MinimumRemainingValuesTest(TestCase):
+
+    def test_order(self):
+        # slots: 0 = 1-across (AB), 1 = 1-down (AC), 2 = 2-down (BDF), 3 = 3-across (CDE), 4 = 4-down (EG), 5 = 5-across (FG)
+        grid = GridModel.build('__.___.__')
+        bank = Bank.with_index(['AB', 'CDE', 'FG', 'AC', 'BDF', 'EG', 'XY', 'XYZ', 'QRS'])
+        state = FillState.from_grid(grid)
+        selector = MinimumRemainingValues(bank)
+        counts = selector.count(state)
+        self.assertDictEqual({0: 5, 1: 5, 2: 4, 3: 4, 4: 5, 5: 5}, counts.candidates)
+        self.assertDictEqual({0: 2, 1: 2, 2: 3, 3: 3, 4: 2, 5: 2}, counts.crossings)
+        self.assertListEqual([2, 3, 0, 1, 4, 5], list(selector.order(counts)))
+
+    def test_count_incremental(self):
+        grid = GridModel.build('__.___.__')
+        bank = Bank.with_index(['AB', 'CDE', 'FG', 'AC', 'BDF', 'EG', 'AD', 'ADG', 'EDC', 'BF'])
+        selector = MinimumRemainingValues(bank)
+        state = FillState.from_grid(grid)
+        previous = selector.count(state)
+        suggestion = Suggestion({1: 'B', 4: 'D', 7: 'F'}, {2: Answer.create('BDF')})
+        state = state.advance(suggestion)
+        incremental = selector.count(state, previous, suggestion)
+        self.assertEqual(selector.count(state), incremental)
+        self.assertNotIn(2, incremental.candidates)
+        self.assertEqual(1, incremental.candidates[0])
+
+    def test_count_domains(self):
+        bank = Bank.with_index(['AB', 'BD', 'CD', 'AC', 'XY'])
+        state = FillState.from_grid(GridModel.build('____'))
+        propagator = ArcConsistency(bank)
+        domains = propagator.propagate(state)
+        counts = MinimumRemainingValues(bank).count(state, domains=domains)
+        self.assertDictEqual(propagator.sizes(domains), counts.candidates)
+
+    def test_fill_finds_all(self):
+        grid = GridModel.build('_________')
+        bank = Bank.with_index(['ABC', 'DEF', 'GHI', 'ADG', 'BEH', 'CFI', 'AEI', 'BCD', 'CDE', 'EFG', 'HIA'])
+        expected = Filler(bank).fill(FillState.from_grid(grid), AllCompleteListener())
+        for backjumping in [False, True]:
+            with self.subTest(backjumping=backjumping):
+                filler = Filler(bank)
+                filler.selector = MinimumRemainingValues(bank)
+                filler.backjumping = backjumping
+                actual = filler.fill(FillState.from_grid(grid), AllCompleteListener())
+                self.assertSetEqual(expected.value(), actual.value())
+
+    def test_fill_visits_fewer_nodes(self):
+        grid = GridModel.build('__.___.__')
+        bank = tests.create_bank('AB', 'CDE', 'FG', 'AC', 'BDF', 'EG', 'AD', 'ADG', 'EDC', 'BF', 'XY', 'QR', 'ST', 'UV')
+        plain = Filler(bank).fill(FillState.from_grid(grid), FirstCompleteListener())
+        filler = Filler(bank)
+        filler.selector = MinimumRemainingValues(bank)
+        ordered = filler.fill(FillState.from_grid(grid), FirstCompleteListener())
+        self.assertSetEqual({'AB', 'CDE', 'FG', 'AC', 'BDF', 'EG'}, set(ordered.value().used))
+        self.assertLessEqual(ordered.count, plain.count)
+
+
+class LeastConstrainingValueTest(TestCase):
+
+    def test_letter_tables(self):
+        grid = GridModel.build('__.___.__')
+        bank = Bank.with_index(['AB', 'CDE', 'FG', 'AC', 'BDF', 'EG', 'AD', 'ADG', 'EDC', 'BF', 'XY'])
+        state = FillState.from_grid(grid)
+        # 2-down (BDF) is crossed by 1-across at its first letter, 3-across at its second, 5-across at its third
+        tables = LeastConstrainingValue(bank).letter_tables(state, 2)
+        self.assertListEqual([0, 1, 2], [position for position, _ in tables])
+        self.assertDictEqual({'B': 1, 'C': 1, 'D': 1, 'F': 1, 'G': 2, 'Y': 1}, dict(tables[0][1]))
+        self.assertDictEqual({'D': 4}, dict(tables[1][1]))
+        self.assertDictEqual({'A': 3, 'B': 1, 'E': 1, 'F': 1, 'X': 1}, dict(tables[2][1]))
+
+    def test_letter_tables_without_index(self):
+        grid = GridModel.build('__.___.__')
+        words = ['AB', 'CDE', 'FG', 'AC', 'BDF', 'EG', 'AD', 'ADG', 'EDC', 'BF', 'XY']
+        state = FillState.from_grid(grid)
+        state = state.advance(Suggestion({0: 'A', 1: 'B'}, {0: Answer.create('AB')}))
+        expected = LeastConstrainingValue(Bank.with_index(words)).letter_tables(state, 3)
+        actual = LeastConstrainingValue(Bank.with_registry(words)).letter_tables(state, 3)
+        self.assertListEqual([(p, dict(t)) for p, t in expected], [(p, dict(t)) for p, t in actual])
+
+    def test_rank(self):
+        grid = GridModel.build('__.___.__')
+        bank = Bank.with_index(['AB', 'CDE', 'FG', 'AC', 'BDF', 'EG', 'AD', 'ADG', 'EDC', 'BF', 'XY'])
+        state = FillState.from_grid(grid)
+        state = state.advance(Suggestion({0: 'A', 1: 'B'}, {0: Answer.create('AB')}))
+        items = list(bank.filter(state.answers[3].pattern))
+        ranked = LeastConstrainingValue(bank).rank(state, 3, items)
+        # ADG and EDC would leave nothing for 1-down, which starts with A
+        self.assertListEqual(['BDF', 'CDE'], [item.rendering for _, item in ranked])
+        self.assertListEqual([1, 1], [score for score, _ in ranked])
+
+    def test_score_minimum(self):
+        item = Bank.with_index(['ABC']).deposits.__iter__().__next__()
+        tables = [(0, {'A': 4}), (2, {'C': 2, 'X': 9})]
+        self.assertEqual(8, LeastConstrainingValue(None).score(tables, item))
+        self.assertEqual(2, LeastConstrainingValue(None, minimum=True).score(tables, item))
+        self.assertEqual(0, LeastConstrainingValue(None).score([(1, {'A': 1})], item))
+        self.assertEqual(1, LeastConstrainingValue(None, minimum=True).score([], item))
+
+    def test_suggest(self):
+        grid = GridModel.build('__.___.__')
+        bank = Bank.with_index(['AB', 'CDE', 'FG', 'AC', 'BDF', 'EG', 'AD', 'ADG', 'EDC', 'BF', 'XY'])
+        state = FillState.from_grid(grid)
+        orderer = LeastConstrainingValue(bank)
+        expected = set([tuple(sorted(s.legend_updates.items())) for s in bank.suggest(state, 3)])
+        actual = list(bank.suggest(state, 3, orderer=orderer))
+        self.assertTrue(set([tuple(sorted(s.legend_updates.items())) for s in actual]).issubset(expected))
+        ranks = [s.rank for s in actual]
+        self.assertListEqual(sorted(ranks, reverse=True), ranks)
+
+    def test_fill_finds_all(self):
+        grid = GridModel.build('_________')
+        bank = Bank.with_index(['ABC', 'DEF', 'GHI', 'ADG', 'BEH', 'CFI', 'AEI', 'BCD', 'CDE', 'EFG', 'HIA', 'ADI', 'BEG', 'CFH'])
+        expected = Filler(bank).fill(FillState.from_grid(grid), AllCompleteListener())
+        for minimum in [False, True]:
+            with self.subTest(minimum=minimum):
+                filler = Filler(bank)
+                filler.selector = MinimumRemainingValues(bank)
+                filler.orderer = LeastConstrainingValue(bank, minimum)
+                actual = filler.fill(FillState.from_grid(grid), AllCompleteListener())
+                self.assertSetEqual(expected.value(), actual.value())
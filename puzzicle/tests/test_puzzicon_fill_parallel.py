@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import logging
+from unittest import TestCase
+
+from puzzicle import tests
+from puzzicle.puzzicon.fill.filler import Filler, FirstCompleteListener, AllCompleteListener
+from puzzicle.puzzicon.fill.parallel import ParallelFiller, WorkStealingFiller
+from puzzicle.puzzicon.fill.state import FillState
+from puzzicle.puzzicon.grid import GridModel
+
+_log = logging.getLogger(__name__)
+
+tests.configure_logging()
+
+_WORDS_3x3 = ['AB', 'CDE', 'FG', 'AC', 'BDF', 'EG']
+_NONWORDS_3x3 = ['AD', 'ADG', 'EDC', 'BF']
+_WORDS_5x5 = ['cod', 'khaki', 'noble', 'islam', 'tee', 'knit', 'hose', 'cable', 'okla', 'diem']
+_NONWORDS_5x5 = ['AB', 'BD', 'CD', 'AC', 'mob', 'wed', 'yalow', 'downy', 'flabber', 'patter', 'dyad', 'infect', 'fest', 'feast']
+
+
+class ParallelFillerTest(TestCase):
+
+    def test_fill_all_same_as_sequential(self):
+        grid = GridModel.build('__.___.__')
+        bank = tests.create_bank(*(_WORDS_3x3 + _NONWORDS_3x3))
+        expected = Filler(bank).fill(FillState.from_grid(grid), AllCompleteListener())
+        for split_depth in [1, 2]:
+            with self.subTest(split_depth=split_depth):
+                filler = ParallelFiller(Filler(bank), max_workers=2, split_depth=split_depth)
+                actual = filler.fill(FillState.from_grid(grid), AllCompleteListener())
+                self.assertSetEqual(expected.value(), actual.value())
+                self.assertEqual(expected.count, actual.count)
+
+    def test_fill_first(self):
+        grid = GridModel.build('.._____________________..')
+        bank = tests.create_bank(*(_WORDS_5x5 + _NONWORDS_5x5))
+        filler = ParallelFiller(Filler(bank), max_workers=2)
+        filled = filler.fill(FillState.from_grid(grid), FirstCompleteListener(100000)).value()
+        self.assertIsNotNone(filled)
+        self.assertTrue(filled.is_complete())
+        self.assertSetEqual(set(map(str.upper, _WORDS_5x5)), set(filled.used))
+
+    def test_fill_no_subtrees(self):
+        grid = GridModel.build('____')
+        bank = tests.create_bank('AB', 'CD')
+        listener = ParallelFiller(Filler(bank), max_workers=2).fill(FillState.from_grid(grid), AllCompleteListener())
+        self.assertSetEqual(set(), listener.value())
+        self.assertEqual(1, listener.count)
+
+
+class WorkStealingFillerTest(TestCase):
+
+    def test_fill_all_same_as_sequential(self):
+        grid = GridModel.build('__.___.__')
+        bank = tests.create_bank(*(_WORDS_3x3 + _NONWORDS_3x3))
+        expected = Filler(bank).fill(FillState.from_grid(grid), AllCompleteListener())
+        filler = WorkStealingFiller(Filler(bank), num_workers=3, check_interval=1, steal_batch=1)
+        actual = filler.fill(FillState.from_grid(grid), AllCompleteListener())
+        self.assertSetEqual(expected.value(), actual.value())
+        self.assertEqual(expected.count, actual.count)
+        self.assertGreater(filler.steals, 0)
+
+    def test_stream(self):
+        grid = GridModel.build('____')
+        bank = tests.create_bank('AB', 'BD', 'CD', 'AC', 'XY')
+        filler = WorkStealingFiller(Filler(bank), num_workers=2, check_interval=1)
+        streamed = list(filler.stream(FillState.from_grid(grid)))
+        self.assertSetEqual({('AB', 'AC', 'BD', 'CD'), ('AC', 'AB', 'CD', 'BD')}, set([state.used for state in streamed]))
+
+    def test_stream_stops_when_listener_stops(self):
+        grid = GridModel.build('.._____________________..')
+        bank = tests.create_bank(*(_WORDS_5x5 + _NONWORDS_5x5))
+        listener = FirstCompleteListener()
+        filler = WorkStealingFiller(Filler(bank), num_workers=2)
+        streamed = list(filler.stream(FillState.from_grid(grid), listener))
+        self.assertEqual(1, len(streamed))
+        self.assertIs(streamed[0], listener.value())
+        self.assertSetEqual(set(map(str.upper, _WORDS_5x5)), set(listener.value().used))
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import logging
+from unittest import TestCase
+
+from puzzicle import tests
+from puzzicle.puzzicon.fill import Suggestion, Answer
+from puzzicle.puzzicon.fill.bank import Bank
+from puzzicle.puzzicon.fill.filler import Filler, FirstCompleteListener, AllCompleteListener
+from puzzicle.puzzicon.fill.propagation import ArcConsistency
+from puzzicle.puzzicon.fill.state import FillState
+from puzzicle.puzzicon.grid import GridModel
+
+_log = logging.getLogger(__name__)
+
+tests.configure_logging()
+
+
+class ArcConsistencyTest(TestCase):
+
+    def test_propagate_2x2(self):
+        bank = Bank.with_index(['AB', 'BD', 'CD', 'AC', 'XY'])
+        state = FillState.from_grid(GridModel.build('____'))
+        propagator = ArcConsistency(bank)
+        domains = propagator.propagate(state)
+        self.assertIsNotNone(domains)
+        self.assertDictEqual({0: 2, 1: 2, 2: 2, 3: 2}, propagator.sizes(domains))
+        self.assertSetEqual({'A'}, domains.letters[0])
+        self.assertSetEqual({'B', 'C'}, domains.letters[1])
+        self.assertSetEqual({'D'}, domains.letters[3])
+
+    def test_propagate_dead_end(self):
+        bank = Bank.with_index(['AB', 'BD', 'CD', 'AC'])
+        state = FillState.from_grid(GridModel.build('____'))
+        state = state.advance(Suggestion({0: 'C', 1: 'D'}, {0: Answer.create('CD')}))
+        self.assertIsNone(ArcConsistency(bank).propagate(state), "nothing starts with D")
+
+    def test_propagate_excludes_used(self):
+        bank = Bank.with_index(['AB', 'BA'])
+        state = FillState.from_grid(GridModel.build('____'))
+        state = state.advance(Suggestion({0: 'A', 1: 'B'}, {0: Answer.create('AB')}))
+        self.assertIsNone(ArcConsistency(bank).propagate(state), "remaining answers would repeat words")
+
+    def test_propagate_incremental(self):
+        bank = Bank.with_index(['ABC', 'DEF', 'GHI', 'ADG', 'BEH', 'CFI', 'AEI', 'AXY', 'BXY', 'CXY'])
+        propagator = ArcConsistency(bank)
+        state = FillState.from_grid(GridModel.build('_________'))
+        previous = propagator.propagate(state)
+        self.assertIsNotNone(previous)
+        state = state.advance(Suggestion({0: 'A', 1: 'B', 2: 'C'}, {0: Answer.create('ABC')}))
+        incremental = propagator.propagate(state, previous)
+        fresh = propagator.propagate(state)
+        self.assertIsNotNone(fresh)
+        self.assertDictEqual(fresh.words, incremental.words)
+        self.assertDictEqual(fresh.letters, incremental.letters)
+
+    def test_fill_with_propagator(self):
+        grid = GridModel.build('__.___.__')
+        bank = tests.create_bank('AB', 'CDE', 'FG', 'AC', 'BDF', 'EG', 'AD', 'ADG', 'EDC', 'BF')
+        filler = Filler(bank)
+        filler.propagator = ArcConsistency(bank)
+        filled = filler.fill(FillState.from_grid(grid), FirstCompleteListener(100000)).value()
+        self.assertSetEqual({'AB', 'CDE', 'FG', 'AC', 'BDF', 'EG'}, set(filled.used))
+
+    def test_fill_with_propagator_prunes(self):
+        grid = GridModel.build('_________')
+        bank = Bank.with_index(['ABC', 'DEF', 'GHI', 'ADG', 'BEH', 'CFX', 'AEI', 'BCD', 'CDE', 'EFG', 'HIA'])
+        plain = Filler(bank).fill(FillState.from_grid(grid), AllCompleteListener())
+        filler = Filler(bank)
+        filler.propagator = ArcConsistency(bank)
+        propagated = filler.fill(FillState.from_grid(grid), AllCompleteListener())
+        self.assertSetEqual(set(), propagated.value())
+        self.assertSetEqual(set(), plain.value())
+        self.assertLess(propagated.count, plain.count)
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import io
+import itertools
+import logging
+import os
+import random
+import tempfile
+from unittest import TestCase
+
+from puzzicle import tests
+from puzzicle.puzzicon.fill import Answer, Pattern, Suggestion
+from puzzicle.puzzicon.fill.bank import Bank, BankSerializer, read_scored_wordlist
+from puzzicle.puzzicon.fill.filler import Filler, AllCompleteListener
+from puzzicle.puzzicon.fill.nogood import NogoodCache
+from puzzicle.puzzicon.fill.quality import WordScorer, BestFillListener, HighestScoreFirst
+from puzzicle.puzzicon.fill.state import FillState
+from puzzicle.puzzicon.grid import GridModel
+
+_log = logging.getLogger(__name__)
+
+tests.configure_logging()
+
+
+def _scored_words(seed: int=0):
+    rng = random.Random(seed)
+    words = [''.join(letters) for letters in itertools.product('ABC', repeat=3)]
+    return dict([(word, rng.randint(1, 50)) for word in rng.sample(words, 16)])
+
+
+class ScoredWordlistTest(TestCase):
+
+    def test_read_scored_wordlist(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            pathname = os.path.join(tempdir, 'words.txt')
+            with open(pathname, 'w') as ofile:
+                ofile.write("khaki;50\nKhaki;60\nlil nas x;25\nnoscore\nbad;score\n;10\ncod;-5\n")
+            scores = read_scored_wordlist(pathname)
+        self.assertDictEqual({'KHAKI': 60, 'LILNASX': 25, 'COD': -5}, scores)
+
+    def test_with_scores(self):
+        bank = Bank.with_index(['ABC', 'DEF']).with_scores({'ABC': 10}, default_score=1)
+        self.assertEqual(10, bank.score('ABC'))
+        self.assertEqual(1, bank.score('DEF'))
+        self.assertEqual(0, Bank.with_index(['ABC']).score('ABC'))
+        changed = bank.with_changes(['GHI'], ['DEF'])
+        self.assertEqual(10, changed.score('ABC'))
+        buffer = io.BytesIO()
+        BankSerializer().serialize(bank, buffer)
+        buffer.seek(0)
+        self.assertEqual(10, BankSerializer().deserialize(buffer).score('ABC'))
+
+
+class WordScorerTest(TestCase):
+
+    def test_best(self):
+        scores = _scored_words()
+        for bank in [Bank.with_index(scores.keys()), Bank.with_registry(scores.keys())]:
+            scorer = WordScorer(bank.with_scores(scores))
+            for pattern in itertools.product('ABC_', repeat=3):
+                pattern = Pattern([None if letter == '_' else letter for letter in pattern])
+                with self.subTest(bank=bank, pattern=pattern):
+                    matching = [s for w, s in scores.items() if Bank.matches(Bank.with_index([w]).deposits.__iter__().__next__(), pattern)]
+                    self.assertEqual(max(matching, default=None), scorer.best(pattern))
+
+    def test_bound(self):
+        bank = Bank.with_index(['AB', 'BD', 'CD', 'AC', 'XY']).with_scores({'AB': 5, 'BD': 3, 'CD': 2, 'AC': 7, 'XY': 9})
+        scorer = WordScorer(bank)
+        state = FillState.from_grid(GridModel.build('____'))
+        self.assertEqual(9 * 4, scorer.bound(state))
+        state = state.advance(Suggestion({0: 'A', 1: 'B'}, {0: Answer.create('AB')}))
+        self.assertEqual(5, scorer.fill_score(state))
+        # 1-down A? may be AB or AC, 2-down B? may be BD, 3-across may be anything
+        self.assertEqual(5 + 7 + 3 + 9, scorer.bound(state))
+        state = state.advance(Suggestion({3: 'X'}, {2: Answer.create('BX')}))
+        self.assertIsNone(scorer.bound(state))
+
+
+class BestFillListenerTest(TestCase):
+
+    def _best(self, bank: Bank, grid: GridModel):
+        scorer = WordScorer(bank)
+        filler = Filler(bank)
+        filler.backjumping = True
+        everything = filler.fill(FillState.from_grid(grid), AllCompleteListener())
+        return everything, max([scorer.fill_score(state) for state in everything.value()])
+
+    def test_fill_best(self):
+        grid = GridModel.build('_________')
+        for seed in range(3):
+            scores = _scored_words(seed)
+            bank = Bank.with_index(scores.keys()).with_scores(scores)
+            everything, best_score = self._best(bank, grid)
+            for orderer in [None, HighestScoreFirst(WordScorer(bank))]:
+                with self.subTest(seed=seed, orderer=orderer):
+                    improvements = []
+                    filler = Filler(bank)
+                    filler.backjumping = True
+                    filler.orderer = orderer
+                    listener = BestFillListener(WordScorer(bank), on_improvement=lambda state, score: improvements.append(score))
+                    filler.fill(FillState.from_grid(grid), listener)
+                    self.assertEqual(best_score, listener.best_score)
+                    self.assertIn(listener.value(), everything.value())
+                    self.assertListEqual(sorted(set(improvements)), improvements)
+                    self.assertEqual(listener.improvements, len(improvements))
+                    self.assertLessEqual(listener.count, everything.count)
+
+    def test_fill_best_with_nogoods(self):
+        grid = GridModel.build('_________')
+        scores = _scored_words(1)
+        bank = Bank.with_index(scores.keys()).with_scores(scores)
+        _, best_score = self._best(bank, grid)
+        filler = Filler(bank)
+        filler.nogoods = NogoodCache()
+        listener = filler.fill(FillState.from_grid(grid), BestFillListener(WordScorer(bank)))
+        self.assertEqual(best_score, listener.best_score)
+
+    def test_absorb(self):
+        bank = Bank.with_index(['AB', 'BD', 'CD', 'AC']).with_scores({'AB': 5})
+        listener = BestFillListener(WordScorer(bank))
+        spawned = listener.spawn()
+        Filler(bank).fill(FillState.from_grid(GridModel.build('____')), spawned)
+        self.assertIsNotNone(spawned.value())
+        listener.absorb(spawned)
+        self.assertIs(spawned.value(), listener.value())
+        self.assertEqual(spawned.count, listener.count)
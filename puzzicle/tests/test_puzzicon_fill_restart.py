@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import itertools
+import logging
+import random
+from unittest import TestCase
+
+from puzzicle import tests
+from puzzicle.puzzicon.fill.bank import Bank
+from puzzicle.puzzicon.fill.filler import Filler, FirstCompleteListener, AllCompleteListener
+from puzzicle.puzzicon.fill.ordering import MinimumRemainingValues
+from puzzicle.puzzicon.fill.restart import RestartingFiller, LubySchedule, GeometricSchedule, luby
+from puzzicle.puzzicon.fill.state import FillState
+from puzzicle.puzzicon.grid import GridModel
+
+_log = logging.getLogger(__name__)
+
+tests.configure_logging()
+
+_WORDS_3x3 = ['ABC', 'DEF', 'GHI', 'ADG', 'BEH', 'CFI', 'AEI', 'BCD', 'CDE', 'EFG', 'HIA', 'ADI', 'BEG', 'CFH']
+
+
+class ScheduleTest(TestCase):
+
+    def test_luby(self):
+        self.assertListEqual([1, 1, 2, 1, 1, 2, 4, 1, 1, 2, 1, 1, 2, 4, 8, 1], [luby(i) for i in range(1, 17)])
+
+    def test_luby_schedule(self):
+        self.assertListEqual([10, 10, 20, 10, 10, 20, 40], list(itertools.islice(LubySchedule(10), 7)))
+
+    def test_geometric_schedule(self):
+        self.assertListEqual([10, 15, 22, 33], list(itertools.islice(GeometricSchedule(10, 1.5), 4)))
+
+
+class RestartingFillerTest(TestCase):
+
+    def test_provide_unfilled_random(self):
+        state = FillState.from_grid(GridModel.build('_________'))
+        expected = list(state.provide_unfilled())
+        orders = set([tuple(state.provide_unfilled(rng=random.Random(seed))) for seed in range(10)])
+        self.assertSetEqual({tuple(sorted(expected))}, set([tuple(sorted(order)) for order in orders]))
+        self.assertGreater(len(orders), 1, "ties between answers of equal length should be broken at random")
+
+    def test_fill(self):
+        grid = GridModel.build('_________')
+        bank = Bank.with_index(_WORDS_3x3)
+        expected = Filler(bank).fill(FillState.from_grid(grid), AllCompleteListener()).value()
+        self.assertTrue(expected)
+        for backjumping in [False, True]:
+            with self.subTest(backjumping=backjumping):
+                filler = Filler(bank)
+                filler.backjumping = backjumping
+                restarting = RestartingFiller(filler, LubySchedule(2), seed=0)
+                filled = restarting.fill(FillState.from_grid(grid), FirstCompleteListener(100000)).value()
+                self.assertIn(filled, expected)
+                self.assertGreater(restarting.restarts, 0)
+                self.assertIsNone(filler.rng)
+                self.assertIsNone(filler.nogoods)
+
+    def test_fill_with_selector(self):
+        grid = GridModel.build('__.___.__')
+        bank = tests.create_bank('AB', 'CDE', 'FG', 'AC', 'BDF', 'EG', 'AD', 'ADG', 'EDC', 'BF')
+        filler = Filler(bank)
+        filler.selector = MinimumRemainingValues(bank)
+        filled = RestartingFiller(filler, GeometricSchedule(1, 2), seed=1).fill(FillState.from_grid(grid)).value()
+        self.assertSetEqual({'AB', 'CDE', 'FG', 'AC', 'BDF', 'EG'}, set(filled.used))
+
+    def test_fill_unfillable(self):
+        grid = GridModel.build('_________')
+        bank = Bank.with_index(['ABC', 'DEF', 'GHI', 'ADG', 'BEH', 'CFX', 'AEI', 'BCD', 'CDE', 'EFG', 'HIA'])
+        listener = RestartingFiller(Filler(bank), LubySchedule(1), seed=0).fill(FillState.from_grid(grid), FirstCompleteListener(100000))
+        self.assertIsNone(listener.value())
+        self.assertLess(listener.count, 100000, "a search should finish by exhausting the space")
+
+    def test_schedule_runs_out(self):
+        grid = GridModel.build('_________')
+        bank = Bank.with_index(_WORDS_3x3)
+        restarting = RestartingFiller(Filler(bank), [1, 1, 1], seed=0)
+        listener = restarting.fill(FillState.from_grid(grid))
+        self.assertIsNone(listener.value())
+        self.assertEqual(3, restarting.restarts)
+        self.assertEqual(3, listener.count)
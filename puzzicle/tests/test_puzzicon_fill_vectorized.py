@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import logging
+import pickle
+import random
+import unittest
+from unittest import TestCase
+
+from puzzicle import tests
+from puzzicle.puzzicon.fill import BankItem, Pattern
+from puzzicle.puzzicon.fill import vectorized
+from puzzicle.puzzicon.fill.bank import Bank
+
+_log = logging.getLogger(__name__)
+
+tests.configure_logging()
+
+
+def _random_words(length: int, num_words: int, seed: int=0):
+    rng = random.Random(seed)
+    return [''.join([rng.choice('ABCD') for _ in range(length)]) for _ in range(num_words)]
+
+
+@unittest.skipUnless(vectorized.is_available(), "numpy is not installed")
+class ArrayMatcherTest(TestCase):
+
+    def test_same_as_slow_filter(self):
+        words = _random_words(12, 500) + _random_words(15, 200, seed=1) + ['ÉTÉÉTÉÉTÉÉTÉ', 'ΑΒΓΑΒΓΑΒΓΑΒΓ']
+        bank = Bank.with_registry(words)
+        patterns = [
+            ['A'] + [None] * 11,
+            ['A', 'B'] + [None] * 9 + ['C'],
+            [None] * 12,
+            [None] * 14 + ['D'],
+            ['Γ'] + [None] * 11,
+            ['É'] + [None] * 11,
+            ['Q'] + [None] * 11,
+            [None] * 20,
+        ]
+        for pattern in map(Pattern, patterns):
+            with self.subTest(pattern=pattern):
+                expected = sorted(bank.filter_slowly(pattern))
+                self.assertListEqual(expected, sorted(bank.filter(pattern)))
+                self.assertEqual(len(expected), bank.count_filter(pattern))
+                self.assertEqual(len(expected), bank.count(pattern))
+
+    def test_sorted(self):
+        matcher = vectorized.ArrayMatcher([BankItem.from_word(w) for w in ['CAB', 'ABC', 'ACB']])
+        self.assertListEqual(['ABC', 'ACB'], [item.rendering for item in matcher.filter(Pattern(['A', None, None]))])
+
+    def test_pickle_bank(self):
+        bank = Bank.with_registry(_random_words(12, 50))
+        pattern = Pattern(['A'] + [None] * 11)
+        expected = list(bank.filter(pattern))
+        unpickled = pickle.loads(pickle.dumps(bank))
+        self.assertIsNone(unpickled._array_matcher)
+        self.assertListEqual(expected, list(unpickled.filter(pattern)))
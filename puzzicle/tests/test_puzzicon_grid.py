@@ -72,4 +72,42 @@ class GridModelTest(TestCase):
         self.assertEqual(('across', 3, 1, 0), e[3].location)
         self.assertEqual(('down', 4, 1, 2), e[4].location)
         self.assertEqual(('across', 5, 2, 1), e[5].location)
-        self.assertListEqual([Square(0, 1, 1, '_'), Square(1, 1, 4, '_'), Square(2, 1, 7, '_')], e[2].squares)
\ No newline at end of file
+        self.assertListEqual([Square(0, 1, 1, '_'), Square(1, 1, 4, '_'), Square(2, 1, 7, '_')], e[2].squares)
+
+
+class GridTopologyTest(TestCase):
+
+    def test_3x3(self):
+        g = GridModel.build("__.___.__")
+        t = g.topology()
+        self.assertIs(t, g.topology())
+        self.assertEqual(6, t.num_slots())
+        self.assertTupleEqual((1, 1, 2, 3, 4, 5), t.slot_numbers)
+        self.assertTupleEqual((0, 1, 1, 0, 1, 0), t.slot_directions)
+        self.assertTupleEqual((0, 0, 1, 3, 5, 7), t.slot_starts)
+        self.assertTupleEqual((2, 2, 3, 3, 2, 2), t.slot_lengths)
+        self.assertTupleEqual((1, 4, 7), t.slot(2))
+        self.assertTupleEqual((2, 3), t.slots_at(4))
+        self.assertTupleEqual((1, 2, 0, 3, 0, 4, 0, 5, 0), t.cell_numbers)
+        self.assertEqual(('down', 4, 1, 2), t.location(4))
+
+    def test_crossings(self):
+        t = GridModel.build("__.___.__").topology()
+        # second cell of 3-across (grid index 4) is the second cell of 2-down
+        k = t.slot_offsets[3] + 1
+        self.assertEqual(2, t.crossing_slots[k])
+        self.assertEqual(1, t.crossing_positions[k])
+        # first cell of 2-down (grid index 1) crosses 1-across at its second cell
+        k = t.slot_offsets[2]
+        self.assertEqual((0, 1), (t.crossing_slots[k], t.crossing_positions[k]))
+        # cells of 4-down (grid indexes 5 and 8) are the last cells of 3-across and 5-across
+        k = t.slot_offsets[4]
+        self.assertEqual((3, 2), (t.crossing_slots[k], t.crossing_positions[k]))
+        self.assertEqual((5, 1), (t.crossing_slots[k + 1], t.crossing_positions[k + 1]))
+
+    def test_uncrossed(self):
+        t = GridModel.build("....__...").topology()
+        self.assertEqual(1, t.num_slots())
+        self.assertTupleEqual((4, 5), t.slot(0))
+        self.assertTupleEqual((-1, -1), t.crossing_slots)
+        self.assertTupleEqual((-1, -1), t.crossing_positions)
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import random
+from unittest import TestCase
+
+from puzzicle import puzzicon
+from puzzicle import tests
+from puzzicle.puzzicon import Filters, Puzzarian
+from puzzicle.puzzicon.fill import Pattern
+from puzzicle.puzzicon.query import PuzzemeIndex, Shape, pattern_of, regex_tokens, wildcard_tokens
+
+tests.configure_logging()
+
+
+def _random_puzzemes(num_words: int=2000, seed: int=0):
+    rng = random.Random(seed)
+    words = [''.join([rng.choice('ABCDE') for _ in range(rng.randint(1, 7))]) for _ in range(num_words)]
+    return puzzicon.create_puzzeme_set(words)
+
+
+class ShapeTest(TestCase):
+
+    def test_wildcard(self):
+        shape = Shape.of(wildcard_tokens('?A*B?C'))
+        self.assertIsNone(shape.length)
+        self.assertEqual(5, shape.min_length)
+        self.assertTupleEqual(((1, 'A'),), shape.head)
+        self.assertSetEqual({(1, 'A'), (6, 'B'), (8, 'C')}, set(shape.letters(9)))
+        self.assertEqual('', shape.prefix)
+        self.assertEqual('C', shape.suffix)
+
+    def test_fixed_length(self):
+        shape = Shape.of(wildcard_tokens('AB?D'))
+        self.assertEqual(4, shape.length)
+        self.assertEqual('AB', shape.prefix)
+        self.assertEqual('D', shape.suffix)
+
+    def test_unsupported(self):
+        self.assertIsNone(wildcard_tokens('A[BC]'))
+        for pattern in ['A+', 'A|B', '(AB)', 'A.?', '[AB]C', 'A\\d']:
+            with self.subTest(pattern=pattern):
+                self.assertIsNone(regex_tokens(pattern))
+        self.assertEqual(Shape.of(wildcard_tokens('A*B?')), Shape.of(regex_tokens('^A.*B.$')))
+
+
+class PatternOfTest(TestCase):
+
+    def test_pattern_of(self):
+        self.assertTupleEqual((None, 'A', None, None, 'E'), pattern_of(Filters.canonical_wildcard('?A??E')))
+        self.assertTupleEqual(('A', None, 'C'), pattern_of(Filters.canonical_regex('^A.C$')))
+        self.assertTupleEqual((None, None), pattern_of(Filters.stature(2)))
+        self.assertIsNone(pattern_of(Filters.canonical_wildcard('A*')))
+        self.assertIsNone(pattern_of(Filters.canonical_regex('A[BC]')))
+        self.assertIsNone(pattern_of(Filters.canonical(lambda c: True)))
+
+
+class PuzzemeIndexTest(TestCase):
+
+    def test_same_as_scan(self):
+        puzzemes = _random_puzzemes()
+        index = PuzzemeIndex(puzzemes)
+        queries = [
+            [Filters.stature(3)],
+            [Filters.stature(lambda n: n > 5)],
+            [Filters.canonical_wildcard('?A??E')],
+            [Filters.canonical_wildcard('AB*')],
+            [Filters.canonical_wildcard('*CD')],
+            [Filters.canonical_wildcard('A*C?E')],
+            [Filters.canonical_wildcard('[AB]C*')],
+            [Filters.canonical_regex('A.C.*')],
+            [Filters.canonical_regex('.+DE')],
+            [Filters.canonical_regex('(A|B)C')],
+            [Filters.canonical('abc')],
+            [Filters.canonical('zzz')],
+            [Filters.stature(4), Filters.canonical_wildcard('B*')],
+            [Filters.stature(4), Filters.canonical_wildcard('??????')],
+            [Filters.stature(2), Filters.canonical_wildcard('A??*')],
+            [Filters.canonical_wildcard('A*'), Filters.canonical_regex('.*E'), lambda p: 'C' in p.canonical],
+            [],
+        ]
+        for predicates in queries:
+            with self.subTest(predicates=predicates):
+                expected = sorted(filter(Filters.conjoin(predicates), puzzemes))
+                self.assertListEqual(expected, list(index.query(predicates)))
+
+    def test_filter(self):
+        puzzemes = _random_puzzemes()
+        index = PuzzemeIndex(puzzemes)
+        pattern = Pattern((None, 'A', None, None, 'E'))
+        expected = sorted([p for p in puzzemes if len(p.canonical) == 5 and p.canonical[1] == 'A' and p.canonical[4] == 'E'])
+        self.assertListEqual(expected, list(index.filter(pattern)))
+        self.assertListEqual([], list(index.filter(Pattern((None,) * 12))))
+
+    def test_plan(self):
+        index = PuzzemeIndex(_random_puzzemes())
+        self.assertEqual('stature', index.plan([Filters.canonical_wildcard('?A??E')]).source)
+        self.assertEqual('exact', index.plan([Filters.canonical('abc')]).source)
+        self.assertEqual('prefix', index.plan([Filters.canonical_wildcard('ABC*')]).source)
+        self.assertEqual('suffix', index.plan([Filters.canonical_regex('.*CDE')]).source)
+        self.assertEqual('scan', index.plan([lambda p: True]).source)
+
+
+class PuzzarianSearchTest(TestCase):
+
+    def test_paginate(self):
+        puzzarian = Puzzarian(_random_puzzemes())
+        predicates = [Filters.canonical_wildcard('A*')]
+        everything = list(puzzarian.search(predicates))
+        self.assertListEqual(everything[5:15], puzzarian.search(predicates, 5, 10))
+        self.assertListEqual(everything[:3], puzzarian.search(predicates, limit=3))
+        self.assertListEqual(everything[7:], puzzarian.search(predicates, offset=7))
+
+    def test_paginate_streams(self):
+        puzzarian = Puzzarian(_random_puzzemes())
+        checked = []
+
+        def predicate(p):
+            checked.append(p)
+            return True
+
+        page = puzzarian.search([predicate], 10, 5)
+        self.assertEqual(5, len(page))
+        self.assertEqual(15, len(checked))